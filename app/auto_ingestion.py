@@ -5,14 +5,21 @@ Handles automated document processing from monitored folders
 
 import os
 import asyncio
+import functools
 import hashlib
+import time
 from pathlib import Path
+from stat import S_ISREG
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 import logging
 
 from database import db
-from file_handlers import handle_file
+from file_handlers import classify_file
+from batch_classifier import LLM_BATCH_MODE, LLM_BATCH_MAX_SIZE
+from folder_watcher import create_watcher, AUTO_INGESTION_RECONCILE_SECONDS
+from ingestion_scheduler import IngestionScheduler, AUTO_INGESTION_WORKERS, AUTO_INGESTION_MAX_PARALLEL
 from main import assign_criticality_and_upload, load_criticality_config, config_file_path
 
 logger = logging.getLogger(__name__)
@@ -20,8 +27,26 @@ logger = logging.getLogger(__name__)
 # Global dictionary to track active workflows
 active_workflows: Dict[int, asyncio.Task] = {}
 
-# Maximum concurrent workflows (limit to 2 as per requirements)
-MAX_CONCURRENT_WORKFLOWS = 2
+# Scheduler workers shared by all workflows, and the default per-workflow limit; in LLM batch
+# mode both are at least LLM_BATCH_MAX_SIZE so concurrent documents can share a call
+SCHEDULER_WORKERS = max(AUTO_INGESTION_WORKERS, LLM_BATCH_MAX_SIZE if LLM_BATCH_MODE else 1)
+SCHEDULER_MAX_PARALLEL = max(AUTO_INGESTION_MAX_PARALLEL, LLM_BATCH_MAX_SIZE if LLM_BATCH_MODE else 1)
+
+# How long a stopping workflow waits for its running items to finish
+WORKFLOW_STOP_TIMEOUT_SECONDS = 55.0
+
+# Threads running the blocking part of auto-ingestion (folder scans, classification, FileNet
+# upload, database writes), separate from the upload pool so neither starves the other.
+# Always a few more than the scheduler workers, so folder scans are not held up by busy workers.
+AUTO_INGESTION_WORKER_THREADS = int(os.getenv("AUTO_INGESTION_WORKER_THREADS", "8"))
+ingestion_executor = ThreadPoolExecutor(max_workers=max(AUTO_INGESTION_WORKER_THREADS, SCHEDULER_WORKERS + 2),
+                                        thread_name_prefix="idms-ingestion")
+
+
+async def run_ingestion(func, *args):
+    """Run a blocking auto-ingestion step in the ingestion worker pool, keeping the event loop free"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(ingestion_executor, functools.partial(func, *args))
 
 
 def calculate_file_checksum(file_path: str) -> str:
@@ -54,8 +79,59 @@ def rename_processed_file(file_path: str) -> str:
         return file_path
 
 
-def scan_folder_for_files(workflow: Dict) -> List[Dict]:
-    """Scan folder and return list of new files to process"""
+class WorkflowScanState:
+    """What a workflow's scanner already knows about its folder: the persistent scan index
+    (stat signature and checksum per path) and the checksums of every file it has queued"""
+
+    def __init__(self, workflow_id: int):
+        self.workflow_id = workflow_id
+        self.index = db.get_scan_index(workflow_id)
+        self.by_inode = {entry[2]: entry for entry in self.index.values()}
+        self.queued_checksums = db.get_queue_checksums(workflow_id)
+
+    def known_checksum(self, path: str, size: int, mtime_ns: int, inode: int) -> Optional[str]:
+        """Checksum of a file seen before with the same size, mtime and inode, under this path or
+        (after a rename, like the *_processed files) another one"""
+        entry = self.index.get(path) or self.by_inode.get(inode)
+        if entry and entry[:3] == (size, mtime_ns, inode):
+            return entry[3]
+        return None
+
+    def remember(self, entries: List[tuple]):
+        """Persist (path, size, mtime_ns, inode, checksum) entries"""
+        for path, *entry in entries:
+            self.index[path] = tuple(entry)
+            self.by_inode[entry[2]] = tuple(entry)
+        db.upsert_scan_index(self.workflow_id, entries)
+
+    def forget_missing(self, present_paths: set):
+        """Drop index entries of files no longer in the folder"""
+        missing = [path for path in self.index if path not in present_paths]
+        for path in missing:
+            entry = self.index.pop(path)
+            if self.by_inode.get(entry[2]) == entry:
+                del self.by_inode[entry[2]]
+        db.delete_scan_index_entries(self.workflow_id, missing)
+
+    def mark_queued(self, file_info: Dict):
+        self.queued_checksums.add(file_info['file_checksum'])
+        self.remember([(file_info['file_path'], *file_info['stat_key'], file_info['file_checksum'])])
+
+
+# Scan state per running workflow, loaded from the database on first scan
+scan_states: Dict[int, WorkflowScanState] = {}
+
+
+def get_scan_state(workflow_id: int) -> WorkflowScanState:
+    if workflow_id not in scan_states:
+        scan_states[workflow_id] = WorkflowScanState(workflow_id)
+    return scan_states[workflow_id]
+
+
+def scan_folder_for_files(workflow: Dict, changed_paths: Optional[set] = None) -> List[Dict]:
+    """Scan folder and return list of new files to process.
+    With changed_paths (from the folder watcher) only those files are checked.
+    Files whose size, mtime and inode match the scan index are not read again."""
     try:
         source_path = Path(workflow['source_path'])
         
@@ -66,35 +142,67 @@ def scan_folder_for_files(workflow: Dict) -> List[Dict]:
         # Get file patterns (only PNG, JPG, JPEG)
         allowed_extensions = ['.png', '.jpg', '.jpeg']
         
+        state = get_scan_state(workflow['id'])
         new_files = []
+        seen_entries = []
+        present_paths = set()
+        scan_checksums = set()
+        hashed = 0
+        
+        if changed_paths is None:
+            candidates = [Path(entry.path) for entry in os.scandir(source_path)]
+        else:
+            candidates = sorted(Path(path) for path in changed_paths)
         
         # Scan directory (no subdirectories as per requirements)
-        for file_path in source_path.iterdir():
-            if not file_path.is_file():
-                continue
-            
+        for file_path in candidates:
             # Check if file extension is allowed
-            if file_path.suffix.lower() not in allowed_extensions:
+            if file_path.parent != source_path or file_path.suffix.lower() not in allowed_extensions:
                 continue
             
-            # Calculate checksum
-            checksum = calculate_file_checksum(str(file_path))
-            if not checksum:
+            try:
+                stat = file_path.stat()
+            except OSError:
                 continue
+            if not S_ISREG(stat.st_mode):
+                continue
+            path = str(file_path)
+            present_paths.add(path)
+            stat_key = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            
+            # Unchanged files seen before are never re-read
+            checksum = state.known_checksum(path, *stat_key)
+            if checksum is None:
+                checksum = calculate_file_checksum(path)
+                if not checksum:
+                    continue
+                hashed += 1
+                if checksum in state.queued_checksums or checksum in scan_checksums:
+                    seen_entries.append((path, *stat_key, checksum))
+            elif path not in state.index:
+                seen_entries.append((path, *stat_key, checksum))
             
-            # Check if file already exists in queue (by checksum)
-            if db.check_file_exists_in_queue(workflow['id'], checksum):
+            # Check if file already exists in queue, or earlier in this scan (by checksum)
+            if checksum in state.queued_checksums or checksum in scan_checksums:
                 logger.debug(f"File already in queue (duplicate): {file_path.name}")
                 continue
+            scan_checksums.add(checksum)
             
-            # Add to list
+            # Add to list; it enters the scan index once it is queued
             new_files.append({
-                'file_path': str(file_path),
+                'file_path': path,
                 'file_name': file_path.name,
-                'file_size': file_path.stat().st_size,
-                'file_checksum': checksum
+                'file_size': stat.st_size,
+                'file_checksum': checksum,
+                'stat_key': stat_key
             })
         
+        state.remember(seen_entries)
+        if changed_paths is None:
+            state.forget_missing(present_paths)
+        if hashed:
+            logger.debug(f"Workflow {workflow['id']} scan hashed {hashed} of {len(present_paths)} files")
+        
         return new_files
     
     except Exception as e:
@@ -102,16 +210,14 @@ def scan_folder_for_files(workflow: Dict) -> List[Dict]:
         return []
 
 
-async def process_queue_item(queue_item: Dict, workflow: Dict, criticality_config: dict):
-    """Process a single file from the queue"""
+def process_queue_item(queue_item: Dict, workflow: Dict, criticality_config: dict):
+    """Process a single file from the queue (already claimed, so marked processing).
+    Blocking; runs in the ingestion worker pool."""
     queue_id = queue_item['id']
     workflow_id = workflow['id']
     file_path = queue_item['file_path']
     
     try:
-        # Update queue status to processing
-        db.update_queue_status(queue_id, 'processing')
-        
         # Log start
         db.insert_workflow_log({
             'workflow_id': workflow_id,
@@ -128,29 +234,31 @@ async def process_queue_item(queue_item: Dict, workflow: Dict, criticality_confi
         
         processing_start_time = datetime.now()
         
-        # Process file (AI classification)
-        result = handle_file(file_path)
+        # Process file (AI classification, served from cache for duplicate content)
+        result = classify_file(file_path)
         
         # Assign criticality and upload to FileNet
         result = assign_criticality_and_upload(file_path, result, criticality_config)
         
         processing_end_time = datetime.now()
         
-        # Save to database (AI document classifications)
+        # Save to database (AI document classifications), complete the queue item and
+        # count it in the workflow stats as one transaction
         from db_integration import data_manager
-        document_id = data_manager.save_ai_document_processing(
-            file_path, result, processing_start_time, processing_end_time, user_data
-        )
-        
-        # Update queue status to completed
-        db.update_queue_status(queue_id, 'completed', document_id=document_id)
+        with db.transaction():
+            document_id = data_manager.save_ai_document_processing(
+                file_path, result, processing_start_time, processing_end_time, user_data
+            )
+            
+            # Update queue status to completed
+            db.update_queue_status(queue_id, 'completed', document_id=document_id)
+            
+            # Update workflow stats
+            db.increment_workflow_stats(workflow_id, success=True)
         
         # Rename the processed file
         new_file_path = rename_processed_file(file_path)
         
-        # Update workflow stats
-        db.increment_workflow_stats(workflow_id, success=True)
-        
         # Log success
         db.insert_workflow_log({
             'workflow_id': workflow_id,
@@ -213,100 +321,202 @@ async def process_queue_item(queue_item: Dict, workflow: Dict, criticality_confi
             })
 
 
+def claim_next_item(workflow_id: int) -> tuple:
+    """The running workflow and its next claimed queue item (None when the queue is empty),
+    or (None, None) once the workflow has stopped"""
+    workflow = db.get_workflow_by_id(workflow_id)
+    if not workflow or workflow['status'] != 'running':
+        return None, None
+    # Failed items wait one interval before they are retried
+    return workflow, db.claim_next_queue_item(workflow_id, retry_delay_seconds=workflow['interval_seconds'])
+
+
+def queue_new_files(workflow: Dict, changed_paths: Optional[set] = None) -> int:
+    """Scan the workflow's folder (or just changed_paths) and queue the new files; returns how many
+    items are waiting to be processed"""
+    workflow_id = workflow['id']
+    if changed_paths is None:
+        # Log scan start
+        db.insert_workflow_log({
+            'workflow_id': workflow_id,
+            'log_level': 'info',
+            'log_message': 'Starting folder scan'
+        })
+    new_files = scan_folder_for_files(workflow, changed_paths)
+    
+    # Add new files to queue
+    for file_info in new_files:
+        try:
+            queue_id = db.add_to_queue({
+                'workflow_id': workflow_id,
+                'file_path': file_info['file_path'],
+                'file_name': file_info['file_name'],
+                'file_size': file_info['file_size'],
+                'file_checksum': file_info['file_checksum']
+            })
+            get_scan_state(workflow_id).mark_queued(file_info)
+            
+            logger.info(f"Added to queue: {file_info['file_name']}")
+            
+            # Log file added
+            db.insert_workflow_log({
+                'workflow_id': workflow_id,
+                'log_level': 'info',
+                'log_message': f'File added to queue: {file_info["file_name"]}',
+                'file_path': file_info['file_path']
+            })
+        except Exception as e:
+            logger.error(f"Error adding file to queue: {e}")
+    
+    # Update scan timestamp
+    db.update_workflow_scan_time(workflow_id)
+    return db.get_queue_depths().get(workflow_id, {}).get('pending', 0)
+
+
+async def process_next_item(workflow_id: int) -> bool:
+    """Claim and process one queued file of a workflow on a scheduler worker.
+    Returns False when the workflow has nothing to process."""
+    try:
+        workflow, queue_item = await run_ingestion(claim_next_item, workflow_id)
+        if not workflow or not queue_item:
+            return False
+        
+        criticality_config = await run_ingestion(load_criticality_config, config_file_path)
+        await run_ingestion(process_queue_item, queue_item, workflow, criticality_config)
+        return True
+    
+    except Exception as e:
+        error_msg = str(e)
+        
+        # Check if it's a max retry error (should stop workflow)
+        if "Max retries reached" in error_msg:
+            logger.info(f"Stopping workflow {workflow_id} due to max retries")
+            scanner = active_workflows.get(workflow_id)
+            if scanner:
+                scanner.cancel()
+            return False
+        
+        # Log error
+        await run_ingestion(db.insert_workflow_log, {
+            'workflow_id': workflow_id,
+            'log_level': 'error',
+            'log_message': f'Workflow error: {error_msg}'
+        })
+        raise
+
+
+# Worker pool shared by all running workflows, divided by weighted fair queueing
+scheduler = IngestionScheduler(process_next_item, workers=SCHEDULER_WORKERS, max_parallel=SCHEDULER_MAX_PARALLEL)
+
+
+def get_scheduler_state() -> Dict:
+    """Scheduler workers and per-workflow shares, with the queue depth of every workflow"""
+    state = scheduler.get_state()
+    depths = db.get_queue_depths()
+    for share in state['workflows']:
+        share.update(depths.pop(share['workflow_id'], {'pending': 0, 'processing': 0}))
+    # Workflows that are not running but still have items in the queue
+    for workflow_id, depth in depths.items():
+        state['workflows'].append(dict(depth, workflow_id=workflow_id, workers_in_use=0, has_work=False))
+    return state
+
+
 async def workflow_scanner_task(workflow_id: int):
-    """Background task that runs continuously for a workflow"""
+    """Background task that runs continuously for a workflow: scans its folder and hands the
+    queue to the shared scheduler, which processes it on its workers"""
     logger.info(f"Starting workflow scanner for workflow {workflow_id}")
+    watcher = None
+    scheduled = False
     
     try:
+        # Items a previous run was processing when it stopped are picked up again
+        requeued = await run_ingestion(db.requeue_processing_items, workflow_id)
+        if requeued:
+            logger.info(f"Workflow {workflow_id} requeued {requeued} interrupted items")
+        
+        # Watch the folder for new files where inotify is available; otherwise scan it every interval
+        workflow = await run_ingestion(db.get_workflow_by_id, workflow_id)
+        if workflow:
+            watcher = create_watcher(workflow['source_path'])
+            logger.info(f"Workflow {workflow_id} detects new files by "
+                        f"{'inotify events' if watcher else 'polling'} in {workflow['source_path']}")
+            scheduler.add(workflow_id, workflow.get('weight'), workflow.get('max_parallel'))
+            scheduled = True
+        next_full_scan = 0.0
+        
         while workflow_id in active_workflows:
             # Get current workflow data
-            workflow = db.get_workflow_by_id(workflow_id)
+            workflow = await run_ingestion(db.get_workflow_by_id, workflow_id)
             
             if not workflow or workflow['status'] != 'running':
                 logger.info(f"Workflow {workflow_id} stopped or not found")
                 break
+            scheduler.configure(workflow_id, workflow.get('weight'), workflow.get('max_parallel'))
             
-            # Load criticality config
-            criticality_config = load_criticality_config(config_file_path)
+            if watcher and watcher.lost:
+                # The folder was deleted, replaced or moved; watch whatever is at the path now
+                watcher.close()
+                watcher = create_watcher(workflow['source_path'])
+                logger.warning(f"Workflow {workflow_id} lost its watch on {workflow['source_path']}; "
+                               f"now detecting new files by {'inotify events' if watcher else 'polling'}")
+                next_full_scan = 0.0
             
             try:
-                # Log scan start
-                db.insert_workflow_log({
-                    'workflow_id': workflow_id,
-                    'log_level': 'info',
-                    'log_message': 'Starting folder scan'
-                })
-                
-                # Scan folder for new files
-                new_files = scan_folder_for_files(workflow)
+                if watcher is None or watcher.needs_rescan or time.monotonic() >= next_full_scan:
+                    # Scan folder for new files (a reconciliation scan when watching, to catch missed events)
+                    if watcher:
+                        watcher.needs_rescan = False
+                        watcher.drain()
+                        next_full_scan = time.monotonic() + AUTO_INGESTION_RECONCILE_SECONDS
+                    pending = await run_ingestion(queue_new_files, workflow)
+                else:
+                    # Only the files written or moved into the folder since the last pass
+                    pending = await run_ingestion(queue_new_files, workflow, watcher.drain())
                 
-                # Add new files to queue
-                for file_info in new_files:
-                    try:
-                        queue_id = db.add_to_queue({
-                            'workflow_id': workflow_id,
-                            'file_path': file_info['file_path'],
-                            'file_name': file_info['file_name'],
-                            'file_size': file_info['file_size'],
-                            'file_checksum': file_info['file_checksum']
-                        })
-                        
-                        logger.info(f"Added to queue: {file_info['file_name']}")
-                        
-                        # Log file added
-                        db.insert_workflow_log({
-                            'workflow_id': workflow_id,
-                            'log_level': 'info',
-                            'log_message': f'File added to queue: {file_info["file_name"]}',
-                            'file_path': file_info['file_path']
-                        })
-                    except Exception as e:
-                        logger.error(f"Error adding file to queue: {e}")
-                
-                # Update scan timestamp
-                db.update_workflow_scan_time(workflow_id)
-                
-                # Process one file from queue
-                pending_item = db.get_next_pending_item(workflow_id)
-                
-                if pending_item:
-                    await process_queue_item(pending_item, workflow, criticality_config)
+                # Ask the scheduler for workers while there is something to process (new files or due retries)
+                if pending:
+                    scheduler.notify(workflow_id)
                 
             except Exception as e:
                 error_msg = str(e)
                 logger.error(f"Error in workflow scanner: {error_msg}")
                 
-                # Check if it's a max retry error (should stop workflow)
-                if "Max retries reached" in error_msg:
-                    logger.info(f"Stopping workflow {workflow_id} due to max retries")
-                    break
-                
                 # Log error
-                db.insert_workflow_log({
+                await run_ingestion(db.insert_workflow_log, {
                     'workflow_id': workflow_id,
                     'log_level': 'error',
                     'log_message': f'Workflow error: {error_msg}'
                 })
             
-            # Sleep for the specified interval
-            await asyncio.sleep(workflow['interval_seconds'])
+            # Sleep for the specified interval, waking early when the watcher sees new files
+            if watcher:
+                await watcher.wait(min(workflow['interval_seconds'], max(next_full_scan - time.monotonic(), 0)))
+            else:
+                await asyncio.sleep(workflow['interval_seconds'])
     
     except asyncio.CancelledError:
         logger.info(f"Workflow {workflow_id} scanner cancelled")
     
     except Exception as e:
         logger.error(f"Fatal error in workflow scanner for {workflow_id}: {e}")
-        db.update_workflow_status(workflow_id, 'error', error_message=str(e))
+        await run_ingestion(db.update_workflow_status, workflow_id, 'error', str(e))
     
     finally:
         # Cleanup
-        if workflow_id in active_workflows:
+        if watcher:
+            watcher.close()
+        scan_states.pop(workflow_id, None)
+        if active_workflows.get(workflow_id) is asyncio.current_task():
             del active_workflows[workflow_id]
         
+        # Let the scheduler's workers finish the files they are processing for this workflow
+        if scheduled:
+            await scheduler.remove(workflow_id, WORKFLOW_STOP_TIMEOUT_SECONDS)
+        
         # Update status to stopped if not already in error
-        workflow = db.get_workflow_by_id(workflow_id)
+        workflow = await run_ingestion(db.get_workflow_by_id, workflow_id)
         if workflow and workflow['status'] == 'running':
-            db.update_workflow_status(workflow_id, 'stopped')
+            await run_ingestion(db.update_workflow_status, workflow_id, 'stopped')
         
         logger.info(f"Workflow scanner stopped for workflow {workflow_id}")
 
@@ -319,10 +529,6 @@ def start_workflow(workflow_id: int) -> bool:
             logger.warning(f"Workflow {workflow_id} is already running")
             return False
         
-        # Check concurrent workflow limit
-        if len(active_workflows) >= MAX_CONCURRENT_WORKFLOWS:
-            raise Exception(f"Maximum concurrent workflows ({MAX_CONCURRENT_WORKFLOWS}) reached")
-        
         # Get workflow
         workflow = db.get_workflow_by_id(workflow_id)
         if not workflow:
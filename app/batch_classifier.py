@@ -0,0 +1,149 @@
+"""
+Batch Classifier Module
+Packs small text documents from concurrent callers into shared multi-document LLM calls
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+import logging
+
+from classifier import call_llm_batch, call_llm_text
+from prompt_builder import build_batch_prompt, build_prompt
+
+logger = logging.getLogger(__name__)
+
+LLM_BATCH_MODE = os.getenv("LLM_BATCH_MODE", "false").lower() in ("1", "true", "yes")
+
+# Only fully extracted text documents up to this size are batched
+LLM_BATCH_MAX_DOC_CHARS = int(os.getenv("LLM_BATCH_MAX_DOC_CHARS", "4000"))
+
+# A batch is sent once it holds LLM_BATCH_MAX_SIZE documents or its first document has waited LLM_BATCH_MAX_WAIT_MS
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "8"))
+LLM_BATCH_MAX_WAIT_MS = int(os.getenv("LLM_BATCH_MAX_WAIT_MS", "250"))
+
+# Batches (and their single-document fallbacks) sent to the model at the same time
+LLM_BATCH_WORKERS = int(os.getenv("LLM_BATCH_WORKERS", "4"))
+
+REQUIRED_FIELDS = ("document_type", "summary")
+
+
+@dataclass
+class BatchItem:
+    text: str
+    categories_file: str
+    future: Future = field(default_factory=Future)
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+class BatchClassifier:
+    """Collects documents submitted from any thread and classifies them in batches"""
+
+    def __init__(self, max_size: int = LLM_BATCH_MAX_SIZE, max_wait_ms: int = LLM_BATCH_MAX_WAIT_MS,
+                 max_doc_chars: int = LLM_BATCH_MAX_DOC_CHARS, workers: int = LLM_BATCH_WORKERS):
+        self.max_size = max(max_size, 1)
+        self.max_wait = max_wait_ms / 1000
+        self.max_doc_chars = max_doc_chars
+        self._condition = threading.Condition()
+        self._pending: List[BatchItem] = []
+        self._collector = None
+        self._executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="idms-llm-batch")
+        self.stats = {"batches": 0, "batched_documents": 0, "single_calls": 0, "fallbacks": 0}
+
+    def accepts(self, content) -> bool:
+        """Whether an extraction result is small and complete enough to share a prompt"""
+        return (LLM_BATCH_MODE and content.kind == "text" and not content.truncated
+                and bool(content.text) and len(content.text) <= self.max_doc_chars)
+
+    def classify(self, text: str, categories_file: str) -> Tuple[Dict, Dict]:
+        """Classify one document, blocking until its batch has been answered.
+        Returns the result and a summary of the prompt it was sent in."""
+        item = BatchItem(text=text, categories_file=categories_file)
+        with self._condition:
+            self._pending.append(item)
+            if self._collector is None or not self._collector.is_alive():
+                self._collector = threading.Thread(target=self._collect, name="idms-llm-batch-collector", daemon=True)
+                self._collector.start()
+            self._condition.notify()
+        return item.future.result()
+
+    def _collect(self):
+        """Hand out batches as they fill up or their oldest document has waited long enough"""
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                deadline = self._pending[0].queued_at + self.max_wait
+                while len(self._pending) < self.max_size and time.monotonic() < deadline:
+                    self._condition.wait(deadline - time.monotonic())
+                categories_file = self._pending[0].categories_file
+                batch = [item for item in self._pending if item.categories_file == categories_file][:self.max_size]
+                taken = {id(item) for item in batch}
+                self._pending = [item for item in self._pending if id(item) not in taken]
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch: List[BatchItem]):
+        try:
+            # Send as many documents together as fit the context window; the rest go in the next call
+            while batch:
+                count = len(batch)
+                built_prompt = build_batch_prompt([item.text for item in batch], batch[0].categories_file)
+                while built_prompt is None and count > 1:
+                    count -= 1
+                    built_prompt = build_batch_prompt([item.text for item in batch[:count]], batch[0].categories_file)
+                if count == 1:
+                    self._classify_single(batch[0])
+                else:
+                    self._classify_batch(batch[:count], built_prompt)
+                batch = batch[count:]
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+
+    def _classify_single(self, item: BatchItem, fallback: bool = False):
+        built_prompt = build_prompt(item.text, item.categories_file)
+        try:
+            result = call_llm_text(built_prompt.text)
+        except Exception as e:
+            item.future.set_exception(e)
+            return
+        self.stats["fallbacks" if fallback else "single_calls"] += 1
+        item.future.set_result((result, built_prompt.summary()))
+
+    def _classify_batch(self, batch: List[BatchItem], built_prompt):
+        started = time.monotonic()
+        try:
+            results = call_llm_batch(built_prompt.text, len(batch))
+        except Exception as e:
+            logger.error(f"Batch classification of {len(batch)} documents failed: {e}")
+            results = None
+
+        by_index = {}
+        for result in results or []:
+            if isinstance(result, dict) and isinstance(result.get("index"), int):
+                by_index[result.pop("index")] = result
+        if results and not by_index and len(results) == len(batch):
+            # Results without indexes are taken in document order
+            by_index = dict(enumerate(results, 1))
+
+        self.stats["batches"] += 1
+        answered = 0
+        summary = dict(built_prompt.summary(), batch_size=len(batch))
+        for index, item in enumerate(batch, 1):
+            result = by_index.get(index)
+            if isinstance(result, dict) and all(result.get(key) for key in REQUIRED_FIELDS):
+                answered += 1
+                item.future.set_result((result, summary))
+            else:
+                # Missing or malformed entries are classified on their own
+                self._classify_single(item, fallback=True)
+        self.stats["batched_documents"] += answered
+        logger.info(f"Classified {answered} of {len(batch)} documents in one call "
+                    f"({built_prompt.prompt_tokens} prompt tokens, {time.monotonic() - started:.2f}s)")
+
+
+batch_classifier = BatchClassifier()
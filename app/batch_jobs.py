@@ -0,0 +1,205 @@
+"""
+Batch Processing Jobs Module
+Runs uploaded file batches in the background so clients can poll or stream per-file results
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import shutil
+from typing import Dict, List, Optional, AsyncIterator
+import logging
+
+from fastapi import UploadFile
+
+from database import db
+from main import process_saved_file, load_criticality_config, config_file_path, run_blocking, write_file_bytes
+
+logger = logging.getLogger(__name__)
+
+# Uploaded job files are kept here until processed so a restart can resume them
+JOBS_DIR = os.getenv("JOBS_DIR", "./jobs")
+
+# Files of one job processed in parallel
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))
+
+# How often the result stream checks for newly finished files
+JOB_STREAM_POLL_SECONDS = float(os.getenv("JOB_STREAM_POLL_SECONDS", "0.5"))
+
+# Global dictionary to track running jobs
+active_jobs: Dict[str, asyncio.Task] = {}
+
+
+async def submit_job(files: List[UploadFile], user_data: dict = None) -> str:
+    """Save uploaded files, persist the job and start processing it in the background"""
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(JOBS_DIR, job_id)
+    items = []
+
+    for index, uploaded_file in enumerate(files):
+        content = await uploaded_file.read()
+        file_path = os.path.join(job_dir, str(index), uploaded_file.filename)
+        await run_blocking(write_file_bytes, file_path, content)
+        items.append({
+            'item_index': index,
+            'filename': uploaded_file.filename,
+            'file_path': file_path
+        })
+
+    await run_blocking(
+        db.create_processing_job,
+        job_id,
+        user_data['id'] if user_data else None,
+        user_data['username'] if user_data else None,
+        items
+    )
+
+    start_job(job_id)
+    return job_id
+
+
+def start_job(job_id: str):
+    """Start the background task for a job if it is not already running"""
+    if job_id in active_jobs:
+        return
+    active_jobs[job_id] = asyncio.create_task(run_job(job_id))
+
+
+async def process_job_item(item: Dict, criticality_config: dict, user_data: Optional[dict]):
+    """Process one file of a job and record its outcome"""
+    file_dir = os.path.dirname(item['file_path'])
+    await run_blocking(db.update_processing_job_item, item['id'], 'processing')
+
+    try:
+        if not os.path.exists(item['file_path']):
+            raise FileNotFoundError(f"Job file no longer exists: {item['file_path']}")
+
+        file_results = await run_blocking(
+            process_saved_file, item['file_path'], item['filename'], criticality_config, user_data
+        )
+
+        # Report archive members relative to the archive name rather than the job folder
+        results = {
+            os.path.relpath(key, file_dir) if key.startswith(file_dir) else key: value
+            for key, value in file_results.items()
+        }
+        await run_blocking(db.update_processing_job_item, item['id'], 'completed', results)
+        logger.info(f"Job {item['job_id']}: processed {item['filename']}")
+
+    except Exception as e:
+        logger.error(f"Job {item['job_id']}: failed to process {item['filename']}: {e}")
+        await run_blocking(db.update_processing_job_item, item['id'], 'failed', None, str(e))
+
+
+async def run_job(job_id: str):
+    """Background task that processes every pending file of a job"""
+    try:
+        job = await run_blocking(db.get_processing_job, job_id)
+        if not job:
+            logger.error(f"Job {job_id} not found")
+            return
+
+        user_data = None
+        if job['user_id']:
+            user_data = await run_blocking(db.get_user_by_id, job['user_id'])
+
+        await run_blocking(db.update_processing_job_status, job_id, 'running')
+        criticality_config = await run_blocking(load_criticality_config, config_file_path)
+
+        items = await run_blocking(db.get_processing_job_items, job_id)
+        pending_items = [item for item in items if item['status'] == 'pending']
+        semaphore = asyncio.Semaphore(JOB_CONCURRENCY)
+
+        async def process_with_limit(item: Dict):
+            async with semaphore:
+                await process_job_item(item, criticality_config, user_data)
+
+        await asyncio.gather(*(process_with_limit(item) for item in pending_items))
+
+        await run_blocking(db.update_processing_job_status, job_id, 'completed')
+        await run_blocking(shutil.rmtree, os.path.join(JOBS_DIR, job_id), True)
+        logger.info(f"Job {job_id} completed")
+
+    except asyncio.CancelledError:
+        logger.info(f"Job {job_id} cancelled; it will resume on next startup")
+        raise
+
+    except Exception as e:
+        logger.error(f"Fatal error in job {job_id}: {e}")
+        # Mark the job as failed so streams finish and it is not resumed on restart
+        await run_blocking(db.update_processing_job_status, job_id, 'failed', str(e))
+
+    finally:
+        active_jobs.pop(job_id, None)
+
+
+def resume_unfinished_jobs() -> int:
+    """Restart jobs that were still in flight when the server stopped"""
+    jobs = db.get_unfinished_processing_jobs()
+    for job in jobs:
+        logger.info(f"Resuming processing job {job['id']}")
+        start_job(job['id'])
+    return len(jobs)
+
+
+def get_job_status(job_id: str) -> Optional[Dict]:
+    """Get job summary with per-file status and results"""
+    job = db.get_processing_job(job_id)
+    if not job:
+        return None
+
+    job['files'] = [
+        {
+            'item_id': item['id'],
+            'filename': item['filename'],
+            'status': item['status'],
+            'results': item['result'],
+            'error': item['error_message'],
+            'started_at': item['started_at'],
+            'completed_at': item['completed_at']
+        }
+        for item in db.get_processing_job_items(job_id)
+    ]
+    return job
+
+
+async def stream_job_results(job_id: str, event_format: str = "ndjson") -> AsyncIterator[str]:
+    """Yield each file's result as it finishes, as NDJSON lines or server-sent events"""
+    sent_items = set()
+
+    while True:
+        job = await run_blocking(db.get_processing_job, job_id)
+        if not job:
+            return
+
+        items = await run_blocking(db.get_processing_job_items, job_id)
+        for item in items:
+            if item['status'] not in ('completed', 'failed') or item['id'] in sent_items:
+                continue
+            sent_items.add(item['id'])
+
+            payload = json.dumps({
+                'job_id': job_id,
+                'item_id': item['id'],
+                'filename': item['filename'],
+                'status': item['status'],
+                'results': item['result'],
+                'error': item['error_message']
+            })
+            yield f"event: file\ndata: {payload}\n\n" if event_format == "sse" else payload + "\n"
+
+        # A failed job may leave files unprocessed, so it ends the stream straight away
+        if (job['status'] == 'completed' and len(sent_items) == len(items)) or job['status'] == 'failed':
+            summary = json.dumps({
+                'job_id': job_id,
+                'status': job['status'],
+                'total_files': job['total_files'],
+                'completed_files': job['completed_files'],
+                'failed_files': job['failed_files'],
+                'error': job.get('error_message')
+            })
+            yield f"event: done\ndata: {summary}\n\n" if event_format == "sse" else summary + "\n"
+            return
+
+        await asyncio.sleep(JOB_STREAM_POLL_SECONDS)
@@ -0,0 +1,283 @@
+"""
+Classification Cache Module
+Content-addressed cache of LLM classification results, stored in SQLite alongside idms.db
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+import logging
+
+import extractors
+import prompt_builder
+import batch_classifier
+from prompts import prompt, batch_prompt
+
+logger = logging.getLogger(__name__)
+
+# Default to classification_cache.db in the same directory as idms.db
+CACHE_DB_PATH = os.getenv(
+    "CLASSIFICATION_CACHE_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "classification_cache.db")
+)
+CACHE_ENABLED = os.getenv("CLASSIFICATION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_TTL_SECONDS = int(os.getenv("CLASSIFICATION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("CLASSIFICATION_CACHE_MAX_ENTRIES", "10000"))
+
+# Everything besides the file, the categories and the model that shapes what the model sees
+# (prompt templates, extraction limits, prompt budgeting) or how it answers
+PROMPT_INPUTS = {
+    "prompt": prompt,
+    "batch_prompt": batch_prompt,
+    "max_new_tokens": prompt_builder.MAX_NEW_TOKENS,
+    "model_context_tokens": prompt_builder.MODEL_CONTEXT_TOKENS,
+    "safety_margin": prompt_builder.PROMPT_SAFETY_MARGIN,
+    "categories_share": prompt_builder.PROMPT_CATEGORIES_SHARE,
+    "head_share": prompt_builder.HEAD_SHARE,
+    "tail_share": prompt_builder.TAIL_SHARE,
+    "section_chars": prompt_builder.SECTION_CHARS,
+    "gap_marker": prompt_builder.GAP_MARKER,
+    "max_content_chars": extractors.MAX_CONTENT_CHARS,
+    "extractor_plugins": extractors.EXTRACTOR_PLUGINS,
+    "pdf_max_pages": extractors.PDF_MAX_PAGES,
+    "pdf_page_timeout_seconds": extractors.PDF_PAGE_TIMEOUT_SECONDS,
+    "image_max_edge": extractors.IMAGE_MAX_EDGE,
+    "image_jpeg_quality": extractors.IMAGE_JPEG_QUALITY,
+    "tabular_sample_rows": extractors.TABULAR_SAMPLE_ROWS,
+    "tabular_sampling": extractors.TABULAR_SAMPLING,
+    "tabular_max_sample_bytes": extractors.TABULAR_MAX_SAMPLE_BYTES,
+    "llm_batch_mode": batch_classifier.LLM_BATCH_MODE,
+    "llm_batch_max_doc_chars": batch_classifier.LLM_BATCH_MAX_DOC_CHARS,
+}
+
+# Prompt version - changes whenever the prompt templates or the prompt budgeting settings change
+PROMPT_VERSION = hashlib.sha256(json.dumps(PROMPT_INPUTS, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class ClassificationCache:
+    """Persistent cache keyed on file content hash, prompt version and categories snapshot"""
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, ttl_seconds: int = CACHE_TTL_SECONDS,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.init_database()
+
+    def init_database(self):
+        """Create the cache table"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS classification_cache (
+                cache_key TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                categories_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                hit_count INTEGER DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_accessed_at REAL NOT NULL
+            )
+        """)
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_cache_last_accessed
+            ON classification_cache(last_accessed_at)
+        """)
+
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """Calculate SHA-256 of the file content"""
+        hash_sha256 = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                hash_sha256.update(chunk)
+        return hash_sha256.hexdigest()
+
+    @staticmethod
+    def hash_categories(categories: List[str]) -> str:
+        """Hash the existing-categories snapshot that is rendered into the prompt"""
+        return hashlib.sha256(", ".join(categories).encode("utf-8")).hexdigest()[:16]
+
+    def make_key(self, file_path: str, categories: List[str]) -> Optional[Dict]:
+        """Build the cache key parts for a file, or None if the file cannot be read"""
+        try:
+            content_hash = self.hash_file(file_path)
+        except OSError as e:
+            logger.error(f"Error hashing {file_path} for classification cache: {e}")
+            return None
+
+        categories_hash = self.hash_categories(categories)
+        model_id = os.getenv("WATSONX_MODEL_ID", "")
+        cache_key = hashlib.sha256(
+            f"{content_hash}:{PROMPT_VERSION}:{categories_hash}:{model_id}".encode("utf-8")
+        ).hexdigest()
+
+        return {
+            'cache_key': cache_key,
+            'content_hash': content_hash,
+            'prompt_version': PROMPT_VERSION,
+            'categories_hash': categories_hash
+        }
+
+    def get(self, key: Dict) -> Optional[Dict]:
+        """Return a cached classification result, or None on miss/expiry"""
+        now = time.time()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT result, created_at FROM classification_cache WHERE cache_key = ?
+            """, (key['cache_key'],))
+            row = cursor.fetchone()
+
+            if row and now - row[1] > self.ttl_seconds:
+                cursor.execute("DELETE FROM classification_cache WHERE cache_key = ?", (key['cache_key'],))
+                conn.commit()
+                with self._lock:
+                    self.evictions += 1
+                row = None
+
+            if not row:
+                with self._lock:
+                    self.misses += 1
+                return None
+
+            cursor.execute("""
+                UPDATE classification_cache
+                SET hit_count = hit_count + 1, last_accessed_at = ?
+                WHERE cache_key = ?
+            """, (now, key['cache_key']))
+            conn.commit()
+
+            with self._lock:
+                self.hits += 1
+            return json.loads(row[0])
+        except Exception as e:
+            logger.error(f"Error reading classification cache: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def put(self, key: Dict, result: Dict):
+        """Store a classification result and evict expired/excess entries"""
+        now = time.time()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                INSERT OR REPLACE INTO classification_cache (
+                    cache_key, content_hash, prompt_version, categories_hash,
+                    result, hit_count, created_at, last_accessed_at
+                ) VALUES (?, ?, ?, ?, ?, 0, ?, ?)
+            """, (
+                key['cache_key'],
+                key['content_hash'],
+                key['prompt_version'],
+                key['categories_hash'],
+                json.dumps(result),
+                now,
+                now
+            ))
+
+            # TTL eviction
+            cursor.execute("""
+                DELETE FROM classification_cache WHERE created_at < ?
+            """, (now - self.ttl_seconds,))
+            evicted = cursor.rowcount
+
+            # Size eviction (least recently used first)
+            cursor.execute("SELECT COUNT(*) FROM classification_cache")
+            excess = cursor.fetchone()[0] - self.max_entries
+            if excess > 0:
+                cursor.execute("""
+                    DELETE FROM classification_cache WHERE cache_key IN (
+                        SELECT cache_key FROM classification_cache
+                        ORDER BY last_accessed_at ASC
+                        LIMIT ?
+                    )
+                """, (excess,))
+                evicted += cursor.rowcount
+
+            conn.commit()
+
+            if evicted:
+                with self._lock:
+                    self.evictions += evicted
+                logger.info(f"Classification cache evicted {evicted} entries")
+        except Exception as e:
+            logger.error(f"Error writing classification cache: {e}")
+        finally:
+            conn.close()
+
+    def purge(self) -> int:
+        """Remove all cached results and return the number of entries deleted"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("DELETE FROM classification_cache")
+            deleted = cursor.rowcount
+            conn.commit()
+            logger.info(f"Classification cache purged: {deleted} entries deleted")
+            return deleted
+        finally:
+            conn.close()
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics (counters are since process start)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(result)), 0) FROM classification_cache")
+            entries, size_bytes = cursor.fetchone()
+        finally:
+            conn.close()
+
+        with self._lock:
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+
+        lookups = hits + misses
+        return {
+            'enabled': CACHE_ENABLED,
+            'entries': entries,
+            'size_bytes': size_bytes,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'prompt_version': PROMPT_VERSION,
+            'hits': hits,
+            'misses': misses,
+            'evictions': evictions,
+            'hit_rate': round(hits / lookups * 100, 1) if lookups > 0 else 0
+        }
+
+
+def is_cacheable_result(result) -> bool:
+    """Only successful LLM classifications are cached; pre-classifier answers are cheap to
+    recompute and would otherwise outlive changes to its rules"""
+    return (
+        isinstance(result, dict)
+        and "error" not in result
+        and bool(result.get("document_type"))
+        and not str(result.get("classified_by") or "").startswith("pre_classifier:")
+    )
+
+
+# Global cache instance
+classification_cache = ClassificationCache()
@@ -2,7 +2,8 @@ import os
 import re
 import json
 from dotenv import load_dotenv
-from ibm_watsonx_ai.foundation_models import ModelInference
+from prompt_builder import MAX_NEW_TOKENS
+from watsonx_client import watsonx_client, WatsonxError
 import logging
 
 load_dotenv()
@@ -16,14 +17,10 @@ if not api_key or not service_url or not project_id:
     logging.error("API key, service URL, and project ID must be set as environment variables.")
 
 # -----------------------------------
-# Initialize Watsonx Model
+# Watsonx inference goes through the shared client (rate limited, retried, with deadlines)
 # -----------------------------------
-model = ModelInference(
-    model_id=model_id,
-    credentials={"api_key": api_key, "url": service_url},
-    params={"decoding_method": "greedy", "max_new_tokens": 800},
-    project_id=project_id
-)
+GENERATION_PARAMS = {"decoding_method": "greedy", "max_new_tokens": MAX_NEW_TOKENS}
+CHAT_PARAMS = {"max_tokens": MAX_NEW_TOKENS}
 
 def extract_json_from_llm_output(llm_response: str):
     """
@@ -52,13 +49,14 @@ def extract_json_from_llm_output(llm_response: str):
         return None
 
 
-def call_llm_image(encoded_image: str, prompt_text: str) -> str:
+def call_llm_image(encoded_image: str, prompt_text: str, mime_type: str = "image/png") -> str:
     """
     Calls the Watsonx foundation model with a base64-encoded image and prompt text.
 
     Args:
         encoded_image (str): Base64-encoded image string.
         prompt_text (str): The prompt text to send to the model.
+        mime_type (str): MIME type of the encoded image.
 
     Returns:
         str: Model's textual response.
@@ -69,12 +67,12 @@ def call_llm_image(encoded_image: str, prompt_text: str) -> str:
             "role": "user",
             "content": [
                 {"type": "text", "text": prompt_text},
-                {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{encoded_image}"}}
+                {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{encoded_image}"}}
             ]
         }
     ]
     try:
-        response = model.chat(messages=messages)
+        response = watsonx_client.chat(messages, CHAT_PARAMS)
         logging.info(f"Model Response=== {response}")
         usage = response.get("usage", {})
         logging.info(f"Prompt tokens: {usage.get('prompt_tokens')}, Completion tokens: {usage.get('completion_tokens')}, Total: {usage.get('total_tokens')}")
@@ -84,6 +82,8 @@ def call_llm_image(encoded_image: str, prompt_text: str) -> str:
             llm_output = choices[0]["message"]["content"]
             parsed_json = extract_json_from_llm_output(llm_output)
             logging.info(f"Parsed Output: {parsed_json}")
+            if isinstance(parsed_json, dict):
+                parsed_json["token_usage"] = {key: usage.get(key) for key in ("prompt_tokens", "completion_tokens", "total_tokens")}
             return parsed_json
         else:
             logging.error("Model returned no choices.")
@@ -104,7 +104,11 @@ def call_llm_text(prompt):
         dict: Parsed JSON response from the LLM if successful.
               Returns a dictionary with an "error" key if parsing fails.
     """
-    output = model.generate_text(prompt=prompt)
+    try:
+        output = watsonx_client.generate_text(prompt, GENERATION_PARAMS)
+    except WatsonxError as e:
+        logging.error(f"Error during model inference: {e}")
+        return {"error": "Error during model inference. "}
     output = output.replace("```","")
     # Attempt to parse the output as JSON
     try:
@@ -114,3 +118,29 @@ def call_llm_text(prompt):
     except json.JSONDecodeError as e:
         logging.error(f"Error parsing output as JSON: {e}")
         return {"error": "Invalid JSON output from model"}
+
+def call_llm_batch(prompt, count):
+    """
+    Sends a multi-document prompt to the LLM and returns its per-document results.
+
+    Args:
+        prompt (str): Prompt built from prompts.batch_prompt.
+        count (int): Number of documents in the prompt; each gets MAX_NEW_TOKENS of answer.
+
+    Returns:
+        list | None: One result dict per document as returned by the model, or None if the
+                     output could not be parsed.
+    """
+    try:
+        output = watsonx_client.generate_text(prompt, dict(GENERATION_PARAMS, max_new_tokens=MAX_NEW_TOKENS * count))
+    except WatsonxError as e:
+        logging.error(f"Error during batch model inference: {e}")
+        return None
+    parsed_output = extract_json_from_llm_output(output.replace("```json", "```"))
+    if isinstance(parsed_output, dict):
+        parsed_output = parsed_output.get("results")
+    if not isinstance(parsed_output, list):
+        logging.error("Batch output is not a list of results")
+        return None
+    logging.info(f"Parsed batch output: {len(parsed_output)} results for {count} documents")
+    return parsed_output
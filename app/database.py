@@ -4,8 +4,13 @@ SQLite database for storing document processing information, user data, and syst
 """
 
 import sqlite3
+import base64
+import binascii
 import json
 import os
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from typing import List, Dict, Optional
 import logging
@@ -13,17 +18,260 @@ import logging
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Idle connections kept open for reuse (0 opens a fresh, unconfigured connection per call)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+
+# Daily analytics rollups: for each document table, its size column, the rows that count as documents
+# and the column counted per dimension ('all' counts every document). Rows are keyed
+# (day, user_id, source, dimension, dim_value).
+ANALYTICS_ROLLUP_SOURCES = {
+    'ai': {
+        'table': 'ai_document_classifications',
+        'size_column': 'file_size',
+        # Archive container rows are left out; their members are counted as documents
+        'row_filter': 'COALESCE(is_archive, 0) = 0',
+        'dimensions': {
+            'all': "''",
+            'document_type': 'document_type',
+            'criticality_level': 'criticality_level',
+            'file_type': 'file_type',
+            'processing_status': 'processing_status'
+        }
+    },
+    'gl': {
+        'table': 'user_ghostlayer_documents',
+        'size_column': 'document_size',
+        'row_filter': None,
+        'dimensions': {
+            'all': "''",
+            'document_type': 'document_type',
+            'file_type': 'document_format',
+            'processing_status': 'processing_status',
+            'uploaded_by': 'uploaded_by'
+        }
+    }
+}
+
+# Rollup rows with this user_id hold the totals over all users (admin dashboards)
+ROLLUP_ALL_USERS = 0
+
+# Columns whose change moves a document between rollup rows
+ANALYTICS_ROLLUP_COLUMNS = {
+    source: {'user_id', 'upload_timestamp', config['size_column']} | set(config['dimensions'].values())
+    for source, config in ANALYTICS_ROLLUP_SOURCES.items()
+}
+
+# Columns returned by the document list views; the large LLM text columns (summary, reasoning,
+# ai_analysis_result) are only loaded by the single-document lookups
+DOCUMENT_LIST_COLUMNS = {
+    'ai': ('id', 'user_id', 'uploaded_by', 'filename', 'original_filename', 'file_size', 'file_type',
+           'mime_type', 'document_type', 'criticality_level', 'storage_type', 'retention_period',
+           'file_path', 'upload_timestamp', 'processing_timestamp', 'processing_duration',
+           'ai_confidence_score', 'tags', 'is_archive', 'parent_archive_id', 'checksum',
+           'processing_status', 'filenet_upload_status', 'filenet_document_id', 'error_message',
+           'created_at', 'updated_at'),
+    'gl': ('id', 'user_id', 'uploaded_by', 'document_name', 'document_type', 'document_format',
+           'document_size', 'document_path', 'coordinates_json_path', 'upload_timestamp',
+           'processing_status', 'filenet_upload_status', 'filenet_document_id', 'error_message',
+           'created_at', 'updated_at')
+}
+
+# Columns matched by the list views' search box
+DOCUMENT_SEARCH_COLUMNS = {
+    'ai': ('original_filename', 'filename'),
+    'gl': ('document_name',)
+}
+
+
+def encode_page_cursor(document: Dict) -> str:
+    """Opaque keyset cursor pointing just past a listed document"""
+    return base64.urlsafe_b64encode(f"{document['created_at']}|{document['id']}".encode()).decode()
+
+
+def decode_page_cursor(page_cursor: str) -> tuple:
+    """Return the (created_at, id) pair of a cursor; raises ValueError if it is malformed"""
+    try:
+        created_at, document_id = base64.urlsafe_b64decode(page_cursor.encode()).decode().rsplit('|', 1)
+        return created_at, int(document_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid page cursor: {page_cursor}")
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool instead of closing it"""
+    
+    pool = None
+    # True while the connection is handed out; release() only returns it to the pool once
+    checked_out = False
+    
+    def close(self):
+        if self.pool is None:
+            super().close()
+            return
+        self.pool.release(self)
+
+
+class ConnectionPool:
+    """Thread-safe pool of SQLite connections configured once for WAL access"""
+    
+    def __init__(self, db_path: str, size: int = DB_POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle: "queue.LifoQueue[PooledConnection]" = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self.opened = 0
+    
+    def _open(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.db_path,
+            factory=PooledConnection,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE_SIZE
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+        conn.pool = self
+        with self._lock:
+            self.opened += 1
+        return conn
+    
+    def acquire(self) -> PooledConnection:
+        """Reuse an idle connection or open a new one when all are in use"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        conn.checked_out = True
+        return conn
+    
+    def release(self, conn: PooledConnection):
+        """Reset a connection and keep it for reuse (or close it if the pool is full).
+        Closing a connection that was already released does nothing."""
+        with self._lock:
+            if not conn.checked_out:
+                return
+            conn.checked_out = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+            self._idle.put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.pool = None
+            conn.close()
+    
+    def close_all(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.pool = None
+            conn.close()
+    
+    def get_stats(self) -> Dict:
+        return {
+            'pool_size': self.size,
+            'idle_connections': self._idle.qsize(),
+            'connections_opened': self.opened
+        }
+
+
+class TransactionConnection:
+    """Connection handed to methods running inside db.transaction()
+    
+    commit(), rollback() and close() are left to the transaction, and each cursor gets this
+    handle's own row_factory so methods sharing the connection do not affect each other.
+    """
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self.row_factory = None
+    
+    def cursor(self) -> sqlite3.Cursor:
+        cursor = self._conn.cursor()
+        cursor.row_factory = self.row_factory
+        return cursor
+    
+    def execute(self, sql: str, parameters=()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql: str, parameters) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, parameters)
+    
+    def commit(self):
+        pass
+    
+    def rollback(self):
+        pass
+    
+    def close(self):
+        pass
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
 class IDMSDatabase:
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, pool_size: int = DB_POOL_SIZE):
         # Default to idms.db in the same directory as this file
         if db_path is None:
             db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "idms.db")
         self.db_path = db_path
+        self.pool = ConnectionPool(db_path, pool_size) if pool_size > 0 else None
+        self._local = threading.local()
         self.init_database()
     
+    def connect(self) -> sqlite3.Connection:
+        """Get a database connection; close() returns it to the pool"""
+        transaction_conn = getattr(self._local, 'transaction_conn', None)
+        if transaction_conn is not None:
+            return TransactionConnection(transaction_conn)
+        if self.pool is None:
+            return sqlite3.connect(self.db_path)
+        return self.pool.acquire()
+    
+    @contextmanager
+    def transaction(self):
+        """Unit of work: every method called on this thread inside the block shares one
+        connection and commits once at the end, or not at all if the block raises.
+        Nested transaction() blocks join the outermost one."""
+        if self.in_transaction():
+            yield
+            return
+        
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.transaction_conn = conn
+        try:
+            yield
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.transaction_conn = None
+            conn.close()
+    
+    def in_transaction(self) -> bool:
+        """Whether this thread is inside a transaction() block. Methods that report failure by
+        returning False re-raise instead, so the block rolls back rather than committing a partial write."""
+        return getattr(self._local, 'transaction_conn', None) is not None
+    
+    def close(self):
+        """Close pooled connections (called on application shutdown)"""
+        if self.pool is not None:
+            self.pool.close_all()
+    
     def init_database(self):
         """Initialize the database with all required tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         # Enable foreign key constraints
@@ -44,14 +292,19 @@ class IDMSDatabase:
         self.create_ai_document_classifications_table(cursor)
         self.create_user_ghostlayer_documents_table(cursor)
         self.create_auto_ingestion_tables(cursor)
+        self.create_processing_jobs_tables(cursor)
+        self.create_analytics_rollups_table(cursor)
+        self.backfill_analytics_rollups(cursor)
         
         conn.commit()
+        # Pooled connections are shared with the rest of the app, which does not enforce foreign keys
+        cursor.execute("PRAGMA foreign_keys = OFF")
         conn.close()
         logger.info("Database initialized successfully")
     
     def migrate_database(self):
         """Migrate existing database to add new columns"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -99,6 +352,27 @@ class IDMSDatabase:
                 else:
                     logger.info("ghostlayer_view_redacted column already exists in users table")
             
+            # Add error_message to processing_jobs (jobs that failed as a whole)
+            cursor.execute("PRAGMA table_info(processing_jobs)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if columns and 'error_message' not in columns:
+                cursor.execute("ALTER TABLE processing_jobs ADD COLUMN error_message TEXT")
+                logger.info("Added error_message column to processing_jobs table")
+            
+            # Add ingestion scheduler columns to auto_ingestion_workflows
+            cursor.execute("PRAGMA table_info(auto_ingestion_workflows)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if columns and 'weight' not in columns:
+                cursor.execute("ALTER TABLE auto_ingestion_workflows ADD COLUMN weight INTEGER DEFAULT 1")
+                logger.info("Added weight column to auto_ingestion_workflows table")
+            if columns and 'max_parallel' not in columns:
+                cursor.execute("ALTER TABLE auto_ingestion_workflows ADD COLUMN max_parallel INTEGER")
+                logger.info("Added max_parallel column to auto_ingestion_workflows table")
+            
+            # Covering indexes for the old analytics aggregation; analytics now read analytics_daily_rollups
+            cursor.execute("DROP INDEX IF EXISTS idx_user_ghostlayer_analytics")
+            cursor.execute("DROP INDEX IF EXISTS idx_ai_doc_analytics")
+            
             conn.commit()
             logger.info("Database migration completed successfully")
             
@@ -271,6 +545,29 @@ class IDMSDatabase:
                 FOREIGN KEY (document_id) REFERENCES documents(id)
             )
         """)
+        
+        # Outbox columns - the background uploader drains pending rows (migration)
+        outbox_columns = [
+            ("document_source", "TEXT"),  # 'ai_document_classifications' or 'documents'
+            ("file_path", "TEXT"),  # staged copy of the file to upload
+            ("document_type", "TEXT"),
+            ("confidentiality", "TEXT"),
+            ("storage_type", "TEXT"),
+            ("retention_period", "TEXT"),
+            ("id_number", "TEXT"),
+            ("next_attempt_at", "DATETIME"),
+            ("last_attempt_at", "DATETIME")
+        ]
+        for column_name, column_type in outbox_columns:
+            try:
+                cursor.execute(f"ALTER TABLE filenet_uploads ADD COLUMN {column_name} {column_type}")
+            except sqlite3.OperationalError:
+                pass  # Column already exists
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_filenet_uploads_outbox 
+            ON filenet_uploads(upload_status, next_attempt_at)
+        """)
     
     def create_system_metrics_table(self, cursor):
         """System metrics table - stores performance and usage statistics"""
@@ -408,6 +705,28 @@ class IDMSDatabase:
             CREATE INDEX IF NOT EXISTS idx_user_ghostlayer_uploaded_by 
             ON user_ghostlayer_documents (uploaded_by)
         """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_user_ghostlayer_upload_time 
+            ON user_ghostlayer_documents (upload_timestamp)
+        """)
+        
+        # Per-user time ranges
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_user_ghostlayer_user_upload_time 
+            ON user_ghostlayer_documents (user_id, upload_timestamp)
+        """)
+        
+        # Keyset pagination of the list views, newest first
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_user_ghostlayer_user_created 
+            ON user_ghostlayer_documents (user_id, created_at, id)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_user_ghostlayer_created 
+            ON user_ghostlayer_documents (created_at, id)
+        """)
 
     def create_ai_document_classifications_table(self, cursor):
         """AI Document Classifications table - stores user-specific AI document classification uploads"""
@@ -437,7 +756,7 @@ class IDMSDatabase:
                 parent_archive_id INTEGER,
                 checksum TEXT,
                 processing_status TEXT DEFAULT 'pending', -- 'pending', 'processing', 'completed', 'failed'
-                filenet_upload_status TEXT DEFAULT 'pending', -- 'pending', 'success', 'failed'
+                filenet_upload_status TEXT DEFAULT 'pending', -- 'pending', 'success', 'failed', 'n/a' (nothing to upload)
                 filenet_document_id TEXT, -- FileNet document ID if uploaded
                 error_message TEXT, -- Error details if processing failed
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
@@ -463,6 +782,23 @@ class IDMSDatabase:
             ON ai_document_classifications(upload_timestamp)
         """)
         
+        # Per-user time ranges
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ai_doc_user_upload_time 
+            ON ai_document_classifications(user_id, upload_timestamp)
+        """)
+        
+        # Keyset pagination of the list views, newest first
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ai_doc_user_created 
+            ON ai_document_classifications(user_id, created_at, id)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ai_doc_created 
+            ON ai_document_classifications(created_at, id)
+        """)
+        
         # Add new columns if they don't exist (migration)
         try:
             cursor.execute("ALTER TABLE ai_document_classifications ADD COLUMN storage_type TEXT")
@@ -477,7 +813,7 @@ class IDMSDatabase:
     # Document Operations
     def insert_document(self, document_data: Dict) -> int:
         """Insert a new document record"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -516,7 +852,7 @@ class IDMSDatabase:
     
     def get_documents(self, limit: int = 100, offset: int = 0) -> List[Dict]:
         """Get documents with pagination"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -532,7 +868,7 @@ class IDMSDatabase:
     
     def get_document_by_id(self, document_id: int) -> Optional[Dict]:
         """Get a specific document by ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -545,7 +881,7 @@ class IDMSDatabase:
     # Processing Logs Operations
     def insert_processing_log(self, log_data: Dict) -> int:
         """Insert a processing log entry"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -572,7 +908,7 @@ class IDMSDatabase:
     # FileNet Upload Operations
     def insert_filenet_upload(self, upload_data: Dict) -> int:
         """Insert a FileNet upload record"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -598,10 +934,174 @@ class IDMSDatabase:
         conn.close()
         return upload_id
     
+    # FileNet Upload Outbox Operations
+    def enqueue_filenet_upload(self, upload_data: Dict) -> int:
+        """Add a pending FileNet upload to the outbox (document_id is linked once the document is saved)"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                INSERT INTO filenet_uploads (
+                    document_id, upload_type, upload_status, file_path, document_type,
+                    confidentiality, storage_type, retention_period, id_number,
+                    upload_timestamp, next_attempt_at
+                ) VALUES (0, ?, 'pending', ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            """, (
+                upload_data.get('upload_type', 'classification'),
+                upload_data['file_path'],
+                upload_data['document_type'],
+                upload_data['confidentiality'],
+                upload_data['storage_type'],
+                upload_data['retention_period'],
+                upload_data['id_number']
+            ))
+            
+            upload_id = cursor.lastrowid
+            conn.commit()
+            return upload_id
+        finally:
+            conn.close()
+    
+    def link_filenet_upload(self, upload_id: int, document_id: int, document_source: str) -> bool:
+        """Attach an outbox row to its saved document and sync the document's upload status"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                UPDATE filenet_uploads 
+                SET document_id = ?, document_source = ?
+                WHERE id = ?
+            """, (document_id, document_source, upload_id))
+            
+            # The uploader may already have finished this row before the document was saved
+            if document_source == 'ai_document_classifications':
+                cursor.execute("""
+                    UPDATE ai_document_classifications 
+                    SET filenet_upload_status = (SELECT upload_status FROM filenet_uploads WHERE id = ?),
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND EXISTS (
+                        SELECT 1 FROM filenet_uploads WHERE id = ? AND upload_status IN ('success', 'failed')
+                    )
+                """, (upload_id, document_id, upload_id))
+            
+            conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error linking FileNet upload {upload_id} to document {document_id}: {e}")
+            if self.in_transaction():
+                raise
+            return False
+        finally:
+            conn.close()
+    
+    def claim_filenet_uploads(self, limit: int = 20) -> List[Dict]:
+        """Atomically claim due pending uploads, marking them 'uploading'"""
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("""
+                SELECT * FROM filenet_uploads 
+                WHERE upload_status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP
+                ORDER BY next_attempt_at ASC, id ASC
+                LIMIT ?
+            """, (limit,))
+            rows = [dict(row) for row in cursor.fetchall()]
+            
+            if rows:
+                cursor.executemany("""
+                    UPDATE filenet_uploads 
+                    SET upload_status = 'uploading', last_attempt_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, [(row['id'],) for row in rows])
+            
+            conn.commit()
+            return rows
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def complete_filenet_uploads(self, outcomes: List[Dict]) -> bool:
+        """Record upload outcomes in place and mirror final status onto linked documents"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            for outcome in outcomes:
+                if outcome['upload_status'] == 'pending':
+                    # Retry later with backoff
+                    cursor.execute("""
+                        UPDATE filenet_uploads 
+                        SET upload_status = 'pending', retry_count = ?, error_message = ?,
+                            next_attempt_at = datetime('now', ?)
+                        WHERE id = ?
+                    """, (outcome['retry_count'], outcome.get('error_message'),
+                          f"+{int(outcome['retry_delay_seconds'])} seconds", outcome['id']))
+                    continue
+                
+                cursor.execute("""
+                    UPDATE filenet_uploads 
+                    SET upload_status = ?, retry_count = ?, error_message = ?, filenet_path = ?,
+                        completion_timestamp = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (outcome['upload_status'], outcome['retry_count'], outcome.get('error_message'),
+                      outcome.get('filenet_path'), outcome['id']))
+                
+                cursor.execute("""
+                    UPDATE ai_document_classifications 
+                    SET filenet_upload_status = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = (SELECT document_id FROM filenet_uploads 
+                                WHERE id = ? AND document_source = 'ai_document_classifications')
+                """, (outcome['upload_status'], outcome['id']))
+            
+            conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error recording FileNet upload outcomes: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    def reset_interrupted_filenet_uploads(self) -> int:
+        """Return uploads left 'uploading' by a crash or restart to the outbox"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                UPDATE filenet_uploads 
+                SET upload_status = 'pending', next_attempt_at = CURRENT_TIMESTAMP
+                WHERE upload_status = 'uploading'
+            """)
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+    
+    def get_filenet_outbox_stats(self) -> Dict:
+        """Get FileNet upload counts by status"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT upload_status, COUNT(*) FROM filenet_uploads 
+                GROUP BY upload_status
+            """)
+            return dict(cursor.fetchall())
+        finally:
+            conn.close()
+    
     # System Metrics Operations
     def insert_system_metric(self, metric_data: Dict) -> int:
         """Insert a system metric"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -622,7 +1122,7 @@ class IDMSDatabase:
     
     def get_system_stats(self) -> Dict:
         """Get system statistics"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         # Document statistics
@@ -660,176 +1160,201 @@ class IDMSDatabase:
             'total_categories': total_categories
         }
     
-    def get_analytics_data(self, user_id: int = None) -> Dict:
-        """Get comprehensive analytics data for dashboard (includes AI + GhostLayer)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Build WHERE clause for user filtering
-        user_filter_ai = f"WHERE user_id = {user_id}" if user_id else ""
-        user_filter_gl = f"WHERE user_id = {user_id}" if user_id else ""
-        
-        # Total documents processed today (AI + GhostLayer)
-        cursor.execute(f"""
-            SELECT COUNT(*) FROM ai_document_classifications 
-            {user_filter_ai} {'AND' if user_id else 'WHERE'} DATE(upload_timestamp) = DATE('now')
-        """)
-        ai_today = cursor.fetchone()[0]
-        
-        cursor.execute(f"""
-            SELECT COUNT(*) FROM user_ghostlayer_documents 
-            {user_filter_gl} {'AND' if user_id else 'WHERE'} DATE(upload_timestamp) = DATE('now')
-        """)
-        gl_today = cursor.fetchone()[0]
-        
-        processed_today = ai_today + gl_today
-        
-        # Total documents
-        cursor.execute(f"""
-            SELECT COUNT(*) FROM ai_document_classifications 
-            {user_filter_ai}
-        """)
-        total_ai = cursor.fetchone()[0]
-        
-        cursor.execute(f"""
-            SELECT COUNT(*) FROM user_ghostlayer_documents 
-            {user_filter_gl}
-        """)
-        total_gl = cursor.fetchone()[0]
-        
-        total_documents = total_ai + total_gl
-        
-        # Error rate calculation (AI + GhostLayer)
-        cursor.execute(f"""
-            SELECT COUNT(*) FROM ai_document_classifications 
-            {user_filter_ai} {'AND' if user_id else 'WHERE'} processing_status = 'failed'
-        """)
-        ai_failed = cursor.fetchone()[0]
-        
-        cursor.execute(f"""
-            SELECT COUNT(*) FROM user_ghostlayer_documents 
-            {user_filter_gl} {'AND' if user_id else 'WHERE'} processing_status = 'failed'
-        """)
-        gl_failed = cursor.fetchone()[0]
-        
-        total_failed = ai_failed + gl_failed
-        error_rate = (total_failed / total_documents * 100) if total_documents > 0 else 0
-        
-        # Document types distribution (AI + GhostLayer combined)
-        cursor.execute(f"""
-            SELECT document_type, COUNT(*) as count 
-            FROM ai_document_classifications 
-            {user_filter_ai} {'AND' if user_id else 'WHERE'} document_type IS NOT NULL AND document_type != 'Unknown'
-            GROUP BY document_type
-        """)
-        ai_types = cursor.fetchall()
-        
-        cursor.execute(f"""
-            SELECT document_type, COUNT(*) as count 
-            FROM user_ghostlayer_documents 
-            {user_filter_gl} {'AND' if user_id else 'WHERE'} document_type IS NOT NULL AND document_type != 'Unknown'
-            GROUP BY document_type
-        """)
-        gl_types = cursor.fetchall()
-        
-        # Combine document types
-        type_counts = {}
-        for row in ai_types + gl_types:
-            type_counts[row[0]] = type_counts.get(row[0], 0) + row[1]
-        
-        document_types = [{'name': k, 'count': v} for k, v in sorted(type_counts.items(), key=lambda x: x[1], reverse=True)]
-        
-        # Criticality levels distribution (AI only - GhostLayer doesn't have criticality)
-        cursor.execute(f"""
-            SELECT criticality_level, COUNT(*) as count 
-            FROM ai_document_classifications 
-            {user_filter_ai} {'AND' if user_id else 'WHERE'} criticality_level IS NOT NULL AND criticality_level != 'Unknown'
-            GROUP BY criticality_level 
-            ORDER BY count DESC
+    # Analytics Rollup Operations
+    def create_analytics_rollups_table(self, cursor):
+        """Daily document counts and sizes per user and dimension, kept in step with the document tables"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS analytics_daily_rollups (
+                day TEXT NOT NULL, -- DATE(upload_timestamp)
+                user_id INTEGER NOT NULL, -- 0 (ROLLUP_ALL_USERS) for totals over all users
+                source TEXT NOT NULL, -- 'ai' (ai_document_classifications) or 'gl' (user_ghostlayer_documents)
+                dimension TEXT NOT NULL, -- 'all', 'document_type', 'criticality_level', 'file_type', 'processing_status', 'uploaded_by'
+                dim_value TEXT NOT NULL,
+                doc_count INTEGER NOT NULL DEFAULT 0,
+                total_size INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, user_id, source, dimension, dim_value)
+            )
         """)
-        criticality_levels = [{'name': row[0], 'count': row[1]} for row in cursor.fetchall()]
         
-        # Processing trends (last 30 days) - AI + GhostLayer combined
-        cursor.execute(f"""
-            SELECT DATE(upload_timestamp) as date, COUNT(*) as count
-            FROM ai_document_classifications 
-            {user_filter_ai} {'AND' if user_id else 'WHERE'} upload_timestamp >= datetime('now', '-30 days')
-            GROUP BY DATE(upload_timestamp)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_rollups_user_source 
+            ON analytics_daily_rollups(user_id, source, dimension, day)
         """)
-        ai_trends = cursor.fetchall()
-        
+    
+    def _rollup_rows_sql(self, source: str, user_column: str, condition: str = "") -> str:
+        """SELECT producing one (day, user_id, dimension, dim_value, size) row per document and dimension"""
+        config = ANALYTICS_ROLLUP_SOURCES[source]
+        conditions = [c for c in (config['row_filter'], condition) if c]
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return "\nUNION ALL\n".join(f"""
+            SELECT COALESCE(DATE(upload_timestamp), '') AS day, {user_column} AS user_id, '{dimension}' AS dimension,
+                   COALESCE({column}, '') AS dim_value, COALESCE({config['size_column']}, 0) AS size
+            FROM {config['table']} {where}
+        """ for dimension, column in config['dimensions'].items())
+    
+    def _apply_rollup_delta(self, cursor, source: str, document_id: int, sign: int):
+        """Add (sign=1) or remove (sign=-1) one document's contribution to its user's and the all-users rollups"""
+        dimension_count = len(ANALYTICS_ROLLUP_SOURCES[source]['dimensions'])
+        rows_sql = "\nUNION ALL\n".join(
+            self._rollup_rows_sql(source, user_column, "id = ?")
+            for user_column in ('user_id', str(ROLLUP_ALL_USERS))
+        )
         cursor.execute(f"""
-            SELECT DATE(upload_timestamp) as date, COUNT(*) as count
-            FROM user_ghostlayer_documents 
-            {user_filter_gl} {'AND' if user_id else 'WHERE'} upload_timestamp >= datetime('now', '-30 days')
-            GROUP BY DATE(upload_timestamp)
-        """)
-        gl_trends = cursor.fetchall()
-        
-        # Combine trends by date
-        trend_counts = {}
-        for row in ai_trends + gl_trends:
-            trend_counts[row[0]] = trend_counts.get(row[0], 0) + row[1]
-        
-        processing_trends = [{'date': k, 'count': v} for k, v in sorted(trend_counts.items())]
+            INSERT INTO analytics_daily_rollups (day, user_id, source, dimension, dim_value, doc_count, total_size)
+            SELECT day, user_id, ?, dimension, dim_value, ?, ? * size
+            FROM ({rows_sql}) WHERE true
+            ON CONFLICT (day, user_id, source, dimension, dim_value) DO UPDATE SET
+                doc_count = doc_count + excluded.doc_count,
+                total_size = total_size + excluded.total_size
+        """, (source, sign, sign) + (document_id,) * dimension_count * 2)
+        
+        if sign < 0:
+            table = ANALYTICS_ROLLUP_SOURCES[source]['table']
+            cursor.execute(f"""
+                DELETE FROM analytics_daily_rollups 
+                WHERE day = (SELECT COALESCE(DATE(upload_timestamp), '') FROM {table} WHERE id = ?)
+                  AND user_id IN ((SELECT user_id FROM {table} WHERE id = ?), ?)
+                  AND source = ? AND doc_count <= 0
+            """, (document_id, document_id, ROLLUP_ALL_USERS, source))
+    
+    def rebuild_analytics_rollups(self, cursor=None) -> int:
+        """Recompute the rollups from the document tables (backfill/repair); returns the number of rows"""
+        conn = None
+        if cursor is None:
+            conn = self.connect()
+            cursor = conn.cursor()
         
-        # File types distribution (AI + GhostLayer)
-        cursor.execute(f"""
-            SELECT file_type, COUNT(*) as count 
-            FROM ai_document_classifications 
-            {user_filter_ai} {'AND' if user_id else 'WHERE'} file_type IS NOT NULL AND file_type != ''
-            GROUP BY file_type
-        """)
-        ai_file_types = cursor.fetchall()
+        try:
+            cursor.execute("DELETE FROM analytics_daily_rollups")
+            for source in ANALYTICS_ROLLUP_SOURCES:
+                for user_column in ('user_id', str(ROLLUP_ALL_USERS)):
+                    cursor.execute(f"""
+                        INSERT INTO analytics_daily_rollups (day, user_id, source, dimension, dim_value, doc_count, total_size)
+                        SELECT day, user_id, ?, dimension, dim_value, COUNT(*), SUM(size)
+                        FROM ({self._rollup_rows_sql(source, user_column)})
+                        GROUP BY day, user_id, dimension, dim_value
+                    """, (source,))
+            
+            cursor.execute("SELECT COUNT(*) FROM analytics_daily_rollups")
+            row_count = cursor.fetchone()[0]
+            if conn:
+                conn.commit()
+            logger.info(f"Analytics rollups rebuilt: {row_count} rows")
+            return row_count
+        finally:
+            if conn:
+                conn.close()
+    
+    def backfill_analytics_rollups(self, cursor):
+        """Build the rollups for databases that have documents but no rollups yet"""
+        cursor.execute("SELECT 1 FROM analytics_daily_rollups LIMIT 1")
+        if cursor.fetchone():
+            return
         
-        cursor.execute(f"""
-            SELECT document_format, COUNT(*) as count 
-            FROM user_ghostlayer_documents 
-            {user_filter_gl} {'AND' if user_id else 'WHERE'} document_format IS NOT NULL AND document_format != ''
-            GROUP BY document_format
+        cursor.execute("""
+            SELECT EXISTS (SELECT 1 FROM ai_document_classifications) 
+                OR EXISTS (SELECT 1 FROM user_ghostlayer_documents)
         """)
-        gl_file_types = cursor.fetchall()
-        
-        # Combine file types
-        file_type_counts = {}
-        for row in ai_file_types + gl_file_types:
-            file_type_counts[row[0]] = file_type_counts.get(row[0], 0) + row[1]
+        if cursor.fetchone()[0]:
+            logger.info("Backfilling analytics rollups from existing documents")
+            self.rebuild_analytics_rollups(cursor)
+    
+    def get_analytics_data(self, user_id: int = None) -> Dict:
+        """Get comprehensive analytics data for dashboard (includes AI + GhostLayer)"""
+        conn = self.connect()
+        cursor = conn.cursor()
         
-        file_types = [{'name': k, 'count': v} for k, v in sorted(file_type_counts.items(), key=lambda x: x[1], reverse=True)]
+        # Parameterised user filter (rollups hold all-users totals under ROLLUP_ALL_USERS)
+        user_and = "user_id = ? AND" if user_id else ""
+        user_params = (user_id,) if user_id else ()
+        rollup_user_id = user_id if user_id else ROLLUP_ALL_USERS
         
-        # GhostLayer specific stats
-        cursor.execute(f"""
-            SELECT COUNT(*) FROM user_ghostlayer_documents 
-            {user_filter_gl}
-        """)
-        ghostlayer_count = cursor.fetchone()[0]
+        try:
+            # Window bounds from SQLite's clock
+            cursor.execute("SELECT datetime('now', '-30 days'), DATE('now', '-30 days'), DATE('now')")
+            trend_start, trend_start_day, today = cursor.fetchone()
+            
+            # Dimension counts from the daily rollups (days x dimensions rows, not documents)
+            cursor.execute(f"""
+                SELECT source, dimension, dim_value, SUM(doc_count)
+                FROM analytics_daily_rollups
+                WHERE user_id = ? AND dimension IN ('all', 'document_type', 'criticality_level', 'file_type', 'processing_status')
+                GROUP BY source, dimension, dim_value
+                HAVING SUM(doc_count) > 0
+            """, (rollup_user_id,))
+            rows = cursor.fetchall()
+            
+            # Daily counts for the last 30 days: whole days from the rollups, plus the part of the
+            # first day inside the window from an index range scan of the document tables
+            cursor.execute(f"""
+                SELECT day, SUM(doc_count) FROM analytics_daily_rollups
+                WHERE user_id = ? AND dimension = 'all' AND day > ?
+                GROUP BY day
+                HAVING SUM(doc_count) > 0
+            """, (rollup_user_id, trend_start_day))
+            trend_counts = dict(cursor.fetchall())
+            
+            cursor.execute(f"""
+                SELECT (SELECT COUNT(*) FROM ai_document_classifications 
+                        WHERE {user_and} upload_timestamp >= ? AND upload_timestamp < DATE(?, '+1 day')
+                          AND {ANALYTICS_ROLLUP_SOURCES['ai']['row_filter']})
+                     + (SELECT COUNT(*) FROM user_ghostlayer_documents 
+                        WHERE {user_and} upload_timestamp >= ? AND upload_timestamp < DATE(?, '+1 day'))
+            """, (user_params + (trend_start, trend_start)) * 2)
+            first_day_count = cursor.fetchone()[0]
+            if first_day_count:
+                trend_counts[trend_start_day] = first_day_count
+        finally:
+            conn.close()
         
-        # AI Classification specific stats
-        cursor.execute(f"""
-            SELECT COUNT(*) FROM ai_document_classifications 
-            {user_filter_ai}
-        """)
-        ai_classification_count = cursor.fetchone()[0]
+        totals = {'ai': 0, 'gl': 0}
+        total_failed = 0
+        type_counts = {'ai': {}, 'gl': {}}
+        criticality_counts = {}
+        file_type_counts = {'ai': {}, 'gl': {}}
+        
+        for source, dimension, dim_value, count in rows:
+            if dimension == 'all':
+                totals[source] += count
+            elif dimension == 'processing_status' and dim_value == 'failed':
+                total_failed += count
+            elif dimension == 'document_type' and dim_value != 'Unknown':
+                type_counts[source][dim_value] = count
+            elif dimension == 'criticality_level' and dim_value != 'Unknown':
+                criticality_counts[dim_value] = count
+            elif dimension == 'file_type' and dim_value != '':
+                file_type_counts[source][dim_value] = count
+        
+        processed_today = trend_counts.get(today, 0)
+        
+        total_documents = totals['ai'] + totals['gl']
+        error_rate = (total_failed / total_documents * 100) if total_documents > 0 else 0
         
-        conn.close()
+        def combine_counts(*sources: Dict[str, int]) -> List[Dict]:
+            """Merge per-source counts, most common first (ties keep name order, AI before GhostLayer)"""
+            combined = {}
+            for counts in sources:
+                for name in sorted(counts):
+                    combined[name] = combined.get(name, 0) + counts[name]
+            return [{'name': k, 'count': v} for k, v in sorted(combined.items(), key=lambda x: x[1], reverse=True)]
         
         return {
             'total_documents': total_documents,
-            'ai_documents': ai_classification_count,
-            'ghostlayer_documents': ghostlayer_count,
+            'ai_documents': totals['ai'],
+            'ghostlayer_documents': totals['gl'],
             'processed_today': processed_today,
             'error_rate': round(error_rate, 1),
             'success_rate': round(100 - error_rate, 1),
-            'document_types': document_types,
-            'criticality_levels': criticality_levels,
-            'processing_trends': processing_trends,
-            'file_types': file_types
+            'document_types': combine_counts(type_counts['ai'], type_counts['gl']),
+            'criticality_levels': combine_counts(criticality_counts),
+            'processing_trends': [{'date': k, 'count': v} for k, v in sorted(trend_counts.items())],
+            'file_types': combine_counts(file_type_counts['ai'], file_type_counts['gl'])
         }
     
     # Error Logging
     def insert_error_log(self, error_data: Dict) -> int:
         """Insert an error log entry"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -854,7 +1379,7 @@ class IDMSDatabase:
     # Configuration Management
     def set_config(self, key: str, value: str, config_type: str = 'string', description: str = None):
         """Set a configuration value"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -868,7 +1393,7 @@ class IDMSDatabase:
     
     def get_config(self, key: str) -> Optional[str]:
         """Get a configuration value"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute("SELECT config_value FROM configuration WHERE config_key = ?", (key,))
@@ -880,7 +1405,7 @@ class IDMSDatabase:
     # GhostLayer Documents Operations
     def insert_ghostlayer_document(self, document_data: Dict) -> int:
         """Insert a new GhostLayer document record"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -908,7 +1433,7 @@ class IDMSDatabase:
     
     def insert_ai_document_classification(self, document_data: Dict) -> int:
         """Insert a new AI Document Classification record"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -948,39 +1473,106 @@ class IDMSDatabase:
         ))
         
         document_id = cursor.lastrowid
+        self._apply_rollup_delta(cursor, 'ai', document_id, 1)
         conn.commit()
         conn.close()
         
         logger.info(f"AI Document Classification inserted with ID: {document_id} for user: {document_data['user_id']}")
         return document_id
     
-    def get_ai_document_classifications(self, user_id: int = None, limit: int = 100, offset: int = 0) -> List[Dict]:
-        """Get AI Document Classifications with optional user filtering"""
-        conn = sqlite3.connect(self.db_path)
+    def _document_list_filters(self, source: str, user_id: int = None, search: str = None,
+                               status: str = None) -> tuple:
+        """WHERE clauses and parameters shared by the document list and count queries"""
+        where, params = [], []
+        if user_id:
+            where.append("user_id = ?")
+            params.append(user_id)
+        if search:
+            pattern = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            columns = DOCUMENT_SEARCH_COLUMNS[source]
+            where.append('(' + ' OR '.join(f"{column} LIKE ? ESCAPE '\\'" for column in columns) + ')')
+            params.extend([pattern] * len(columns))
+        if status:
+            where.append("processing_status = ?")
+            params.append(status)
+        return where, params
+    
+    def _count_from_rollups(self, source: str, user_id: int = None, status: str = None) -> int:
+        """Document count kept exact by the analytics rollups, without scanning the document table"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COALESCE(SUM(doc_count), 0) FROM analytics_daily_rollups
+            WHERE user_id = ? AND source = ? AND dimension = ? AND dim_value = ?
+        """, (user_id or ROLLUP_ALL_USERS, source,
+              'processing_status' if status else 'all', status or ''))
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def get_ai_document_classifications(self, user_id: int = None, limit: int = 100, offset: int = 0,
+                                       search: str = None, status: str = None, after: tuple = None) -> List[Dict]:
+        """Get AI Document Classifications with optional user, search and status filtering
+        
+        Newest first; pass after=(created_at, id) of the last row seen (see decode_page_cursor)
+        to continue with keyset pagination instead of an offset.
+        """
+        where, params = self._document_list_filters('ai', user_id, search, status)
+        if after:
+            where.append("(created_at, id) < (?, ?)")
+            params.extend(after)
+            offset = 0
+        
+        conn = self.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
-        if user_id:
-            cursor.execute("""
-                SELECT * FROM ai_document_classifications 
-                WHERE user_id = ?
-                ORDER BY created_at DESC 
-                LIMIT ? OFFSET ?
-            """, (user_id, limit, offset))
-        else:
-            cursor.execute("""
-                SELECT * FROM ai_document_classifications 
-                ORDER BY created_at DESC 
-                LIMIT ? OFFSET ?
-            """, (limit, offset))
+        cursor.execute(f"""
+            SELECT {', '.join(DOCUMENT_LIST_COLUMNS['ai'])} FROM ai_document_classifications 
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            ORDER BY created_at DESC, id DESC 
+            LIMIT ? OFFSET ?
+        """, params + [limit, offset])
         
         documents = [dict(row) for row in cursor.fetchall()]
         conn.close()
         return documents
     
+    def count_ai_document_classifications(self, user_id: int = None, search: str = None, status: str = None) -> int:
+        """Number of documents matching the list filters"""
+        if not search:
+            return self._count_from_rollups('ai', user_id, status)
+        
+        where, params = self._document_list_filters('ai', user_id, search, status)
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM ai_document_classifications WHERE {' AND '.join(where)}", params)
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def get_classification_training_rows(self, limit: int = 2000) -> List[Dict]:
+        """File paths and LLM-assigned types of recent completed documents, for training the pre-classifier.
+        Documents the pre-classifier answered itself carry an ai_confidence_score and are left out."""
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT file_path, document_type FROM ai_document_classifications
+            WHERE processing_status = 'completed' AND is_archive = 0 AND ai_confidence_score IS NULL
+              AND document_type NOT IN ('Unknown', 'Archive')
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        """, (limit,))
+        
+        rows = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return rows
+    
     def get_ai_document_classification_by_id(self, document_id: int) -> Optional[Dict]:
         """Get a specific AI Document Classification by ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -995,7 +1587,7 @@ class IDMSDatabase:
     
     def update_ai_document_classification(self, document_id: int, update_data: Dict) -> bool:
         """Update an AI Document Classification record"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         # Build dynamic update query
@@ -1023,20 +1615,34 @@ class IDMSDatabase:
             WHERE id = ?
         """
         
+        # Move the document between rollup rows if an aggregated column changes
+        moves_rollups = bool(ANALYTICS_ROLLUP_COLUMNS['ai'] & update_data.keys())
+        
         try:
-            cursor.execute(query, values)
-            conn.commit()
+            if moves_rollups:
+                self._apply_rollup_delta(cursor, 'ai', document_id, -1)
+            try:
+                cursor.execute(query, values)
+            except Exception:
+                if moves_rollups:
+                    self._apply_rollup_delta(cursor, 'ai', document_id, 1)
+                raise
             success = cursor.rowcount > 0
+            if moves_rollups:
+                self._apply_rollup_delta(cursor, 'ai', document_id, 1)
+            conn.commit()
             conn.close()
             return success
         except Exception as e:
             logger.error(f"Error updating AI document classification {document_id}: {e}")
             conn.close()
+            if self.in_transaction():
+                raise
             return False
     
     def delete_ai_document_classification(self, document_id: int) -> bool:
         """Delete an AI Document Classification and its associated file"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1048,7 +1654,8 @@ class IDMSDatabase:
             row = cursor.fetchone()
             file_path = row[0] if row else None
             
-            # Delete from database
+            # Delete from database (and from the analytics rollups)
+            self._apply_rollup_delta(cursor, 'ai', document_id, -1)
             cursor.execute("""
                 DELETE FROM ai_document_classifications WHERE id = ?
             """, (document_id,))
@@ -1074,7 +1681,7 @@ class IDMSDatabase:
     # User GhostLayer Documents Operations
     def insert_user_ghostlayer_document(self, document_data: Dict) -> int:
         """Insert a new user GhostLayer document record"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -1100,39 +1707,57 @@ class IDMSDatabase:
         ))
         
         document_id = cursor.lastrowid
+        self._apply_rollup_delta(cursor, 'gl', document_id, 1)
         conn.commit()
         conn.close()
         
         logger.info(f"User GhostLayer document inserted with ID: {document_id}")
         return document_id
     
-    def get_user_ghostlayer_documents(self, user_id: int = None, limit: int = 100, offset: int = 0) -> List[Dict]:
-        """Get user GhostLayer documents with optional user filtering and pagination"""
-        conn = sqlite3.connect(self.db_path)
+    def get_user_ghostlayer_documents(self, user_id: int = None, limit: int = 100, offset: int = 0,
+                                     search: str = None, status: str = None, after: tuple = None) -> List[Dict]:
+        """Get user GhostLayer documents with optional user, search and status filtering and pagination
+        
+        Newest first; pass after=(created_at, id) of the last row seen (see decode_page_cursor)
+        to continue with keyset pagination instead of an offset.
+        """
+        where, params = self._document_list_filters('gl', user_id, search, status)
+        if after:
+            where.append("(created_at, id) < (?, ?)")
+            params.extend(after)
+            offset = 0
+        
+        conn = self.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
-        if user_id:
-            cursor.execute("""
-                SELECT * FROM user_ghostlayer_documents 
-                WHERE user_id = ?
-                ORDER BY created_at DESC 
-                LIMIT ? OFFSET ?
-            """, (user_id, limit, offset))
-        else:
-            cursor.execute("""
-                SELECT * FROM user_ghostlayer_documents 
-                ORDER BY created_at DESC 
-                LIMIT ? OFFSET ?
-            """, (limit, offset))
+        cursor.execute(f"""
+            SELECT {', '.join(DOCUMENT_LIST_COLUMNS['gl'])} FROM user_ghostlayer_documents 
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            ORDER BY created_at DESC, id DESC 
+            LIMIT ? OFFSET ?
+        """, params + [limit, offset])
         
         documents = [dict(row) for row in cursor.fetchall()]
         conn.close()
         return documents
     
+    def count_user_ghostlayer_documents(self, user_id: int = None, search: str = None, status: str = None) -> int:
+        """Number of documents matching the list filters"""
+        if not search:
+            return self._count_from_rollups('gl', user_id, status)
+        
+        where, params = self._document_list_filters('gl', user_id, search, status)
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM user_ghostlayer_documents WHERE {' AND '.join(where)}", params)
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
     def get_user_ghostlayer_document_by_id(self, document_id: int) -> Optional[Dict]:
         """Get a specific user GhostLayer document by ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -1144,7 +1769,7 @@ class IDMSDatabase:
     
     def update_user_ghostlayer_document(self, document_id: int, update_data: Dict) -> bool:
         """Update user GhostLayer document record"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1169,12 +1794,25 @@ class IDMSDatabase:
             values.append(document_id)
             
             query = f"UPDATE user_ghostlayer_documents SET {', '.join(set_clauses)} WHERE id = ?"
-            cursor.execute(query, values)
+            
+            # Move the document between rollup rows if an aggregated column changes
+            moves_rollups = bool(ANALYTICS_ROLLUP_COLUMNS['gl'] & update_data.keys())
+            if moves_rollups:
+                self._apply_rollup_delta(cursor, 'gl', document_id, -1)
+            try:
+                cursor.execute(query, values)
+            except Exception:
+                if moves_rollups:
+                    self._apply_rollup_delta(cursor, 'gl', document_id, 1)
+                raise
+            updated = cursor.rowcount
+            if moves_rollups:
+                self._apply_rollup_delta(cursor, 'gl', document_id, 1)
             
             conn.commit()
             conn.close()
             
-            if cursor.rowcount > 0:
+            if updated > 0:
                 logger.info(f"User GhostLayer document {document_id} updated successfully")
                 return True
             else:
@@ -1187,10 +1825,11 @@ class IDMSDatabase:
     
     def delete_user_ghostlayer_document(self, document_id: int) -> bool:
         """Delete user GhostLayer document record"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
+            self._apply_rollup_delta(cursor, 'gl', document_id, -1)
             cursor.execute("DELETE FROM user_ghostlayer_documents WHERE id = ?", (document_id,))
             conn.commit()
             
@@ -1202,14 +1841,13 @@ class IDMSDatabase:
                 return False
         except Exception as e:
             logger.error(f"Error deleting user GhostLayer document {document_id}: {e}")
-            conn.close()
             return False
         finally:
             conn.close()
     
     def get_ghostlayer_documents(self, limit: int = 100, offset: int = 0) -> List[Dict]:
         """Get GhostLayer documents with pagination"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -1225,7 +1863,7 @@ class IDMSDatabase:
     
     def get_ghostlayer_document_by_id(self, document_id: int) -> Optional[Dict]:
         """Get a specific GhostLayer document by ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -1237,7 +1875,7 @@ class IDMSDatabase:
     
     def update_ghostlayer_document_status(self, document_id: int, status: str, ai_result: Dict = None) -> bool:
         """Update GhostLayer document processing status"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1265,78 +1903,17 @@ class IDMSDatabase:
     
     def get_ghostlayer_stats(self) -> Dict:
         """Get GhostLayer documents statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Total documents
-        cursor.execute("SELECT COUNT(*) FROM ghostlayer_documents")
-        total_documents = cursor.fetchone()[0]
-        
-        # Documents by status
-        cursor.execute("""
-            SELECT processing_status, COUNT(*) 
-            FROM ghostlayer_documents 
-            GROUP BY processing_status
-        """)
-        status_counts = dict(cursor.fetchall())
-        
-        # Documents by type
-        cursor.execute("""
-            SELECT document_type, COUNT(*) 
-            FROM ghostlayer_documents 
-            GROUP BY document_type
-        """)
-        type_counts = dict(cursor.fetchall())
-        
-        # Documents by format
-        cursor.execute("""
-            SELECT document_format, COUNT(*) 
-            FROM ghostlayer_documents 
-            GROUP BY document_format
-        """)
-        format_counts = dict(cursor.fetchall())
-        
-        # Total size
-        cursor.execute("SELECT SUM(document_size) FROM ghostlayer_documents")
-        total_size = cursor.fetchone()[0] or 0
-        
-        conn.close()
-        
-        return {
-            'total_documents': total_documents,
-            'status_counts': status_counts,
-            'type_counts': type_counts,
-            'format_counts': format_counts,
-            'total_size': total_size
-        }
-    
-    def get_user_ghostlayer_stats(self) -> Dict:
-        """Get comprehensive GhostLayer user statistics for admin dashboard"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
-        # Total documents
-        cursor.execute("SELECT COUNT(*) FROM user_ghostlayer_documents")
-        total_documents = cursor.fetchone()[0]
-        
-        # Documents uploaded today
-        cursor.execute("""
-            SELECT COUNT(*) FROM user_ghostlayer_documents 
-            WHERE DATE(upload_timestamp) = DATE('now')
-        """)
-        documents_today = cursor.fetchone()[0]
-        
-        # Documents uploaded this week
-        cursor.execute("""
-            SELECT COUNT(*) FROM user_ghostlayer_documents 
-            WHERE DATE(upload_timestamp) >= DATE('now', '-7 days')
-        """)
-        documents_this_week = cursor.fetchone()[0]
-        
+        # Total documents
+        cursor.execute("SELECT COUNT(*) FROM ghostlayer_documents")
+        total_documents = cursor.fetchone()[0]
+        
         # Documents by status
         cursor.execute("""
             SELECT processing_status, COUNT(*) 
-            FROM user_ghostlayer_documents 
+            FROM ghostlayer_documents 
             GROUP BY processing_status
         """)
         status_counts = dict(cursor.fetchall())
@@ -1344,39 +1921,87 @@ class IDMSDatabase:
         # Documents by type
         cursor.execute("""
             SELECT document_type, COUNT(*) 
-            FROM user_ghostlayer_documents 
+            FROM ghostlayer_documents 
             GROUP BY document_type
-            ORDER BY COUNT(*) DESC
-            LIMIT 10
         """)
-        type_counts = [{'name': row[0], 'count': row[1]} for row in cursor.fetchall()]
+        type_counts = dict(cursor.fetchall())
         
         # Documents by format
         cursor.execute("""
             SELECT document_format, COUNT(*) 
-            FROM user_ghostlayer_documents 
+            FROM ghostlayer_documents 
             GROUP BY document_format
         """)
         format_counts = dict(cursor.fetchall())
         
         # Total size
-        cursor.execute("SELECT SUM(document_size) FROM user_ghostlayer_documents")
+        cursor.execute("SELECT SUM(document_size) FROM ghostlayer_documents")
         total_size = cursor.fetchone()[0] or 0
         
-        # Documents by user (top 10 users)
+        conn.close()
+        
+        return {
+            'total_documents': total_documents,
+            'status_counts': status_counts,
+            'type_counts': type_counts,
+            'format_counts': format_counts,
+            'total_size': total_size
+        }
+    
+    def get_user_ghostlayer_stats(self) -> Dict:
+        """Get comprehensive GhostLayer user statistics for admin dashboard"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        # Counts and sizes from the daily rollups
         cursor.execute("""
-            SELECT uploaded_by, COUNT(*) as doc_count, SUM(document_size) as total_size
-            FROM user_ghostlayer_documents 
-            GROUP BY uploaded_by
-            ORDER BY doc_count DESC
-            LIMIT 10
-        """)
+            SELECT dimension, dim_value,
+                   SUM(doc_count), SUM(total_size),
+                   SUM(CASE WHEN day = DATE('now') THEN doc_count ELSE 0 END),
+                   SUM(CASE WHEN day >= DATE('now', '-7 days') THEN doc_count ELSE 0 END)
+            FROM analytics_daily_rollups
+            WHERE user_id = ? AND source = 'gl'
+            GROUP BY dimension, dim_value
+            HAVING SUM(doc_count) > 0
+        """, (ROLLUP_ALL_USERS,))
+        
+        total_documents = 0
+        documents_today = 0
+        documents_this_week = 0
+        total_size = 0
+        status_counts = {}
+        type_totals = []
+        format_counts = {}
+        user_totals = []
+        
+        for dimension, dim_value, count, size, today, week in cursor.fetchall():
+            if dimension == 'all':
+                total_documents = count
+                total_size = size
+                documents_today = today
+                documents_this_week = week
+            elif dimension == 'processing_status':
+                status_counts[dim_value] = count
+            elif dimension == 'document_type':
+                type_totals.append((dim_value, count))
+            elif dimension == 'file_type':
+                format_counts[dim_value] = count
+            elif dimension == 'uploaded_by':
+                user_totals.append((dim_value, count, size))
+        
+        # Documents by type (top 10)
+        type_counts = [
+            {'name': name, 'count': count}
+            for name, count in sorted(type_totals, key=lambda x: x[1], reverse=True)[:10]
+        ]
+        
+        # Documents by user (top 10 users)
         user_stats = [
             {
-                'username': row[0],
-                'document_count': row[1],
-                'total_size': row[2] or 0
-            } for row in cursor.fetchall()
+                'username': username,
+                'document_count': count,
+                'total_size': size or 0
+            } for username, count, size in sorted(user_totals, key=lambda x: x[1], reverse=True)[:10]
         ]
         
         # Recent uploads (last 10)
@@ -1402,12 +2027,13 @@ class IDMSDatabase:
         
         # Processing trends (last 30 days)
         cursor.execute("""
-            SELECT DATE(upload_timestamp) as date, COUNT(*) as count
-            FROM user_ghostlayer_documents 
-            WHERE upload_timestamp >= DATE('now', '-30 days')
-            GROUP BY DATE(upload_timestamp)
+            SELECT day as date, SUM(doc_count) as count
+            FROM analytics_daily_rollups 
+            WHERE user_id = ? AND source = 'gl' AND dimension = 'all' AND day >= DATE('now', '-30 days')
+            GROUP BY day
+            HAVING SUM(doc_count) > 0
             ORDER BY date ASC
-        """)
+        """, (ROLLUP_ALL_USERS,))
         processing_trends = [{'date': row[0], 'count': row[1]} for row in cursor.fetchall()]
         
         conn.close()
@@ -1427,7 +2053,7 @@ class IDMSDatabase:
     
     def delete_ghostlayer_document(self, document_id: int) -> bool:
         """Delete a GhostLayer document record"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1455,7 +2081,7 @@ class IDMSDatabase:
         logger.info(f"Authenticating user: {username_or_email}")
         logger.info(f"Password hash: {password_hash[:10]}...")
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1520,7 +2146,7 @@ class IDMSDatabase:
         elif not email:
             email = f"{username}@idmsdemo.com"
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1542,7 +2168,7 @@ class IDMSDatabase:
     
     def get_all_users(self) -> List[Dict]:
         """Get all users"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1582,7 +2208,7 @@ class IDMSDatabase:
     
     def update_user(self, user_id: int, **kwargs) -> bool:
         """Update user information"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1625,7 +2251,7 @@ class IDMSDatabase:
     
     def delete_user(self, user_id: int) -> bool:
         """Delete a user (soft delete by setting is_active = 0)"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1645,7 +2271,7 @@ class IDMSDatabase:
     
     def setup_mfa(self, user_id: int, mfa_secret: str) -> bool:
         """Setup MFA for a user"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1665,7 +2291,7 @@ class IDMSDatabase:
     
     def disable_mfa(self, user_id: int) -> bool:
         """Disable MFA for a user"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1685,7 +2311,7 @@ class IDMSDatabase:
     
     def get_user_mfa_status(self, user_id: int) -> Optional[dict]:
         """Get MFA status for a user"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1710,7 +2336,7 @@ class IDMSDatabase:
     
     def get_user_by_id(self, user_id: int) -> Optional[dict]:
         """Get user by ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1750,7 +2376,7 @@ class IDMSDatabase:
     def update_password_changed(self, user_id: int, new_password: str = None) -> bool:
         """Mark that user has changed their default password and optionally update the password"""
         import hashlib
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -1785,6 +2411,7 @@ class IDMSDatabase:
         self.create_auto_ingestion_workflows_table(cursor)
         self.create_auto_ingestion_queue_table(cursor)
         self.create_auto_ingestion_logs_table(cursor)
+        self.create_auto_ingestion_scan_index_table(cursor)
     
     def create_auto_ingestion_workflows_table(self, cursor):
         """Create auto_ingestion_workflows table"""
@@ -1804,6 +2431,8 @@ class IDMSDatabase:
                 is_active BOOLEAN DEFAULT 1,
                 file_pattern TEXT DEFAULT '*.png,*.jpg,*.jpeg',
                 process_subdirectories BOOLEAN DEFAULT 0,
+                weight INTEGER DEFAULT 1,
+                max_parallel INTEGER,
                 error_message TEXT,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
@@ -1876,111 +2505,73 @@ class IDMSDatabase:
         
         logger.info("Created auto_ingestion_logs table with index")
 
+    def create_auto_ingestion_scan_index_table(self, cursor):
+        """Create auto_ingestion_scan_index table: the stat signature and checksum of every file a workflow has seen"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS auto_ingestion_scan_index (
+                workflow_id INTEGER NOT NULL,
+                file_path TEXT NOT NULL,
+                file_size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                file_checksum TEXT NOT NULL,
+                last_seen_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (workflow_id, file_path),
+                FOREIGN KEY (workflow_id) REFERENCES auto_ingestion_workflows(id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        """)
+        
+        logger.info("Created auto_ingestion_scan_index table")
+
     def get_user_dashboard_stats(self, user_id: int) -> Dict:
         """Get personalized dashboard statistics for a specific user"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
-        # Total AI documents for user
-        cursor.execute("""
-            SELECT COUNT(*) FROM ai_document_classifications 
-            WHERE user_id = ?
-        """, (user_id,))
-        total_ai_docs = cursor.fetchone()[0]
-        
-        # Total GhostLayer documents for user
-        cursor.execute("""
-            SELECT COUNT(*) FROM user_ghostlayer_documents 
-            WHERE user_id = ?
-        """, (user_id,))
-        total_gl_docs = cursor.fetchone()[0]
-        
-        # Documents uploaded today (AI)
-        cursor.execute("""
-            SELECT COUNT(*) FROM ai_document_classifications 
-            WHERE user_id = ? AND DATE(upload_timestamp) = DATE('now')
-        """, (user_id,))
-        ai_docs_today = cursor.fetchone()[0]
-        
-        # Documents uploaded today (GhostLayer)
-        cursor.execute("""
-            SELECT COUNT(*) FROM user_ghostlayer_documents 
-            WHERE user_id = ? AND DATE(upload_timestamp) = DATE('now')
-        """, (user_id,))
-        gl_docs_today = cursor.fetchone()[0]
-        
-        # Documents uploaded this week (AI)
-        cursor.execute("""
-            SELECT COUNT(*) FROM ai_document_classifications 
-            WHERE user_id = ? AND DATE(upload_timestamp) >= DATE('now', '-7 days')
-        """, (user_id,))
-        ai_docs_week = cursor.fetchone()[0]
-        
-        # Documents uploaded this week (GhostLayer)
-        cursor.execute("""
-            SELECT COUNT(*) FROM user_ghostlayer_documents 
-            WHERE user_id = ? AND DATE(upload_timestamp) >= DATE('now', '-7 days')
-        """, (user_id,))
-        gl_docs_week = cursor.fetchone()[0]
-        
-        # User's success rate (AI documents)
+        # Counts, storage and document types from the daily rollups
         cursor.execute("""
-            SELECT COUNT(*) FROM ai_document_classifications 
-            WHERE user_id = ? AND processing_status = 'completed'
+            SELECT source, dimension, dim_value,
+                   SUM(doc_count), SUM(total_size),
+                   SUM(CASE WHEN day = DATE('now') THEN doc_count ELSE 0 END),
+                   SUM(CASE WHEN day >= DATE('now', '-7 days') THEN doc_count ELSE 0 END)
+            FROM analytics_daily_rollups
+            WHERE user_id = ? AND dimension IN ('all', 'document_type', 'processing_status')
+            GROUP BY source, dimension, dim_value
+            HAVING SUM(doc_count) > 0
         """, (user_id,))
-        successful_ai = cursor.fetchone()[0]
         
-        # User's success rate (GhostLayer)
-        cursor.execute("""
-            SELECT COUNT(*) FROM user_ghostlayer_documents 
-            WHERE user_id = ? AND processing_status = 'completed'
-        """, (user_id,))
-        successful_gl = cursor.fetchone()[0]
+        totals = {'ai': 0, 'gl': 0}
+        storage = {'ai': 0, 'gl': 0}
+        docs_today = {'ai': 0, 'gl': 0}
+        docs_week = {'ai': 0, 'gl': 0}
+        successful = {'ai': 0, 'gl': 0}
+        doc_types = {'ai': [], 'gl': []}
+        
+        for source, dimension, dim_value, count, size, today, week in cursor.fetchall():
+            if dimension == 'all':
+                totals[source] = count
+                storage[source] = size
+                docs_today[source] = today
+                docs_week[source] = week
+            elif dimension == 'processing_status' and dim_value == 'completed':
+                successful[source] = count
+            elif dimension == 'document_type':
+                doc_types[source].append({'name': dim_value, 'count': count})
+        
+        total_ai_docs, total_gl_docs = totals['ai'], totals['gl']
+        ai_docs_today, gl_docs_today = docs_today['ai'], docs_today['gl']
+        ai_docs_week, gl_docs_week = docs_week['ai'], docs_week['gl']
+        ai_storage, gl_storage = storage['ai'], storage['gl']
         
         total_docs = total_ai_docs + total_gl_docs
-        total_successful = successful_ai + successful_gl
+        total_successful = successful['ai'] + successful['gl']
         success_rate = (total_successful / total_docs * 100) if total_docs > 0 else 0
         
-        # User's storage (AI documents)
-        cursor.execute("""
-            SELECT SUM(file_size) FROM ai_document_classifications 
-            WHERE user_id = ?
-        """, (user_id,))
-        ai_storage = cursor.fetchone()[0] or 0
-        
-        # User's storage (GhostLayer)
-        cursor.execute("""
-            SELECT SUM(document_size) FROM user_ghostlayer_documents 
-            WHERE user_id = ?
-        """, (user_id,))
-        gl_storage = cursor.fetchone()[0] or 0
-        
-        # User's document types (AI)
-        cursor.execute("""
-            SELECT document_type, COUNT(*) 
-            FROM ai_document_classifications 
-            WHERE user_id = ?
-            GROUP BY document_type
-            ORDER BY COUNT(*) DESC
-            LIMIT 10
-        """, (user_id,))
-        ai_doc_types = [{'name': row[0], 'count': row[1]} for row in cursor.fetchall()]
-        
-        # User's document types (GhostLayer)
-        cursor.execute("""
-            SELECT document_type, COUNT(*) 
-            FROM user_ghostlayer_documents 
-            WHERE user_id = ?
-            GROUP BY document_type
-            ORDER BY COUNT(*) DESC
-            LIMIT 10
-        """, (user_id,))
-        gl_doc_types = [{'name': row[0], 'count': row[1]} for row in cursor.fetchall()]
-        
-        # Combine and aggregate document types
+        # Top 10 document types per source, then combined
         type_counts = {}
-        for item in ai_doc_types + gl_doc_types:
-            type_counts[item['name']] = type_counts.get(item['name'], 0) + item['count']
+        for source in ('ai', 'gl'):
+            for item in sorted(doc_types[source], key=lambda x: x['count'], reverse=True)[:10]:
+                type_counts[item['name']] = type_counts.get(item['name'], 0) + item['count']
         
         combined_types = [{'name': k, 'count': v} for k, v in sorted(type_counts.items(), key=lambda x: x[1], reverse=True)][:10]
         
@@ -2050,15 +2641,15 @@ class IDMSDatabase:
     # Workflow CRUD Operations
     def create_workflow(self, workflow_data: Dict) -> int:
         """Create a new auto ingestion workflow"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
             cursor.execute("""
                 INSERT INTO auto_ingestion_workflows (
                     workflow_name, source_path, user_id, created_by, interval_seconds,
-                    file_pattern, process_subdirectories
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    file_pattern, process_subdirectories, weight, max_parallel
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 workflow_data['workflow_name'],
                 workflow_data['source_path'],
@@ -2066,7 +2657,9 @@ class IDMSDatabase:
                 workflow_data['created_by'],
                 workflow_data['interval_seconds'],
                 workflow_data.get('file_pattern', '*.png,*.jpg,*.jpeg'),
-                workflow_data.get('process_subdirectories', 0)
+                workflow_data.get('process_subdirectories', 0),
+                workflow_data.get('weight', 1),
+                workflow_data.get('max_parallel')
             ))
             
             workflow_id = cursor.lastrowid
@@ -2084,7 +2677,7 @@ class IDMSDatabase:
     
     def get_workflows(self, user_id: int = None) -> List[Dict]:
         """Get all workflows (optionally filtered by user)"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -2109,7 +2702,7 @@ class IDMSDatabase:
     
     def get_workflow_by_id(self, workflow_id: int) -> Optional[Dict]:
         """Get workflow by ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -2125,7 +2718,7 @@ class IDMSDatabase:
     
     def update_workflow(self, workflow_id: int, update_data: Dict) -> bool:
         """Update workflow configuration"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -2133,7 +2726,7 @@ class IDMSDatabase:
             values = []
             
             allowed_fields = ['workflow_name', 'source_path', 'interval_seconds', 
-                            'file_pattern', 'process_subdirectories']
+                            'file_pattern', 'process_subdirectories', 'weight', 'max_parallel']
             
             for field in allowed_fields:
                 if field in update_data:
@@ -2167,7 +2760,7 @@ class IDMSDatabase:
     
     def update_workflow_status(self, workflow_id: int, status: str, error_message: str = None) -> bool:
         """Update workflow status"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -2195,7 +2788,7 @@ class IDMSDatabase:
     
     def update_workflow_scan_time(self, workflow_id: int) -> bool:
         """Update last scan timestamp"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -2215,7 +2808,7 @@ class IDMSDatabase:
     
     def increment_workflow_stats(self, workflow_id: int, success: bool = True) -> bool:
         """Increment processed or failed count"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -2238,13 +2831,15 @@ class IDMSDatabase:
             return True
         except Exception as e:
             logger.error(f"Error incrementing workflow stats: {e}")
+            if self.in_transaction():
+                raise
             return False
         finally:
             conn.close()
     
     def delete_workflow(self, workflow_id: int) -> bool:
         """Soft delete workflow"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -2269,7 +2864,7 @@ class IDMSDatabase:
     # Queue Operations
     def add_to_queue(self, queue_data: Dict) -> int:
         """Add file to processing queue"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -2298,7 +2893,7 @@ class IDMSDatabase:
     
     def get_queue_items(self, workflow_id: int = None, status: str = None, limit: int = 100) -> List[Dict]:
         """Get queue items"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -2324,7 +2919,7 @@ class IDMSDatabase:
     
     def get_next_pending_item(self, workflow_id: int = None) -> Optional[Dict]:
         """Get next pending item from queue"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -2349,10 +2944,54 @@ class IDMSDatabase:
         finally:
             conn.close()
     
+    def claim_next_queue_item(self, workflow_id: int, retry_delay_seconds: int = 0) -> Optional[Dict]:
+        """Atomically take the next pending item of a workflow and mark it processing,
+        so concurrent consumers never get the same item. Items that failed before are only
+        claimed again retry_delay_seconds after their last attempt."""
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                UPDATE auto_ingestion_queue
+                SET status = 'processing', processing_start_time = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = (
+                    SELECT id FROM auto_ingestion_queue
+                    WHERE workflow_id = ? AND status = 'pending' AND retry_count < max_retries
+                      AND (retry_count = 0 OR updated_at <= datetime('now', ?))
+                    ORDER BY priority DESC, added_to_queue_at ASC
+                    LIMIT 1
+                ) AND status = 'pending'
+                RETURNING *
+            """, (workflow_id, f"-{int(retry_delay_seconds)} seconds"))
+            row = cursor.fetchone()
+            conn.commit()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+    
+    def requeue_processing_items(self, workflow_id: int) -> int:
+        """Return items left in processing by a workflow run that was interrupted to pending"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                UPDATE auto_ingestion_queue
+                SET status = 'pending', updated_at = CURRENT_TIMESTAMP
+                WHERE workflow_id = ? AND status = 'processing'
+            """, (workflow_id,))
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+    
     def update_queue_status(self, queue_id: int, status: str, error_message: str = None, 
                            document_id: int = None) -> bool:
         """Update queue item status"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -2381,13 +3020,15 @@ class IDMSDatabase:
             return True
         except Exception as e:
             logger.error(f"Error updating queue status: {e}")
+            if self.in_transaction():
+                raise
             return False
         finally:
             conn.close()
     
     def increment_retry_count(self, queue_id: int) -> bool:
         """Increment retry count for queue item"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -2408,7 +3049,7 @@ class IDMSDatabase:
     
     def check_file_exists_in_queue(self, workflow_id: int, file_checksum: str) -> bool:
         """Check if file with same checksum already exists in queue or was processed"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -2422,10 +3063,90 @@ class IDMSDatabase:
         finally:
             conn.close()
     
+    def get_queue_depths(self) -> Dict[int, Dict[str, int]]:
+        """Pending and processing item counts per workflow"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT workflow_id, status, COUNT(*) FROM auto_ingestion_queue
+                WHERE status IN ('pending', 'processing')
+                GROUP BY workflow_id, status
+            """)
+            depths = {}
+            for workflow_id, status, count in cursor.fetchall():
+                depths.setdefault(workflow_id, {'pending': 0, 'processing': 0})[status] = count
+            return depths
+        finally:
+            conn.close()
+    
+    def get_queue_checksums(self, workflow_id: int) -> set:
+        """Checksums of every file ever queued by a workflow"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT DISTINCT file_checksum FROM auto_ingestion_queue
+                WHERE workflow_id = ? AND file_checksum IS NOT NULL
+            """, (workflow_id,))
+            return {row[0] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+    
+    # Scan Index Operations
+    def get_scan_index(self, workflow_id: int) -> Dict[str, tuple]:
+        """(file_size, mtime_ns, inode, file_checksum) of every indexed file of a workflow, by path"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT file_path, file_size, mtime_ns, inode, file_checksum
+                FROM auto_ingestion_scan_index WHERE workflow_id = ?
+            """, (workflow_id,))
+            return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+        finally:
+            conn.close()
+    
+    def upsert_scan_index(self, workflow_id: int, entries: List[tuple]):
+        """Record (file_path, file_size, mtime_ns, inode, file_checksum) entries for a workflow"""
+        if not entries:
+            return
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.executemany("""
+                INSERT INTO auto_ingestion_scan_index (workflow_id, file_path, file_size, mtime_ns, inode, file_checksum)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(workflow_id, file_path) DO UPDATE SET
+                    file_size = excluded.file_size, mtime_ns = excluded.mtime_ns, inode = excluded.inode,
+                    file_checksum = excluded.file_checksum, last_seen_at = CURRENT_TIMESTAMP
+            """, [(workflow_id, *entry) for entry in entries])
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def delete_scan_index_entries(self, workflow_id: int, file_paths: List[str]):
+        """Forget files that are no longer in a workflow's folder"""
+        if not file_paths:
+            return
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.executemany("DELETE FROM auto_ingestion_scan_index WHERE workflow_id = ? AND file_path = ?",
+                               [(workflow_id, path) for path in file_paths])
+            conn.commit()
+        finally:
+            conn.close()
+    
     # Log Operations
     def insert_workflow_log(self, log_data: Dict) -> int:
         """Insert workflow activity log"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -2453,7 +3174,7 @@ class IDMSDatabase:
     
     def get_workflow_logs(self, workflow_id: int, limit: int = 100) -> List[Dict]:
         """Get workflow logs"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -2472,7 +3193,7 @@ class IDMSDatabase:
     # Dashboard Statistics
     def get_auto_ingestion_dashboard_stats(self) -> Dict:
         """Get auto ingestion dashboard statistics"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -2513,6 +3234,207 @@ class IDMSDatabase:
         finally:
             conn.close()
 
+    # ==================== BATCH PROCESSING JOB TABLES ====================
+    
+    def create_processing_jobs_tables(self, cursor):
+        """Create batch processing job tables"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS processing_jobs (
+                id TEXT PRIMARY KEY,
+                user_id INTEGER,
+                created_by TEXT,
+                status TEXT DEFAULT 'pending', -- 'pending', 'running', 'completed', 'failed'
+                total_files INTEGER DEFAULT 0,
+                completed_files INTEGER DEFAULT 0,
+                failed_files INTEGER DEFAULT 0,
+                error_message TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                completed_at DATETIME,
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS processing_job_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                item_index INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                status TEXT DEFAULT 'pending', -- 'pending', 'processing', 'completed', 'failed'
+                result TEXT, -- JSON results keyed like /api/process_files/
+                error_message TEXT,
+                started_at DATETIME,
+                completed_at DATETIME,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (job_id) REFERENCES processing_jobs(id) ON DELETE CASCADE
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_job_items_job 
+            ON processing_job_items(job_id, item_index)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_jobs_status 
+            ON processing_jobs(status)
+        """)
+
+    # ==================== BATCH PROCESSING JOB OPERATIONS ====================
+    
+    def create_processing_job(self, job_id: str, user_id: int = None, created_by: str = None,
+                              items: List[Dict] = None) -> str:
+        """Create a batch processing job together with its file items"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        items = items or []
+        
+        try:
+            cursor.execute("""
+                INSERT INTO processing_jobs (id, user_id, created_by, total_files)
+                VALUES (?, ?, ?, ?)
+            """, (job_id, user_id, created_by, len(items)))
+            
+            cursor.executemany("""
+                INSERT INTO processing_job_items (job_id, item_index, filename, file_path)
+                VALUES (?, ?, ?, ?)
+            """, [(job_id, item['item_index'], item['filename'], item['file_path']) for item in items])
+            
+            conn.commit()
+            logger.info(f"Processing job {job_id} created with {len(items)} files")
+            return job_id
+        finally:
+            conn.close()
+    
+    def get_processing_job(self, job_id: str) -> Optional[Dict]:
+        """Get a batch processing job by ID"""
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("SELECT * FROM processing_jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+    
+    def get_processing_job_items(self, job_id: str) -> List[Dict]:
+        """Get the file items of a batch processing job in submission order"""
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT * FROM processing_job_items 
+                WHERE job_id = ?
+                ORDER BY item_index ASC
+            """, (job_id,))
+            
+            items = []
+            for row in cursor.fetchall():
+                item = dict(row)
+                item['result'] = json.loads(item['result']) if item['result'] else None
+                items.append(item)
+            return items
+        finally:
+            conn.close()
+    
+    def update_processing_job_item(self, item_id: int, status: str, result: Dict = None,
+                                   error_message: str = None) -> bool:
+        """Update a job item status and refresh the parent job counters"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            if status == 'processing':
+                cursor.execute("""
+                    UPDATE processing_job_items 
+                    SET status = ?, started_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (status, item_id))
+            else:
+                cursor.execute("""
+                    UPDATE processing_job_items 
+                    SET status = ?, result = ?, error_message = ?,
+                        completed_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (status, json.dumps(result) if result is not None else None, error_message, item_id))
+            
+            cursor.execute("""
+                UPDATE processing_jobs 
+                SET completed_files = (SELECT COUNT(*) FROM processing_job_items 
+                                       WHERE job_id = processing_jobs.id AND status = 'completed'),
+                    failed_files = (SELECT COUNT(*) FROM processing_job_items 
+                                    WHERE job_id = processing_jobs.id AND status = 'failed'),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = (SELECT job_id FROM processing_job_items WHERE id = ?)
+            """, (item_id,))
+            
+            conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating processing job item {item_id}: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    def update_processing_job_status(self, job_id: str, status: str, error_message: str = None) -> bool:
+        """Update batch processing job status"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            if status in ['completed', 'failed']:
+                cursor.execute("""
+                    UPDATE processing_jobs 
+                    SET status = ?, error_message = ?, completed_at = CURRENT_TIMESTAMP,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (status, error_message, job_id))
+            else:
+                cursor.execute("""
+                    UPDATE processing_jobs 
+                    SET status = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (status, job_id))
+            
+            conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating processing job status: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    def get_unfinished_processing_jobs(self) -> List[Dict]:
+        """Get jobs interrupted by a restart and reset their in-flight items to pending"""
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                UPDATE processing_job_items 
+                SET status = 'pending', started_at = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE status = 'processing' AND job_id IN (
+                    SELECT id FROM processing_jobs WHERE status IN ('pending', 'running')
+                )
+            """)
+            conn.commit()
+            
+            cursor.execute("""
+                SELECT * FROM processing_jobs 
+                WHERE status IN ('pending', 'running')
+                ORDER BY created_at ASC
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
 # Global database instance
 db = IDMSDatabase()
 # Run migration to add new columns to existing tables
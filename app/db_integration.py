@@ -8,6 +8,7 @@ import os
 from datetime import datetime
 from typing import Dict, List, Optional
 from database import db
+from utils import is_archive
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,7 +32,8 @@ class IDMSDataManager:
             return ""
     
     def save_document_processing(self, file_path: str, processing_result: Dict, 
-                               processing_start_time: datetime, processing_end_time: datetime) -> int:
+                               processing_start_time: datetime, processing_end_time: datetime,
+                               parent_archive_id: int = None) -> int:
         """Save document processing information to database"""
         
         # Calculate file information
@@ -78,34 +80,39 @@ class IDMSDataManager:
             'tags': processing_result.get('Tags', '').split(', ') if processing_result.get('Tags') else [],
             'summary': processing_result.get('summary', ''),
             'reasoning': processing_result.get('reasoning', ''),
-            'is_archive': file_ext in ['.zip', '.7z', '.tar', '.gz', '.bz2', '.xz', '.rar'],
+            'is_archive': is_archive(file_path),
+            'parent_archive_id': parent_archive_id,
             'checksum': self.calculate_file_checksum(file_path) if file_path else ''
         }
         
-        # Insert document record
-        document_id = self.db.insert_document(document_data)
+        # Document row, processing logs and FileNet upload row commit together
+        with self.db.transaction():
+            # Insert document record
+            document_id = self.db.insert_document(document_data)
         
-        # Log processing steps
-        self.log_processing_step(document_id, 'file_upload', 'completed', 
-                               processing_start_time, processing_start_time, 0)
+            # Log processing steps
+            self.log_processing_step(document_id, 'file_upload', 'completed', 
+                                   processing_start_time, processing_start_time, 0)
         
-        self.log_processing_step(document_id, 'ai_classification', 
-                               'completed' if processing_result.get('document_type') else 'failed',
-                               processing_start_time, processing_end_time, processing_duration,
-                               {'document_type': processing_result.get('document_type'),
-                                'confidence': processing_result.get('confidence_score')})
+            self.log_processing_step(document_id, 'ai_classification', 
+                                   'completed' if processing_result.get('document_type') else 'failed',
+                                   processing_start_time, processing_end_time, processing_duration,
+                                   {'document_type': processing_result.get('document_type'),
+                                    'confidence': processing_result.get('confidence_score')})
         
-        # Log FileNet upload if attempted
-        if 'filenet_upload' in processing_result:
-            filenet_status = 'success' if processing_result['filenet_upload'] == 'Success' else 'failed'
-            self.log_filenet_upload(document_id, 'classification', filenet_status,
-                                  processing_result.get('filenet_upload'))
+            # Link the queued FileNet upload, or log the upload if it was attempted inline
+            if 'filenet_upload_id' in processing_result:
+                self.db.link_filenet_upload(processing_result['filenet_upload_id'], document_id, 'documents')
+            elif 'filenet_upload' in processing_result:
+                filenet_status = 'success' if processing_result['filenet_upload'] == 'Success' else 'failed'
+                self.log_filenet_upload(document_id, 'classification', filenet_status,
+                                      processing_result.get('filenet_upload'))
         
         return document_id
     
     def save_ai_document_processing(self, file_path: str, processing_result: Dict, 
                                   processing_start_time: datetime, processing_end_time: datetime, 
-                                  user_data: Dict) -> int:
+                                  user_data: Dict, parent_archive_id: int = None) -> int:
         """Save AI document processing information to ai_document_classifications table"""
         
         # Calculate file information
@@ -156,31 +163,38 @@ class IDMSDataManager:
             'tags': processing_result.get('Tags', '').split(', ') if processing_result.get('Tags') else [],
             'summary': processing_result.get('summary', ''),
             'reasoning': processing_result.get('reasoning', ''),
-            'processing_status': 'completed' if processing_result.get('document_type') else 'failed',
+            'processing_status': processing_result.get('processing_status') or ('completed' if processing_result.get('document_type') else 'failed'),
             'ai_analysis_result': processing_result,
-            'filenet_upload_status': 'success' if processing_result.get('filenet_upload') == 'Success' else 'pending',
+            'filenet_upload_status': processing_result.get('filenet_upload_status') or
+                                     ('success' if processing_result.get('filenet_upload') == 'Success' else 'pending'),
             'filenet_document_id': processing_result.get('filenet_document_id', ''),
-            'error_message': processing_result.get('error_message', '')
+            'error_message': processing_result.get('error_message', ''),
+            'is_archive': is_archive(file_path),
+            'parent_archive_id': parent_archive_id
         }
         
-        # Insert document record into ai_document_classifications table
-        document_id = self.db.insert_ai_document_classification(document_data)
+        # Document row, processing logs and FileNet upload row commit together
+        with self.db.transaction():
+            # Insert document record into ai_document_classifications table
+            document_id = self.db.insert_ai_document_classification(document_data)
         
-        # Log processing steps
-        self.log_processing_step(document_id, 'file_upload', 'completed', 
-                               processing_start_time, processing_start_time, 0)
+            # Log processing steps
+            self.log_processing_step(document_id, 'file_upload', 'completed', 
+                                   processing_start_time, processing_start_time, 0)
         
-        self.log_processing_step(document_id, 'ai_classification', 
-                               'completed' if processing_result.get('document_type') else 'failed',
-                               processing_start_time, processing_end_time, processing_duration,
-                               {'document_type': processing_result.get('document_type'),
-                                'confidence': processing_result.get('confidence_score')})
+            self.log_processing_step(document_id, 'ai_classification', 
+                                   'completed' if processing_result.get('document_type') else 'failed',
+                                   processing_start_time, processing_end_time, processing_duration,
+                                   {'document_type': processing_result.get('document_type'),
+                                    'confidence': processing_result.get('confidence_score')})
         
-        # Log FileNet upload if attempted
-        if 'filenet_upload' in processing_result:
-            filenet_status = 'success' if processing_result['filenet_upload'] == 'Success' else 'failed'
-            self.log_filenet_upload(document_id, 'classification', filenet_status,
-                                  processing_result.get('filenet_upload'))
+            # Link the queued FileNet upload, or log the upload if it was attempted inline
+            if 'filenet_upload_id' in processing_result:
+                self.db.link_filenet_upload(processing_result['filenet_upload_id'], document_id, 'ai_document_classifications')
+            elif 'filenet_upload' in processing_result:
+                filenet_status = 'success' if processing_result['filenet_upload'] == 'Success' else 'failed'
+                self.log_filenet_upload(document_id, 'classification', filenet_status,
+                                      processing_result.get('filenet_upload'))
         
         return document_id
     
@@ -0,0 +1,684 @@
+"""
+Extractors Module
+Registry of content extractors keyed by file extension and sniffed magic bytes. Each extractor turns a file
+into an ExtractionResult; heavy libraries (pandas, PyPDF2, python-docx, PyYAML, Pillow) are only imported
+when their extractor first runs, and modules listed in EXTRACTOR_PLUGINS can register more formats.
+"""
+
+import os
+import io
+import re
+import json
+import base64
+import random
+import zipfile
+import importlib
+import threading
+import subprocess
+from html.parser import HTMLParser
+from xml.etree import ElementTree
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Iterable, List, Optional, Union
+import logging
+
+from utils import iter_archive_members, ARCHIVE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+# Character budget for document text sent to the LLM; extraction stops once it is reached
+MAX_CONTENT_CHARS = int(os.getenv("MAX_CONTENT_CHARS", "100000"))
+
+# Defaults for every extractor; EXTRACTOR_<NAME>_TIMEOUT_SECONDS / EXTRACTOR_<NAME>_MAX_FILE_MB override one
+EXTRACTOR_TIMEOUT_SECONDS = float(os.getenv("EXTRACTOR_TIMEOUT_SECONDS", "120"))
+EXTRACTOR_MAX_FILE_MB = float(os.getenv("EXTRACTOR_MAX_FILE_MB", "2048"))
+
+# Comma-separated modules imported on first use; they call register_extractor() to add or replace formats
+EXTRACTOR_PLUGINS = [name.strip() for name in os.getenv("EXTRACTOR_PLUGINS", "").split(",") if name.strip()]
+
+# PDF extraction limits (0 pages = no limit)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "0"))
+PDF_PAGE_TIMEOUT_SECONDS = float(os.getenv("PDF_PAGE_TIMEOUT_SECONDS", "10"))
+
+# Images are auto-oriented, downscaled to this longest edge and recompressed before the vision model sees them
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1600"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+
+# Tabular inputs: rows shown to the LLM, how they are picked ("head" or "stratified" across the
+# whole file) and a ceiling on the in-memory size of the sample
+TABULAR_SAMPLE_ROWS = int(os.getenv("TABULAR_SAMPLE_ROWS", "100"))
+TABULAR_SAMPLING = os.getenv("TABULAR_SAMPLING", "head").lower()
+TABULAR_MAX_SAMPLE_BYTES = int(os.getenv("TABULAR_MAX_SAMPLE_BYTES", str(8 * 1024 * 1024)))
+
+
+@dataclass
+class ExtractionResult:
+    """What an extractor produced: prompt text, base64 images or extracted archive members"""
+    kind: str = "text"  # 'text', 'image', 'archive' or 'error'
+    text: str = ""
+    images: List[str] = field(default_factory=list)
+    extracted_files: Iterable[str] = field(default_factory=list)  # archives: a generator extracting lazily
+    metadata: Dict = field(default_factory=dict)
+    truncated: bool = False
+    truncation_reason: Optional[str] = None
+    error: Optional[str] = None
+
+    def summary(self) -> Dict:
+        """Extraction details reported alongside the classification result"""
+        summary = dict(self.metadata, truncated=self.truncated, truncation_reason=self.truncation_reason)
+        if self.error:
+            summary['error'] = self.error
+        return summary
+
+
+@dataclass
+class Extractor:
+    """A registered extractor; target is a callable or a 'module:function' string imported on first use"""
+    name: str
+    target: Union[str, Callable]
+    extensions: tuple = ()
+    mime_types: tuple = ()
+    timeout: float = EXTRACTOR_TIMEOUT_SECONDS
+    max_bytes: int = int(EXTRACTOR_MAX_FILE_MB * 1024 * 1024)
+
+    def resolve(self) -> Callable:
+        if isinstance(self.target, str):
+            module_name, function_name = self.target.split(":")
+            self.target = getattr(importlib.import_module(module_name), function_name)
+        return self.target
+
+
+_extractors_by_extension: Dict[str, Extractor] = {}
+_extractors_by_mime: Dict[str, Extractor] = {}
+_plugins_loaded = False
+_plugins_lock = threading.Lock()
+
+
+def register_extractor(name: str, target: Union[str, Callable], extensions: tuple = (), mime_types: tuple = (),
+                       timeout: float = None, max_mb: float = None) -> Extractor:
+    """Register an extractor for file extensions and/or sniffed MIME types, replacing any previous one"""
+    env_name = re.sub(r'\W', '_', name).upper()
+    extractor = Extractor(
+        name=name,
+        target=target,
+        extensions=tuple(extension.lower() for extension in extensions),
+        mime_types=tuple(mime_types),
+        timeout=float(os.getenv(f"EXTRACTOR_{env_name}_TIMEOUT_SECONDS", timeout or EXTRACTOR_TIMEOUT_SECONDS)),
+        max_bytes=int(float(os.getenv(f"EXTRACTOR_{env_name}_MAX_FILE_MB", max_mb or EXTRACTOR_MAX_FILE_MB)) * 1024 * 1024)
+    )
+    for extension in extractor.extensions:
+        _extractors_by_extension[extension] = extractor
+    for mime_type in extractor.mime_types:
+        _extractors_by_mime[mime_type] = extractor
+    return extractor
+
+
+def load_plugins():
+    """Import the EXTRACTOR_PLUGINS modules once"""
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    with _plugins_lock:
+        if _plugins_loaded:
+            return
+        for module_name in EXTRACTOR_PLUGINS:
+            try:
+                importlib.import_module(module_name)
+                logger.info(f"Loaded extractor plugin {module_name}")
+            except Exception as e:
+                logger.error(f"Could not load extractor plugin {module_name}: {e}")
+        _plugins_loaded = True
+
+
+def get_supported_extensions() -> List[str]:
+    load_plugins()
+    return sorted(_extractors_by_extension)
+
+
+# ---------------------------------------------------------------------------
+# Magic-byte sniffing
+# ---------------------------------------------------------------------------
+
+ZIP_CONTAINER_TYPES = (
+    ('word/', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+    ('ppt/', 'application/vnd.openxmlformats-officedocument.presentationml.presentation'),
+    ('xl/', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+)
+
+MAGIC_NUMBERS = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'{\\rtf', 'application/rtf'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'),
+    (b"7z\xbc\xaf'\x1c", 'application/x-7z-compressed'),
+    (b'Rar!\x1a\x07', 'application/vnd.rar'),
+    (b'\x1f\x8b', 'application/gzip'),
+    (b'BZh', 'application/x-bzip2'),
+    (b'\xfd7zXZ\x00', 'application/x-xz'),
+)
+
+EMAIL_HEADERS = (b'received:', b'return-path:', b'from:', b'mime-version:', b'message-id:', b'delivered-to:')
+
+
+def sniff_mime_type(file_path: str) -> Optional[str]:
+    """Guess a file's MIME type from its leading bytes (None if unrecognised)"""
+    try:
+        with open(file_path, 'rb') as f:
+            head = f.read(4096)
+    except OSError:
+        return None
+
+    if head.startswith(b'PK\x03\x04'):
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                names = archive.namelist()
+                if 'mimetype' in names:
+                    return archive.read('mimetype').decode('ascii', 'ignore').strip()
+        except (zipfile.BadZipFile, OSError):
+            return 'application/zip'
+        for prefix, mime_type in ZIP_CONTAINER_TYPES:
+            if any(name.startswith(prefix) for name in names):
+                return mime_type
+        return 'application/zip'
+
+    for magic, mime_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return mime_type
+    if head[257:262] == b'ustar':
+        return 'application/x-tar'
+
+    start = head.lstrip().lower()
+    if start.startswith((b'<!doctype html', b'<html')):
+        return 'text/html'
+    if start.startswith(EMAIL_HEADERS):
+        return 'message/rfc822'
+    if start.startswith((b'{', b'[')):
+        return 'application/json'
+    try:
+        head.decode('utf-8')
+        return 'text/plain'
+    except UnicodeDecodeError:
+        return None
+
+
+def get_extractor(file_path: str) -> Optional[Extractor]:
+    """Pick the extractor by extension, falling back to sniffed magic bytes"""
+    load_plugins()
+    extension = os.path.splitext(file_path)[-1].lower()
+    if extension in _extractors_by_extension:
+        return _extractors_by_extension[extension]
+    return _extractors_by_mime.get(sniff_mime_type(file_path))
+
+
+def extract(file_path: str) -> ExtractionResult:
+    """Run the matching extractor under its size limit and timeout"""
+    logger.info(f"Reading file: {file_path}")
+    extractor = get_extractor(file_path)
+    if extractor is None:
+        return ExtractionResult(kind="error", error="Unsupported file type")
+
+    file_size = os.path.getsize(file_path)
+    if file_size > extractor.max_bytes:
+        return ExtractionResult(kind="error", metadata={'extractor': extractor.name, 'file_size': file_size},
+                                error=f"File exceeds the {extractor.max_bytes // (1024 * 1024)} MB limit for {extractor.name}")
+
+    # The extractor runs on a helper thread so a stuck parser cannot hold the caller past its timeout
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"idms-extract-{extractor.name}")
+    try:
+        result = executor.submit(extractor.resolve(), file_path).result(timeout=extractor.timeout)
+    except FutureTimeoutError:
+        logger.error(f"{extractor.name} extractor timed out after {extractor.timeout}s on {file_path}")
+        result = ExtractionResult(kind="error", error=f"Extraction timed out after {extractor.timeout}s")
+    except Exception as e:
+        logger.error(f"{extractor.name} extractor failed on {file_path}: {e}")
+        result = ExtractionResult(kind="error", error=str(e))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    result.metadata.setdefault('extractor', extractor.name)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Built-in extractors
+# ---------------------------------------------------------------------------
+
+def text_result(text: str, max_chars: int = MAX_CONTENT_CHARS, **metadata) -> ExtractionResult:
+    """Wrap text in a result, cutting it to the character budget"""
+    truncated = len(text) > max_chars
+    return ExtractionResult(text=text[:max_chars], metadata=metadata, truncated=truncated,
+                            truncation_reason="max_chars" if truncated else None)
+
+
+def read_text(file_path: str, max_chars: int = MAX_CONTENT_CHARS) -> str:
+    """Read at most one character past the budget, so truncation can be detected"""
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read(max_chars + 1)
+
+
+def extract_plain_text(file_path: str) -> ExtractionResult:
+    return text_result(read_text(file_path))
+
+
+def extract_json(file_path: str) -> ExtractionResult:
+    with open(file_path, 'r', encoding='UTF-8') as f:
+        content = f.read()
+    if not content.strip():
+        return ExtractionResult(kind="error", error="The file is empty")
+    data = json.loads(content)
+    return text_result(json.dumps(data, ensure_ascii=False, default=str), top_level_type=type(data).__name__)
+
+
+def extract_yaml(file_path: str) -> ExtractionResult:
+    import yaml
+    with open(file_path, 'r', encoding='UTF-8') as f:
+        data = yaml.safe_load(f)
+    if data is None:
+        return ExtractionResult(kind="error", error="The file is empty")
+    return text_result(json.dumps(data, ensure_ascii=False, default=str), top_level_type=type(data).__name__)
+
+
+ODT_TEXT_NAMESPACE = 'urn:oasis:names:tc:opendocument:xmlns:text:1.0'
+
+
+def extract_odt(file_path: str) -> ExtractionResult:
+    with zipfile.ZipFile(file_path, 'r') as archive:
+        root = ElementTree.fromstring(archive.read("content.xml"))
+    paragraphs = (''.join(paragraph.itertext()) for paragraph in root.iter(f'{{{ODT_TEXT_NAMESPACE}}}p'))
+    return text_result('\n'.join(text for text in paragraphs if text))
+
+
+def extract_docx(file_path: str) -> ExtractionResult:
+    from docx import Document
+    document = Document(file_path)
+    return text_result(' '.join(paragraph.text for paragraph in document.paragraphs))
+
+
+def extract_doc(file_path: str) -> ExtractionResult:
+    """Legacy Word documents via the antiword CLI, or the document's text runs if it is not installed"""
+    try:
+        output = subprocess.run(['antiword', file_path], capture_output=True, check=True).stdout
+        return text_result(output.decode('utf-8', errors='replace'), method="antiword")
+    except FileNotFoundError:
+        logger.debug("antiword not installed, falling back to raw text runs")
+
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    # Word stores text either as 8-bit or UTF-16LE runs; keep whichever encoding yields more text
+    ascii_runs = [run.decode('latin-1') for run in re.findall(rb'[\x20-\x7e\t\r\n]{4,}', data)]
+    utf16_runs = [run.decode('utf-16-le') for run in re.findall(rb'(?:[\x20-\x7e\t\r\n]\x00){4,}', data)]
+    runs = max(ascii_runs, utf16_runs, key=lambda items: sum(map(len, items)))
+    return text_result('\n'.join(runs), method="text_runs")
+
+
+PPTX_DRAWING_NAMESPACE = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+
+
+def extract_pptx(file_path: str) -> ExtractionResult:
+    with zipfile.ZipFile(file_path, 'r') as archive:
+        slide_names = sorted(
+            (name for name in archive.namelist() if re.fullmatch(r'ppt/slides/slide\d+\.xml', name)),
+            key=lambda name: int(re.search(r'(\d+)\.xml$', name).group(1))
+        )
+        slides, chars = [], 0
+        for name in slide_names:
+            root = ElementTree.fromstring(archive.read(name))
+            paragraphs = (''.join(node.text or '' for node in paragraph.iter(f'{{{PPTX_DRAWING_NAMESPACE}}}t'))
+                          for paragraph in root.iter(f'{{{PPTX_DRAWING_NAMESPACE}}}p'))
+            slides.append('\n'.join(text for text in paragraphs if text))
+            chars += len(slides[-1])
+            if chars > MAX_CONTENT_CHARS:
+                break
+    return text_result('\n\n'.join(slides), slides_total=len(slide_names), slides_read=len(slides))
+
+
+def rtf_to_text(rtf: str) -> str:
+    """Strip RTF markup, keeping paragraph breaks and escaped characters"""
+    text = rtf.replace('\\\\', '\x00').replace('\\{', '\x01').replace('\\}', '\x02')
+    # Drop header tables and ignorable destinations (\*\...) including their nested groups
+    text = re.sub(r'\{\\(?:\*|fonttbl|colortbl|stylesheet|info|pict)(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}', '', text)
+    text = re.sub(r"\\'([0-9a-fA-F]{2})", lambda m: bytes.fromhex(m.group(1)).decode('cp1252', errors='replace'), text)
+    text = re.sub(r'\\u(-?\d+)\??', lambda m: chr(int(m.group(1)) % 65536), text)
+    text = re.sub(r'\\(?:par|line)\b-?\d* ?', '\n', text)
+    text = re.sub(r'\\tab\b ?', '\t', text)
+    text = re.sub(r'\\[a-zA-Z]+-?\d* ?', '', text)
+    text = text.replace('{', '').replace('}', '')
+    return text.replace('\x00', '\\').replace('\x01', '{').replace('\x02', '}').strip()
+
+
+def extract_rtf(file_path: str) -> ExtractionResult:
+    with open(file_path, 'r', encoding='latin-1') as f:
+        return text_result(rtf_to_text(f.read()))
+
+
+class HTMLTextParser(HTMLParser):
+    """Collects visible text, skipping scripts and styles"""
+    SKIPPED_TAGS = {'script', 'style', 'head', 'noscript', 'template'}
+    BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section', 'article', 'table'}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self.skip_depth and data.strip():
+            self.parts.append(data.strip() + ' ')
+
+    def get_text(self) -> str:
+        return re.sub(r'\n\s*\n+', '\n', ''.join(self.parts)).strip()
+
+
+def html_to_text(html: str) -> str:
+    parser = HTMLTextParser()
+    parser.feed(html)
+    parser.close()
+    return parser.get_text()
+
+
+def extract_html(file_path: str) -> ExtractionResult:
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        return text_result(html_to_text(f.read()))
+
+
+def extract_eml(file_path: str) -> ExtractionResult:
+    from email import policy
+    from email.parser import BytesParser
+
+    with open(file_path, 'rb') as f:
+        message = BytesParser(policy=policy.default).parse(f)
+
+    headers = [f"{name}: {message[name]}" for name in ('From', 'To', 'Cc', 'Date', 'Subject') if message[name]]
+    body_part = message.get_body(preferencelist=('plain', 'html'))
+    body = body_part.get_content() if body_part else ""
+    if body_part and body_part.get_content_type() == 'text/html':
+        body = html_to_text(body)
+    attachments = [part.get_filename() for part in message.iter_attachments() if part.get_filename()]
+
+    text = '\n'.join(headers) + '\n\n' + body
+    if attachments:
+        text += '\n\nAttachments: ' + ', '.join(attachments)
+    return text_result(text, attachments=len(attachments))
+
+
+IMAGE_MIME_TYPES = {'.png': 'image/png', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg'}
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+
+def prepare_image(image, original_bytes: bytes = None, original_mime: str = None) -> ExtractionResult:
+    """Auto-orient, cap the longest edge at IMAGE_MAX_EDGE and recompress for the vision model.
+    The original bytes are sent unchanged when they need no rotation or resizing and are already smaller."""
+    from PIL import Image, ImageOps
+
+    original_size = image.size
+    rotated = image.getexif().get(EXIF_ORIENTATION_TAG, 1) != 1
+    image = ImageOps.exif_transpose(image)
+    resized = max(image.size) > IMAGE_MAX_EDGE
+    if resized:
+        image.thumbnail((IMAGE_MAX_EDGE, IMAGE_MAX_EDGE), Image.LANCZOS)
+
+    # Keep PNG for images with transparency, JPEG for everything else
+    buffer = io.BytesIO()
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image.save(buffer, format='PNG', optimize=True)
+        mime_type = 'image/png'
+    else:
+        image.convert('RGB').save(buffer, format='JPEG', quality=IMAGE_JPEG_QUALITY, optimize=True)
+        mime_type = 'image/jpeg'
+    sent_bytes = buffer.getvalue()
+
+    if original_bytes is not None and original_mime and not rotated and not resized and len(original_bytes) <= len(sent_bytes):
+        sent_bytes, mime_type = original_bytes, original_mime
+
+    return ExtractionResult(kind="image", images=[base64.b64encode(sent_bytes).decode("utf-8")], metadata={
+        'mime_type': mime_type,
+        'original_width': original_size[0],
+        'original_height': original_size[1],
+        'sent_width': image.size[0],
+        'sent_height': image.size[1],
+        'original_bytes': len(original_bytes) if original_bytes is not None else None,
+        'sent_bytes': len(sent_bytes)
+    })
+
+
+def extract_image(file_path: str) -> ExtractionResult:
+    with open(file_path, "rb") as img:
+        original_bytes = img.read()
+    mime_type = IMAGE_MIME_TYPES.get(os.path.splitext(file_path)[-1].lower()) or sniff_mime_type(file_path)
+
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("Pillow is not installed; sending images unprocessed")
+        return ExtractionResult(kind="image", images=[base64.b64encode(original_bytes).decode("utf-8")],
+                                metadata={'mime_type': mime_type, 'original_bytes': len(original_bytes),
+                                          'sent_bytes': len(original_bytes)})
+
+    with Image.open(io.BytesIO(original_bytes)) as image:
+        image.load()
+        return prepare_image(image, original_bytes, mime_type)
+
+
+def extract_tiff(file_path: str) -> ExtractionResult:
+    """First TIFF frame, re-encoded for the vision model"""
+    from PIL import Image
+    with Image.open(file_path) as image:
+        frames = getattr(image, 'n_frames', 1)
+        image.load()
+        result = prepare_image(image)
+    result.metadata.update(original_bytes=os.path.getsize(file_path), frames_total=frames, frames_read=1)
+    if frames > 1:
+        result.truncated, result.truncation_reason = True, "max_frames"
+    return result
+
+
+def extract_archive_files(file_path: str) -> ExtractionResult:
+    """Members are extracted lazily, one per iteration step, as the caller consumes extracted_files"""
+    extract_to_dir = os.path.splitext(file_path)[0]  # Use a folder named after the archive file
+    os.makedirs(extract_to_dir, exist_ok=True)
+    return ExtractionResult(kind="archive", extracted_files=iter_archive_members(file_path, extract_to_dir))
+
+
+def iter_pdf_pages(reader, max_pages=0, page_timeout=PDF_PAGE_TIMEOUT_SECONDS):
+    """ Lazily yield (page_number, text) for each page; raises TimeoutError if a page takes too long """
+    page_count = len(reader.pages)
+    if max_pages:
+        page_count = min(page_count, max_pages)
+
+    # Pages are extracted one at a time on a helper thread so a pathological page can be abandoned
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="idms-pdf")
+    try:
+        for page_number in range(page_count):
+            future = executor.submit(lambda index=page_number: reader.pages[index].extract_text() or "")
+            try:
+                yield page_number + 1, future.result(timeout=page_timeout)
+            except FutureTimeoutError:
+                raise TimeoutError(f"Page {page_number + 1} took longer than {page_timeout}s")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def read_pdf(file_path, max_chars=MAX_CONTENT_CHARS, max_pages=PDF_MAX_PAGES, page_timeout=PDF_PAGE_TIMEOUT_SECONDS):
+    """ Extract PDF text page by page until the character budget, page limit or a page timeout is hit """
+    from PyPDF2 import PdfReader
+    reader = PdfReader(file_path)
+    pages_total = len(reader.pages)
+    parts, chars, pages_read, truncation_reason = [], 0, 0, None
+
+    try:
+        for page_number, page_text in iter_pdf_pages(reader, max_pages, page_timeout):
+            parts.append(page_text[:max_chars - chars])
+            chars += len(parts[-1])
+            pages_read = page_number
+            if chars >= max_chars:
+                if len(page_text) > len(parts[-1]) or page_number < pages_total:
+                    truncation_reason = "max_chars"
+                break
+    except TimeoutError as e:
+        logger.warning(f"Stopped reading {file_path}: {e}")
+        truncation_reason = "page_timeout"
+
+    if truncation_reason is None and pages_read < pages_total:
+        truncation_reason = "max_pages"
+
+    return ExtractionResult(
+        text="\n".join(parts),
+        metadata={
+            'pages_total': pages_total,
+            'pages_read': pages_read,
+            'pages_skipped': pages_total - pages_read,
+            'chars_extracted': chars
+        },
+        truncated=truncation_reason is not None,
+        truncation_reason=truncation_reason
+    )
+
+
+def sample_csv(file_path, sample_rows, sampling):
+    """ Return (sample DataFrame, estimated data row count) reading only the sampled rows """
+    import pandas as pd
+    file_size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+        head = f.read(64 * 1024)
+        # Row lengths tend to grow through a file (ids, timestamps), so also measure its tail
+        f.seek(max(f.tell(), file_size - 64 * 1024))
+        tail = f.read()
+    measured = head + tail
+    line_count = measured.count(b'\n') + (1 if measured and not measured.endswith(b'\n') else 0)
+    rows_estimate = round((file_size - data_start) * line_count / len(measured)) if measured else 0
+
+    if sampling != "stratified" or rows_estimate <= sample_rows:
+        return pd.read_csv(file_path, nrows=sample_rows), rows_estimate
+
+    # Stratified: seek to evenly spaced offsets and take the first full row after each one
+    lines, last_start = [], None
+    with open(file_path, 'rb') as f:
+        for i in range(sample_rows):
+            f.seek(data_start + (file_size - data_start) * i // sample_rows)
+            if i:
+                f.readline()
+            row_start = f.tell()
+            line = f.readline()
+            if row_start != last_start and line.strip():
+                lines.append(line if line.endswith(b'\n') else line + b'\n')
+            last_start = row_start
+    sample = pd.read_csv(io.BytesIO(header + b''.join(lines)), on_bad_lines='skip')
+    return sample, rows_estimate
+
+
+def sample_excel(file_path, sample_rows, sampling):
+    """ Return (sample DataFrame, data row count or None) streaming the first sheet """
+    import pandas as pd
+    if os.path.splitext(file_path)[-1].lower() == '.xls':
+        # openpyxl cannot stream legacy .xls workbooks; read just the first rows
+        return pd.read_excel(file_path, nrows=sample_rows), None
+
+    from openpyxl import load_workbook
+    with open(file_path, 'rb') as f:
+        workbook = load_workbook(f, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            rows_total = sheet.max_row - 1 if sheet.max_row else None
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, ())
+            columns = [str(name) if name is not None else f"column_{i + 1}" for i, name in enumerate(header)]
+
+            if sampling == "stratified" and rows_total and rows_total > sample_rows:
+                wanted = {rows_total * i // sample_rows for i in range(sample_rows)}
+                sample = [row for index, row in enumerate(rows) if index in wanted]
+            elif sampling == "stratified" and rows_total is None:
+                # No dimension record in the sheet: reservoir-sample while counting the rows
+                sample, rows_total = [], 0
+                picker = random.Random(0)
+                for index, row in enumerate(rows):
+                    rows_total = index + 1
+                    if index < sample_rows:
+                        sample.append(row)
+                    else:
+                        slot = picker.randint(0, index)
+                        if slot < sample_rows:
+                            sample[slot] = row
+            else:
+                sample = [row for _, row in zip(range(sample_rows), rows)]
+                if rows_total is None and len(sample) < sample_rows:
+                    rows_total = len(sample)
+        finally:
+            workbook.close()
+
+    return pd.DataFrame(sample, columns=columns).infer_objects(), rows_total
+
+
+def summarize_columns(df):
+    """ One line per column: dtype, filled cells in the sample and an example value """
+    lines = []
+    for column in df.columns:
+        values = df[column].dropna()
+        example = str(values.iloc[0])[:50] if len(values) else ""
+        lines.append(f"- {column} ({df[column].dtype}, {len(values)}/{len(df)} filled) e.g. {example}")
+    return "\n".join(lines)
+
+
+def read_table(file_path, sample_rows=TABULAR_SAMPLE_ROWS, sampling=TABULAR_SAMPLING, max_sample_bytes=TABULAR_MAX_SAMPLE_BYTES):
+    """ Read a bounded sample of a CSV/Excel file plus a column summary, never the whole table """
+    if os.path.splitext(file_path)[-1].lower() == '.csv':
+        sample, rows_total = sample_csv(file_path, sample_rows, sampling)
+    else:
+        sample, rows_total = sample_excel(file_path, sample_rows, sampling)
+
+    # Keep the sample under the memory ceiling by thinning rows evenly
+    sample_bytes = int(sample.memory_usage(deep=True).sum())
+    if sample_bytes > max_sample_bytes:
+        sample = sample.iloc[::-(-sample_bytes // max_sample_bytes)]
+
+    rows_label = f"about {rows_total}" if rows_total is not None else "an unknown number of"
+    text = (
+        f"Table with {len(sample.columns)} columns and {rows_label} rows.\n"
+        f"Columns:\n{summarize_columns(sample)}\n\n"
+        f"Sample of {len(sample)} rows ({sampling}):\n{sample.to_string()}"
+    )
+    truncated = rows_total is None or rows_total > len(sample)
+    result = text_result(text, rows_total=rows_total, rows_sampled=len(sample),
+                         columns=len(sample.columns), sampling=sampling)
+    if truncated and not result.truncated:
+        result.truncated, result.truncation_reason = True, "sampled"
+    return result
+
+
+CODE_EXTENSIONS = ('.txt', '.cpp', '.java', '.php', '.py', '.bat')
+
+register_extractor("pdf", read_pdf, ('.pdf',), ('application/pdf',))
+register_extractor("table", read_table, ('.csv', '.xls', '.xlsx'),
+                   ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',))
+register_extractor("json", extract_json, ('.json',), ('application/json',))
+register_extractor("yaml", extract_yaml, ('.yaml', '.yml'))
+register_extractor("odt", extract_odt, ('.odt',), ('application/vnd.oasis.opendocument.text',))
+register_extractor("docx", extract_docx, ('.docx',),
+                   ('application/vnd.openxmlformats-officedocument.wordprocessingml.document',))
+register_extractor("doc", extract_doc, ('.doc',), ('application/msword',))
+register_extractor("pptx", extract_pptx, ('.pptx',),
+                   ('application/vnd.openxmlformats-officedocument.presentationml.presentation',))
+register_extractor("rtf", extract_rtf, ('.rtf',), ('application/rtf',), max_mb=200)
+register_extractor("eml", extract_eml, ('.eml',), ('message/rfc822',), max_mb=100)
+register_extractor("html", extract_html, ('.html', '.htm'), ('text/html',), max_mb=100)
+register_extractor("image", extract_image, ('.png', '.jpg', '.jpeg'), ('image/png', 'image/jpeg'), max_mb=50)
+register_extractor("tiff", extract_tiff, ('.tif', '.tiff'), ('image/tiff',), max_mb=200)
+register_extractor("text", extract_plain_text, CODE_EXTENSIONS, ('text/plain',))
+register_extractor("archive", extract_archive_files, ARCHIVE_EXTENSIONS,
+                   ('application/zip', 'application/x-7z-compressed', 'application/vnd.rar', 'application/gzip',
+                    'application/x-bzip2', 'application/x-xz', 'application/x-tar'), timeout=600)
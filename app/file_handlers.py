@@ -1,18 +1,22 @@
 import os
-import pandas as pd
-from utils import read_file
-from prompts import prompt
+import threading
+from extractors import extract
+from utils import ARCHIVE_EXTENSIONS, ARCHIVE_ERRORS
+from prompt_builder import build_prompt, category_block
 from classifier import call_llm_image, call_llm_text
+from batch_classifier import batch_classifier
+from pre_classifier import pre_classifier
+from classification_cache import classification_cache, is_cacheable_result, CACHE_ENABLED
 import logging
 
 CATEGORIES_FILE = r"./existing_categories.txt"
 
+# Serialises category file updates when files are classified in parallel
+_categories_lock = threading.Lock()
+
 def load_existing_categories(filepath: str = CATEGORIES_FILE):
-    if not os.path.exists(filepath):
-        return []
-    with open(filepath, "r", encoding="utf-8") as f:
-        categories = [line.strip() for line in f if line.strip()]
-    return categories
+    # Cached by the prompt builder until the file changes
+    return list(category_block.categories(filepath))
 
 def add_category_if_new(new_category: str, filepath: str = CATEGORIES_FILE):
     """Add new category to file if it's not already present."""
@@ -23,49 +27,90 @@ def add_category_if_new(new_category: str, filepath: str = CATEGORIES_FILE):
         logging.debug(f"Skipped adding invalid category: '{new_category}'")
         return
 
-    categories = load_existing_categories(filepath)
-    if new_category not in categories:
-        with open(filepath, "a", encoding="utf-8") as f:
-            f.write(new_category + "\n")
-        logging.info(f"New category added: {new_category}")
-    else:
-        logging.debug(f"Category already exists: {new_category}")
+    with _categories_lock:
+        categories = load_existing_categories(filepath)
+        if new_category not in categories:
+            with open(filepath, "a", encoding="utf-8") as f:
+                f.write(new_category + "\n")
+            logging.info(f"New category added: {new_category}")
+        else:
+            logging.debug(f"Category already exists: {new_category}")
 
 def handle_file(file_path):
-    """ Handle file based on its extension and classify it """
-    # Load categories from txt file
-    existing_categories = load_existing_categories()
-    categories_str = ", ".join(existing_categories)
-
+    """ Extract a file's content with the matching extractor and classify it """
     # Read the content
-    content = read_file(file_path)
+    content = extract(file_path)
 
-    if isinstance(content, dict) and content.get("file_type") == "zip":
+    if content.kind == "archive":
         results = {}
-        for extracted_file in content.get("extracted_files", []):
-            logging.info(f"Processing extracted file: {extracted_file}")
-            result = handle_file(extracted_file)
-            results[extracted_file] = result
+        try:
+            # Members are extracted one at a time as the loop advances
+            for extracted_file in content.extracted_files:
+                logging.info(f"Processing extracted file: {extracted_file}")
+                result = classify_file(extracted_file)
+                results[extracted_file] = result
+        except ARCHIVE_ERRORS as e:
+            logging.error(f"Stopped extracting archive {file_path} after {len(results)} files: {e}")
         return results
 
-    if isinstance(content, dict) and content.get("file_type") == "image":
-        updated_prompt = prompt.replace("{existing_categories}", categories_str).replace("{content}", "Image content")
-        return call_llm_image(content.get("img"), updated_prompt)
-
-    elif isinstance(content, list) and all(isinstance(i, dict) for i in content):
-        content_str = str(content[:100000])
-    elif isinstance(content, pd.DataFrame):
-        content_str = content.head(100).to_string()
-    elif isinstance(content, str):
-        content_str = content[:100000]
-    else:
+    if content.kind == "error":
+        logging.warning(f"Could not extract {file_path}: {content.error}")
         return {
             "document_type": "Unknown",
             "Tags": "",
             "summary": "",
-            "reasoning": "Unsupported file type or failed to read content."
+            "reasoning": "Unsupported file type or failed to read content.",
+            "extraction": content.summary()
         }
 
-    updated_prompt = prompt.replace("{existing_categories}", categories_str).replace("{content}", content_str)
+    # The prompt is fitted to the model's context window, cutting the categories list and the text if needed
+    if content.kind == "image":
+        built_prompt = build_prompt("Image content", CATEGORIES_FILE)
+        result = call_llm_image(content.images[0], built_prompt.text, content.metadata.get("mime_type") or "image/png")
+        prompt_summary = built_prompt.summary()
+    else:
+        # Confident local matches skip the LLM; the rest are escalated and their answers train the local model
+        guess = pre_classifier.classify(content.text, load_existing_categories()) if pre_classifier.enabled else None
+        answered_locally = pre_classifier.enabled and pre_classifier.should_skip_llm(guess)
+        if answered_locally:
+            result, prompt_summary = guess.to_result(), {"prompt_tokens_estimate": 0}
+        elif batch_classifier.accepts(content):
+            # Small text documents share an LLM call with others classified at the same time
+            result, prompt_summary = batch_classifier.classify(content.text, CATEGORIES_FILE)
+        else:
+            built_prompt = build_prompt(content.text, CATEGORIES_FILE)
+            result = call_llm_text(built_prompt.text)
+            prompt_summary = built_prompt.summary()
+        if pre_classifier.enabled and not answered_locally:
+            pre_classifier.record_llm_result(content.text, guess, result)
+
+    # Report how much of the document the classification was based on (and, for images, what it cost)
+    if isinstance(result, dict):
+        result["extraction"] = content.summary()
+        result["extraction"].update(prompt_summary)
+        result["extraction"].update(result.pop("token_usage", None) or {})
+        if content.kind == "image":
+            logging.info(f"Image {file_path}: {result['extraction'].get('original_bytes')} -> "
+                         f"{result['extraction'].get('sent_bytes')} bytes, "
+                         f"{result['extraction'].get('prompt_tokens')} prompt tokens")
+    return result
+
+def classify_file(file_path):
+    """ Classify a file, serving repeat content from the classification cache """
+    if not CACHE_ENABLED or file_path.lower().endswith(ARCHIVE_EXTENSIONS) or not os.path.isfile(file_path):
+        # Archive members are cached individually while handle_file walks the archive
+        return handle_file(file_path)
+
+    cache_key = classification_cache.make_key(file_path, load_existing_categories())
+    if cache_key:
+        cached_result = classification_cache.get(cache_key)
+        if cached_result is not None:
+            logging.info(f"Classification cache hit for {file_path}")
+            return cached_result
+
+    result = handle_file(file_path)
+
+    if cache_key and is_cacheable_result(result):
+        classification_cache.put(cache_key, result)
 
-    return call_llm_text(updated_prompt)
\ No newline at end of file
+    return result
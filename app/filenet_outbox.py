@@ -0,0 +1,186 @@
+"""
+FileNet Upload Outbox Module
+Durable queue of FileNet uploads (filenet_uploads rows) drained by a background uploader,
+so classification responses no longer wait for FileNet
+"""
+
+import os
+import uuid
+import random
+import shutil
+import asyncio
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+import logging
+
+from database import db
+from filenet_worker import upload_to_filenet, FILENET_WORKER_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Files are staged here until uploaded, since the original temp/ingestion paths are removed or renamed
+FILENET_OUTBOX_DIR = os.getenv("FILENET_OUTBOX_DIR", "./filenet_outbox")
+
+FILENET_OUTBOX_BATCH_SIZE = int(os.getenv("FILENET_OUTBOX_BATCH_SIZE", "20"))
+FILENET_OUTBOX_POLL_SECONDS = float(os.getenv("FILENET_OUTBOX_POLL_SECONDS", "2"))
+FILENET_OUTBOX_MAX_RETRIES = int(os.getenv("FILENET_OUTBOX_MAX_RETRIES", "5"))
+FILENET_OUTBOX_BACKOFF_SECONDS = float(os.getenv("FILENET_OUTBOX_BACKOFF_SECONDS", "30"))
+FILENET_OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("FILENET_OUTBOX_MAX_BACKOFF_SECONDS", "3600"))
+
+# Uploads of one batch run in parallel, one per resident FileNet worker
+upload_executor = ThreadPoolExecutor(max_workers=max(1, FILENET_WORKER_POOL_SIZE), thread_name_prefix="idms-filenet")
+
+uploader_task: Optional[asyncio.Task] = None
+
+
+def stage_file(file_path: str) -> str:
+    """Hard-link (or copy) the file into the outbox folder, keeping its original name"""
+    staged_dir = os.path.join(FILENET_OUTBOX_DIR, uuid.uuid4().hex)
+    os.makedirs(staged_dir, exist_ok=True)
+    staged_path = os.path.join(staged_dir, os.path.basename(file_path))
+    try:
+        os.link(file_path, staged_path)
+    except OSError:
+        shutil.copy2(file_path, staged_path)
+    return staged_path
+
+
+def remove_staged_file(staged_path: str):
+    staged_dir = os.path.dirname(staged_path)
+    if os.path.abspath(os.path.dirname(staged_dir)) == os.path.abspath(FILENET_OUTBOX_DIR):
+        shutil.rmtree(staged_dir, ignore_errors=True)
+
+
+def enqueue_upload(file_path: str, document_type: str, confidentiality: str, storage_type: str,
+                   retention_period: str, id_number: str) -> int:
+    """Stage a file and add it to the outbox; returns the filenet_uploads row id"""
+    staged_path = stage_file(file_path)
+    try:
+        upload_id = db.enqueue_filenet_upload({
+            'file_path': staged_path,
+            'document_type': document_type,
+            'confidentiality': confidentiality,
+            'storage_type': storage_type,
+            'retention_period': retention_period,
+            'id_number': id_number
+        })
+    except Exception:
+        remove_staged_file(staged_path)
+        raise
+
+    logger.info(f"Queued FileNet upload {upload_id} for {file_path}")
+    return upload_id
+
+
+def get_retry_delay(retry_count: int) -> float:
+    """Exponential backoff with jitter"""
+    delay = min(FILENET_OUTBOX_BACKOFF_SECONDS * (2 ** (retry_count - 1)), FILENET_OUTBOX_MAX_BACKOFF_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def upload_one(upload: Dict) -> Dict:
+    """Upload a single outbox row and return its outcome"""
+    retry_count = upload['retry_count'] or 0
+    try:
+        output = upload_to_filenet(
+            upload['file_path'],
+            upload['document_type'],
+            upload['confidentiality'],
+            upload['storage_type'],
+            upload['retention_period'],
+            upload['id_number']
+        )
+        logger.info(f"FileNet upload successful for {upload['file_path']}: {output}")
+        remove_staged_file(upload['file_path'])
+        # Whatever location or document id the worker/CLI reports; NULL if it reports nothing
+        return {'id': upload['id'], 'upload_status': 'success', 'retry_count': retry_count,
+                'filenet_path': (output or '').strip() or None}
+
+    except subprocess.CalledProcessError as e:
+        error_message = f"Failed: {e.stderr}"
+    except Exception as e:
+        error_message = f"Failed: {str(e)}"
+
+    retry_count += 1
+    logger.error(f"FileNet upload failed for {upload['file_path']} (attempt {retry_count}): {error_message}")
+
+    if retry_count >= FILENET_OUTBOX_MAX_RETRIES:
+        remove_staged_file(upload['file_path'])
+        return {'id': upload['id'], 'upload_status': 'failed', 'retry_count': retry_count,
+                'error_message': error_message}
+
+    return {'id': upload['id'], 'upload_status': 'pending', 'retry_count': retry_count,
+            'error_message': error_message, 'retry_delay_seconds': get_retry_delay(retry_count)}
+
+
+def process_outbox_batch() -> int:
+    """Claim one batch of due uploads, upload them across all workers and record outcomes"""
+    uploads = db.claim_filenet_uploads(FILENET_OUTBOX_BATCH_SIZE)
+    if not uploads:
+        return 0
+
+    # Ordered by target folder (document type) so each folder's files go out together; the worker
+    # protocol has no multi-document upload yet, so every file is still its own request
+    folder = lambda upload: upload['document_type'] or ''
+    uploads.sort(key=folder)
+    folders = ", ".join(f"'{name}': {count}" for name, count in Counter(map(folder, uploads)).items())
+    logger.info(f"Uploading {len(uploads)} documents to FileNet ({folders})")
+    outcomes = list(upload_executor.map(upload_one, uploads))
+    db.complete_filenet_uploads(outcomes)
+
+    return len(uploads)
+
+
+async def run_uploader():
+    """Background task that drains the outbox continuously"""
+    loop = asyncio.get_running_loop()
+    logger.info("FileNet outbox uploader started")
+
+    try:
+        reset = await loop.run_in_executor(None, db.reset_interrupted_filenet_uploads)
+        if reset:
+            logger.info(f"Re-queued {reset} interrupted FileNet uploads")
+
+        while True:
+            try:
+                processed = await loop.run_in_executor(None, process_outbox_batch)
+            except Exception as e:
+                logger.error(f"Error draining FileNet outbox: {e}")
+                processed = 0
+
+            # Keep draining while there is a backlog, otherwise wait for new work
+            if processed < FILENET_OUTBOX_BATCH_SIZE:
+                await asyncio.sleep(FILENET_OUTBOX_POLL_SECONDS)
+
+    except asyncio.CancelledError:
+        logger.info("FileNet outbox uploader stopped")
+        raise
+
+
+def start_uploader():
+    """Start the background uploader (called on application startup)"""
+    global uploader_task
+    if uploader_task is None or uploader_task.done():
+        uploader_task = asyncio.create_task(run_uploader())
+
+
+async def stop_uploader():
+    """Stop the background uploader; claimed rows are re-queued on next start"""
+    global uploader_task
+    if uploader_task is None:
+        return
+    uploader_task.cancel()
+    try:
+        await uploader_task
+    except asyncio.CancelledError:
+        pass
+    uploader_task = None
+
+
+def get_outbox_status() -> Dict:
+    return {
+        'running': uploader_task is not None and not uploader_task.done(),
+        'status_counts': db.get_filenet_outbox_stats()
+    }
@@ -0,0 +1,311 @@
+"""
+FileNet Upload Worker Module
+Pool of resident FileNet upload processes speaking a line-delimited JSON protocol over stdin/stdout
+
+Protocol (one JSON object per line):
+    request:  {"id": "<id>", "op": "ping"}
+              {"id": "<id>", "op": "upload", "image_path": ..., "document_type": ...,
+               "confidentiality": ..., "storage_type": ..., "retention_period": ..., "id_number": ...}
+    response: {"id": "<id>", "ok": true, "output": "..."}
+              {"id": "<id>", "ok": false, "error": "..."}
+
+If the worker processes cannot be started (e.g. the jar has no --worker mode) uploads fall
+back to spawning the FileNet CLI once per file.
+"""
+
+import os
+import json
+import uuid
+import queue
+import shlex
+import threading
+import subprocess
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+FILENET_JAR_PATH = os.getenv("FILENET_JAR_PATH", r"C:\Users\Administrator\Desktop\FileNetUpload.jar")
+
+# Overrides the worker command line, e.g. "python ../scripts/fake_filenet_worker.py"
+FILENET_WORKER_COMMAND = os.getenv("FILENET_WORKER_COMMAND", "")
+
+# Number of resident worker processes (0 spawns the CLI per file)
+FILENET_WORKER_POOL_SIZE = int(os.getenv("FILENET_WORKER_POOL_SIZE", "2"))
+
+FILENET_WORKER_TIMEOUT_SECONDS = float(os.getenv("FILENET_WORKER_TIMEOUT_SECONDS", "120"))
+FILENET_WORKER_START_TIMEOUT_SECONDS = float(os.getenv("FILENET_WORKER_START_TIMEOUT_SECONDS", "30"))
+FILENET_WORKER_HEALTHCHECK_SECONDS = float(os.getenv("FILENET_WORKER_HEALTHCHECK_SECONDS", "30"))
+
+
+class FileNetWorkerError(Exception):
+    """Raised when a worker process crashes, times out or misbehaves"""
+
+
+def get_worker_command() -> List[str]:
+    """Command line used to launch one resident worker"""
+    if FILENET_WORKER_COMMAND:
+        return shlex.split(FILENET_WORKER_COMMAND, posix=(os.name != "nt"))
+    return ["java", "-jar", FILENET_JAR_PATH, "--worker"]
+
+
+class FileNetWorker:
+    """One resident upload process"""
+
+    def __init__(self, command: List[str], name: str):
+        self.command = command
+        self.name = name
+        self.process: Optional[subprocess.Popen] = None
+        self._responses: "queue.Queue[Optional[str]]" = queue.Queue()
+
+    def start(self):
+        """Launch the process and wait for it to answer a ping"""
+        self.stop()
+        self._responses = queue.Queue()
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1
+        )
+        threading.Thread(target=self._read_stdout, args=(self.process, self._responses), daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(self.process,), daemon=True).start()
+
+        self.ping(timeout=FILENET_WORKER_START_TIMEOUT_SECONDS)
+        logger.info(f"FileNet worker {self.name} started (pid {self.process.pid})")
+
+    def _read_stdout(self, process: subprocess.Popen, responses: "queue.Queue[Optional[str]]"):
+        for line in process.stdout:
+            line = line.strip()
+            if line:
+                responses.put(line)
+        # EOF - the process exited
+        responses.put(None)
+
+    def _read_stderr(self, process: subprocess.Popen):
+        for line in process.stderr:
+            logger.info(f"FileNet worker {self.name}: {line.rstrip()}")
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def request(self, payload: Dict, timeout: float) -> Dict:
+        """Send one request and wait for its response"""
+        if not self.is_alive():
+            raise FileNetWorkerError(f"FileNet worker {self.name} is not running")
+
+        request_id = uuid.uuid4().hex
+        payload = {"id": request_id, **payload}
+
+        try:
+            self.process.stdin.write(json.dumps(payload) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise FileNetWorkerError(f"FileNet worker {self.name} pipe closed: {e}")
+
+        while True:
+            try:
+                line = self._responses.get(timeout=timeout)
+            except queue.Empty:
+                raise FileNetWorkerError(f"FileNet worker {self.name} timed out after {timeout}s")
+
+            if line is None:
+                try:
+                    exit_code = self.process.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    exit_code = None
+                raise FileNetWorkerError(f"FileNet worker {self.name} exited with code {exit_code}")
+
+            try:
+                response = json.loads(line)
+            except json.JSONDecodeError:
+                # Anything that is not a protocol line is worker logging
+                logger.info(f"FileNet worker {self.name}: {line}")
+                continue
+
+            if response.get("id") != request_id:
+                logger.warning(f"FileNet worker {self.name} returned a stale response: {line}")
+                continue
+            return response
+
+    def ping(self, timeout: float = 5.0):
+        response = self.request({"op": "ping"}, timeout)
+        if not response.get("ok"):
+            raise FileNetWorkerError(f"FileNet worker {self.name} failed health check: {response.get('error')}")
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            if self.process.poll() is None:
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+        self.process = None
+
+
+class FileNetWorkerPool:
+    """Fixed-size pool of resident workers with health checks and restart-on-crash"""
+
+    def __init__(self, size: int = FILENET_WORKER_POOL_SIZE):
+        self.size = size
+        self.workers: List[FileNetWorker] = []
+        self._idle: "queue.Queue[FileNetWorker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._stop_event = threading.Event()
+        self.available = False
+        self.restarts = 0
+
+    def start(self) -> bool:
+        """Start the workers once; returns False if the pool cannot be used"""
+        with self._lock:
+            if self._started:
+                return self.available
+            self._started = True
+
+            if not FILENET_WORKER_COMMAND and not os.path.isfile(FILENET_JAR_PATH):
+                logger.error(f"FileNet jar not found at {FILENET_JAR_PATH}; set FILENET_JAR_PATH. "
+                             f"Uploads will fail until it exists.")
+
+            if self.size <= 0:
+                logger.info("FileNet worker pool disabled; using per-file CLI uploads")
+                return False
+
+            command = get_worker_command()
+            for index in range(self.size):
+                worker = FileNetWorker(command, f"filenet-{index}")
+                try:
+                    worker.start()
+                except Exception as e:
+                    logger.warning(f"Could not start FileNet worker ({e}); falling back to per-file CLI uploads")
+                    worker.stop()
+                    self._stop_workers()
+                    return False
+                self.workers.append(worker)
+                self._idle.put(worker)
+
+            self.available = True
+            threading.Thread(target=self._health_check_loop, daemon=True).start()
+            return True
+
+    def _restart(self, worker: FileNetWorker):
+        logger.warning(f"Restarting FileNet worker {worker.name}")
+        self.restarts += 1
+        try:
+            worker.start()
+        except Exception as e:
+            # Left stopped; the next checkout or health check retries
+            logger.error(f"Failed to restart FileNet worker {worker.name}: {e}")
+            worker.stop()
+
+    def _health_check_loop(self):
+        while not self._stop_event.wait(FILENET_WORKER_HEALTHCHECK_SECONDS):
+            for _ in range(len(self.workers)):
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    worker.ping()
+                except Exception as e:
+                    logger.warning(f"FileNet worker {worker.name} failed health check: {e}")
+                    self._restart(worker)
+                finally:
+                    self._idle.put(worker)
+
+    def upload(self, image_path: str, document_type: str, confidentiality: str, storage_type: str,
+               retention_period: str, id_number: str) -> str:
+        """Upload one document through an idle worker and return its output"""
+        worker = self._idle.get(timeout=FILENET_WORKER_TIMEOUT_SECONDS)
+        try:
+            if not worker.is_alive():
+                self._restart(worker)
+
+            try:
+                response = worker.request({
+                    "op": "upload",
+                    "image_path": image_path,
+                    "document_type": document_type,
+                    "confidentiality": confidentiality,
+                    "storage_type": storage_type,
+                    "retention_period": retention_period,
+                    "id_number": id_number
+                }, FILENET_WORKER_TIMEOUT_SECONDS)
+            except FileNetWorkerError:
+                # Crashed or hung mid-request: replace the process before handing it back
+                self._restart(worker)
+                raise
+
+            if not response.get("ok"):
+                raise FileNetWorkerError(response.get("error") or "FileNet upload failed")
+            return response.get("output", "")
+        finally:
+            self._idle.put(worker)
+
+    def _stop_workers(self):
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+        self._idle = queue.Queue()
+
+    def stop(self):
+        self._stop_event.set()
+        with self._lock:
+            self._stop_workers()
+            self.available = False
+
+    def get_status(self) -> Dict:
+        return {
+            'enabled': self.size > 0,
+            'available': self.available,
+            'pool_size': self.size,
+            'alive_workers': sum(1 for worker in self.workers if worker.is_alive()),
+            'idle_workers': self._idle.qsize(),
+            'restarts': self.restarts
+        }
+
+
+# Global worker pool instance (started on first upload)
+filenet_pool = FileNetWorkerPool()
+
+
+def upload_to_filenet(image_path: str, document_type: str, confidentiality: str, storage_type: str, retention_period: str, id_number: str) -> str:
+    """
+    Upload the image to FileNet through the resident worker pool, or the Java CLI if the pool is unavailable.
+
+    Args:
+        image_path (str): Path to the image file on disk.
+        document_type (str): The document type extracted from AI model output.
+        confidentiality (str): Document confidentiality level.
+        storage_type (str): Storage location e.g., Local Folder
+        retention_period (str): Retention duration in years for the document
+        id_number (str): Aadhaar or PAN number linked to the document
+
+    Raises:
+        subprocess.CalledProcessError: If the upload fails.
+    """
+    if filenet_pool.start():
+        try:
+            return filenet_pool.upload(image_path, document_type, confidentiality, storage_type, retention_period, id_number)
+        except (FileNetWorkerError, queue.Empty) as e:
+            raise subprocess.CalledProcessError(1, get_worker_command(), output="", stderr=str(e) or "No FileNet worker available")
+
+    command = [
+        "java",
+        "-jar",
+        FILENET_JAR_PATH,
+        image_path,
+        document_type,
+        confidentiality,
+        storage_type,
+        retention_period,
+        id_number
+    ]
+    logger.info(f"FileNet command====, {command}")
+    result = subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    return result.stdout  # Return output for logging or further processing if needed
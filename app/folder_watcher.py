@@ -0,0 +1,154 @@
+"""
+Folder Watcher Module
+Event-driven change detection for auto-ingestion source folders, using Linux inotify through ctypes.
+Filesystems or platforms without inotify fall back to the polling scanner.
+"""
+
+import os
+import sys
+import struct
+import asyncio
+import ctypes
+import ctypes.util
+from typing import Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+# "auto" uses inotify where available, "polling" always scans the folder every interval
+AUTO_INGESTION_WATCHER = os.getenv("AUTO_INGESTION_WATCHER", "auto").lower()
+
+# Events arriving within this window of each other are handled together (up to AUTO_INGESTION_COALESCE_MAX_MS)
+AUTO_INGESTION_COALESCE_MS = int(os.getenv("AUTO_INGESTION_COALESCE_MS", "500"))
+AUTO_INGESTION_COALESCE_MAX_MS = int(os.getenv("AUTO_INGESTION_COALESCE_MAX_MS", "5000"))
+
+# Full folder scan while watching, to catch events inotify missed (network mounts, queue overflow)
+AUTO_INGESTION_RECONCILE_SECONDS = float(os.getenv("AUTO_INGESTION_RECONCILE_SECONDS", "300"))
+
+IN_MOVED_TO = 0x00000080
+IN_CLOSE_WRITE = 0x00000008
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+_libc = None
+
+
+def load_libc():
+    """libc with the inotify calls, or None on platforms without them"""
+    global _libc
+    if _libc is None:
+        if not sys.platform.startswith("linux"):
+            _libc = False
+        else:
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+                libc.inotify_init1.argtypes = [ctypes.c_int]
+                libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+                _libc = libc
+            except (OSError, AttributeError):
+                _libc = False
+    return _libc or None
+
+
+class InotifyWatcher:
+    """Collects the names of files closed after writing or moved into a folder"""
+
+    backend = "inotify"
+
+    def __init__(self, path: str):
+        libc = load_libc()
+        if libc is None:
+            raise OSError("inotify is not available on this platform")
+        self.path = path
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"Cannot watch {path}: {os.strerror(errno)}")
+        self.changed: Set[str] = set()
+        # Set when events may have been lost and the folder must be scanned in full
+        self.needs_rescan = False
+        # Set when the folder was deleted or moved away; the kernel has dropped the watch
+        # and the watcher must be replaced
+        self.lost = False
+        self._event = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self.fd, self._read_events)
+
+    def _read_events(self):
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            logger.error(f"Error reading inotify events for {self.path}: {e}")
+            self.needs_rescan = True
+            self._event.set()
+            return
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                self.lost = True
+                self.needs_rescan = True
+            elif mask & IN_Q_OVERFLOW:
+                self.needs_rescan = True
+            elif name and not mask & IN_ISDIR:
+                self.changed.add(os.path.join(self.path, os.fsdecode(name)))
+        self._event.set()
+
+    async def wait(self, timeout: float):
+        """Wait up to timeout for events, then keep collecting until the burst has settled"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return
+        deadline = self._loop.time() + AUTO_INGESTION_COALESCE_MAX_MS / 1000
+        while self._loop.time() < deadline:
+            self._event.clear()
+            try:
+                await asyncio.wait_for(self._event.wait(), min(AUTO_INGESTION_COALESCE_MS / 1000,
+                                                               deadline - self._loop.time()))
+            except asyncio.TimeoutError:
+                break
+
+    def drain(self) -> Set[str]:
+        """Paths changed since the last drain"""
+        changed, self.changed = self.changed, set()
+        self._event.clear()
+        return changed
+
+    def close(self):
+        try:
+            self._loop.remove_reader(self.fd)
+        finally:
+            os.close(self.fd)
+
+
+def create_watcher(path: str) -> Optional[InotifyWatcher]:
+    """An inotify watcher for the folder, or None to use the polling scanner.
+    Must be called from the event loop the watcher will be used on."""
+    if AUTO_INGESTION_WATCHER == "polling":
+        return None
+    try:
+        return InotifyWatcher(path)
+    except OSError as e:
+        logger.warning(f"Falling back to polling for {path}: {e}")
+        return None
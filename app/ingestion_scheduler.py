@@ -0,0 +1,184 @@
+"""
+Ingestion Scheduler Module
+Shares one pool of auto-ingestion workers between all running workflows by weighted fair queueing.
+Workflows with queued files get worker time in proportion to their weight, up to their own
+parallelism limit; workflows without queued files hold no worker.
+"""
+
+import os
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Queue items processed at the same time across all workflows
+AUTO_INGESTION_WORKERS = int(os.getenv("AUTO_INGESTION_WORKERS", "6"))
+
+# Items one workflow may process at the same time, unless the workflow sets max_parallel
+AUTO_INGESTION_MAX_PARALLEL = int(os.getenv("AUTO_INGESTION_MAX_PARALLEL", "4"))
+
+# Service time assumed for a workflow's first item, in seconds
+INITIAL_SERVICE_ESTIMATE = 1.0
+
+
+@dataclass
+class WorkflowShare:
+    workflow_id: int
+    weight: float = 1.0
+    max_parallel: int = AUTO_INGESTION_MAX_PARALLEL
+    # Worker seconds received divided by weight; the workflow furthest behind is served next
+    virtual_time: float = 0.0
+    service_estimate: float = INITIAL_SERVICE_ESTIMATE
+    running: int = 0
+    has_work: bool = True
+    # Bumped by notify(), so a worker that found the queue empty does not hide files queued meanwhile
+    generation: int = 0
+    stopping: bool = False
+    processed: int = 0
+    busy_seconds: float = 0.0
+    added_at: float = field(default_factory=time.time)
+
+
+class IngestionScheduler:
+    """Runs run_next(workflow_id) on a fixed number of worker tasks, choosing the workflow by
+    weighted fair queueing. run_next processes one queued item and returns False once the
+    workflow's queue is empty; the workflow is then skipped until notify() is called for it."""
+
+    def __init__(self, run_next: Callable[[int], Awaitable[bool]], workers: int = AUTO_INGESTION_WORKERS,
+                 max_parallel: int = AUTO_INGESTION_MAX_PARALLEL):
+        self.run_next = run_next
+        self.workers = max(workers, 1)
+        self.default_max_parallel = max(max_parallel, 1)
+        self.shares: Dict[int, WorkflowShare] = {}
+        self.virtual_time = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+        self._tasks = []
+
+    def _start(self):
+        """Start the worker tasks on the running event loop, once"""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        self._tasks = [task for task in self._tasks if not task.done()]
+        for number in range(len(self._tasks) + 1, self.workers + 1):
+            self._tasks.append(asyncio.create_task(self._worker(number)))
+
+    def _wake(self):
+        async def notify_all():
+            async with self._condition:
+                self._condition.notify_all()
+        asyncio.get_running_loop().create_task(notify_all())
+
+    def add(self, workflow_id: int, weight: float = 1, max_parallel: Optional[int] = None):
+        """Start scheduling a workflow, which may have queued items already"""
+        self._start()
+        share = WorkflowShare(workflow_id, virtual_time=self.virtual_time)
+        self.shares[workflow_id] = share
+        self.configure(workflow_id, weight, max_parallel)
+        self._wake()
+
+    def configure(self, workflow_id: int, weight: float = 1, max_parallel: Optional[int] = None):
+        """Apply a workflow's current weight and parallelism limit"""
+        share = self.shares.get(workflow_id)
+        if share is None:
+            return
+        share.weight = max(float(weight or 1), 0.01)
+        share.max_parallel = max(int(max_parallel or self.default_max_parallel), 1)
+
+    def notify(self, workflow_id: int):
+        """Mark a workflow as having queued items"""
+        share = self.shares.get(workflow_id)
+        if share is None or share.stopping:
+            return
+        share.generation += 1
+        if not share.has_work:
+            # A workflow returning from idle starts level with the others instead of
+            # spending credit it built up while it had nothing to do
+            share.virtual_time = max(share.virtual_time, self.virtual_time)
+            share.has_work = True
+            self._wake()
+
+    async def remove(self, workflow_id: int, timeout: float):
+        """Stop scheduling a workflow and wait up to timeout for its running items to finish"""
+        share = self.shares.get(workflow_id)
+        if share is None:
+            return
+        share.stopping = True
+        deadline = time.monotonic() + timeout
+        async with self._condition:
+            while share.running and time.monotonic() < deadline:
+                try:
+                    await asyncio.wait_for(self._condition.wait(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+        if share.running:
+            logger.warning(f"Workflow {workflow_id} still has {share.running} items processing after {timeout:.0f}s")
+        if self.shares.get(workflow_id) is share:
+            del self.shares[workflow_id]
+
+    def _next_share(self) -> Optional[WorkflowShare]:
+        """The runnable workflow that has received the least weighted service"""
+        runnable = [share for share in self.shares.values()
+                    if share.has_work and not share.stopping and share.running < share.max_parallel]
+        if not runnable:
+            return None
+        return min(runnable, key=lambda share: (share.virtual_time, share.added_at))
+
+    async def _worker(self, number: int):
+        while True:
+            async with self._condition:
+                share = self._next_share()
+                while share is None:
+                    await self._condition.wait()
+                    share = self._next_share()
+                # Charge the expected cost now so the next worker sees this workflow's new position
+                self.virtual_time = max(self.virtual_time, share.virtual_time)
+                charged = share.service_estimate / share.weight
+                share.virtual_time += charged
+                share.running += 1
+                generation = share.generation
+
+            started = time.monotonic()
+            processed = False
+            try:
+                processed = await self.run_next(share.workflow_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingestion worker {number} failed on workflow {share.workflow_id}: {e}")
+            finally:
+                elapsed = time.monotonic() - started
+                async with self._condition:
+                    share.running -= 1
+                    share.busy_seconds += elapsed
+                    if processed:
+                        share.processed += 1
+                        share.virtual_time += elapsed / share.weight - charged
+                        share.service_estimate = 0.8 * share.service_estimate + 0.2 * elapsed
+                    else:
+                        # Empty queues and failed claims cost the workflow nothing
+                        share.virtual_time -= charged
+                        if share.generation == generation:
+                            share.has_work = False
+                    self._condition.notify_all()
+
+    def get_state(self) -> Dict:
+        workflows = [{
+            "workflow_id": share.workflow_id,
+            "weight": share.weight,
+            "max_parallel": share.max_parallel,
+            "workers_in_use": share.running,
+            "has_work": share.has_work,
+            "stopping": share.stopping,
+            "processed": share.processed,
+            "busy_seconds": round(share.busy_seconds, 2),
+            "virtual_time": round(share.virtual_time, 3),
+        } for share in self.shares.values()]
+        return {
+            "workers": self.workers,
+            "workers_in_use": sum(share.running for share in self.shares.values()),
+            "default_max_parallel": self.default_max_parallel,
+            "workflows": workflows,
+        }
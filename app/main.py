@@ -1,21 +1,29 @@
 from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Request, Depends
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, FileResponse, Response
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import json
 import shutil
-import subprocess
 import requests
 import xml.etree.ElementTree as ET
-from file_handlers import handle_file, add_category_if_new
+from file_handlers import classify_file, add_category_if_new
+from utils import is_archive, iter_archive_members, ARCHIVE_ERRORS
+from classification_cache import classification_cache
+from pre_classifier import pre_classifier
+from filenet_worker import filenet_pool
+from filenet_outbox import enqueue_upload, start_uploader, stop_uploader, get_outbox_status
 from db_integration import data_manager
-from database import db
+from database import db, encode_page_cursor, decode_page_cursor
 from typing import List, Dict
 import logging
 import asyncio
+import functools
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from mfa_utils import MFAUtils
 from reportlab.lib.pagesizes import letter, A4
@@ -388,6 +396,18 @@ def startup_event():
     except Exception as e:
         logger.warning(f"Failed to load categories on startup: {e}")
 
+@app.on_event("startup")
+async def start_filenet_uploader():
+    """Start draining the FileNet upload outbox"""
+    start_uploader()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the FileNet outbox uploader and resident upload workers, then close database connections"""
+    await stop_uploader()
+    filenet_pool.stop()
+    db.close()
+
 async def check_watsonx_status():
     """Check WatsonX AI service status"""
     try:
@@ -758,36 +778,6 @@ def load_criticality_config(config_file_path: str) -> Dict:
         logger.error(f"Error parsing criticality configuration file: {e}")
         raise HTTPException(status_code=400, detail="Error parsing criticality configuration file.")
 
-def upload_to_filenet(image_path: str, document_type: str, confidentiality: str, storage_type: str, retention_period: str, id_number: str) -> None:
-    """
-    Upload the image to FileNet using the Java CLI.
-
-    Args:
-        image_path (str): Path to the image file on disk.
-        document_type (str): The document type extracted from AI model output.
-        confidentiality (str): Document confidentiality level.
-        storage_type (str): Storage location e.g., Local Folder
-        retention_period (str): Retention duration in years for the document
-        id_number (str): Aadhaar or PAN number linked to the document
-
-    Raises:
-        subprocess.CalledProcessError: If the Java command fails.
-    """
-    command = [
-        "java",
-        "-jar",
-        r"C:\Users\Administrator\Desktop\FileNetUpload.jar",
-        image_path,
-        document_type,
-        confidentiality,
-        storage_type,
-        retention_period,
-        id_number
-    ]
-    logger.info(f"FileNet command====, {command}")
-    result = subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    return result.stdout  # Return output for logging or further processing if needed
-
 def save_uploaded_file(uploaded_file: UploadFile, dest_folder: str) -> str:
     """ Save uploaded file to disk and return full file path. """
     os.makedirs(dest_folder, exist_ok=True)
@@ -798,7 +788,7 @@ def save_uploaded_file(uploaded_file: UploadFile, dest_folder: str) -> str:
     return file_path
 
 def assign_criticality_and_upload(file_path: str, result: dict, criticality_config: dict) -> dict:
-    """ Add criticality to result and upload file to FileNet. """
+    """ Add criticality to result and queue the file for FileNet upload. """
     if result is None:
         result = {
             "document_type": "Unknown",
@@ -825,48 +815,106 @@ def assign_criticality_and_upload(file_path: str, result: dict, criticality_conf
     result['storage_type'] = storage_type
     result['retention_period'] = retention_period
 
-    # FileNet upload attempt
+    # Queue the FileNet upload; the background uploader delivers it
     try:
-        filenet_output = upload_to_filenet(file_path, doc_type, criticality, storage_type, retention_period, id_number)
-        logger.info(f"FileNet upload successful for {file_path}: {filenet_output}")
-        result['filenet_upload'] = "Success"
-    except subprocess.CalledProcessError as e:
-        logger.error(f"FileNet upload failed for {file_path}: {e.stderr}")
-        result['filenet_upload'] = f"Failed: {e.stderr}"
+        upload_id = enqueue_upload(file_path, doc_type, criticality, storage_type, retention_period, id_number)
+        result['filenet_upload'] = "Pending"
+        result['filenet_upload_id'] = upload_id
     except Exception as e:
-        logger.error(f"Unexpected error during FileNet upload for {file_path}: {str(e)}")
+        logger.error(f"Failed to queue FileNet upload for {file_path}: {str(e)}")
         result['filenet_upload'] = f"Failed: {str(e)}"
     
     return result
 
+# Archive members are classified in their own pool: process_archive already runs in the upload
+# pool, so queueing members there could deadlock once every upload worker waits on its members
+ARCHIVE_MEMBER_CONCURRENCY = int(os.getenv("ARCHIVE_MEMBER_CONCURRENCY", "4"))
+ARCHIVE_WORKER_THREADS = int(os.getenv("ARCHIVE_WORKER_THREADS", "8"))
+archive_member_executor = ThreadPoolExecutor(max_workers=ARCHIVE_WORKER_THREADS, thread_name_prefix="idms-archive")
+
+def process_archive_member(member_path: str, criticality_config: dict, user_data: dict = None,
+                           parent_archive_id: int = None) -> dict:
+    """ Classify, queue and save one archive member; a failure is reported in its result instead of raised. """
+    try:
+        return process_single_file(member_path, criticality_config, user_data, parent_archive_id)
+    except Exception as e:
+        logger.error(f"Failed to process archive member {member_path}: {e}")
+        return {"document_type": "Unknown", "criticality": "Unknown", "error": str(e)}
+    finally:
+        # The FileNet outbox keeps its own staged copy, so the member can go as soon as it is saved
+        if os.path.exists(member_path):
+            os.remove(member_path)
+
 def process_archive(file_path: str, criticality_config: dict, user_data: dict = None) -> Dict[str, dict]:
-    """ Process an archive file: extract, classify, upload, cleanup. """
-    results = {}
+    """
+    Process an archive file: extract members one at a time, classify and upload them in parallel
+    (at most ARCHIVE_MEMBER_CONCURRENCY in flight), save them as children of the archive's row, cleanup.
+    Results are returned in archive order.
+    """
+    processing_start_time = datetime.now()
     extracted_folder = os.path.splitext(file_path)[0]
-    extracted_results = handle_file(file_path)  # assuming returns dict {filename: result}
 
-    if isinstance(extracted_results, dict):
-        for extracted_file, result in extracted_results.items():
-            # Update result with criticality and FileNet upload
-            updated_result = assign_criticality_and_upload(extracted_file, result, criticality_config)
-            results[extracted_file] = updated_result
+    # The archive itself gets a row first so its members can reference it via parent_archive_id.
+    # Only its members go to FileNet, and the analytics rollups count the members, not the archive
+    archive_result = {"document_type": "Archive", "criticality": "Unknown", "processing_status": "processing",
+                      "summary": "Archive contents are being processed", "filenet_upload_status": "n/a"}
+    parent_archive_id = None
+    try:
+        if user_data:
+            parent_archive_id = data_manager.save_ai_document_processing(file_path, archive_result, processing_start_time, processing_start_time, user_data)
+        else:
+            parent_archive_id = data_manager.save_document_processing(file_path, archive_result, processing_start_time, processing_start_time)
+    except Exception as db_error:
+        logger.error(f"Failed to save archive {file_path} to database: {db_error}")
+
+    slots = threading.BoundedSemaphore(max(1, ARCHIVE_MEMBER_CONCURRENCY))
+    members = []
+    extraction_error = None
+    try:
+        for member_path in iter_archive_members(file_path, extracted_folder):
+            slots.acquire()
+            try:
+                future = archive_member_executor.submit(process_archive_member, member_path, criticality_config, user_data, parent_archive_id)
+            except Exception:
+                slots.release()
+                raise
+            future.add_done_callback(lambda _: slots.release())
+            members.append((member_path, future))
+    except ARCHIVE_ERRORS as e:
+        extraction_error = str(e)
+        logger.error(f"Stopped extracting archive {file_path} after {len(members)} files: {e}")
+    finally:
+        results = {member_path: future.result() for member_path, future in members}
 
         # Cleanup extracted folder
         if os.path.exists(extracted_folder):
             shutil.rmtree(extracted_folder)
             logger.info(f"Removed extracted folder: {extracted_folder}")
-    else:
-        logger.warning(f"Unexpected extracted result format for archive {file_path}")
-        results[os.path.basename(file_path)] = {"error": "Unexpected archive processing result format"}
+
+    failed = sum(1 for result in results.values() if result.get("error"))
+    if extraction_error:
+        results[file_path] = {"document_type": "Unknown", "error": f"Archive extraction stopped: {extraction_error}"}
+
+    if parent_archive_id and user_data:
+        try:
+            db.update_ai_document_classification(parent_archive_id, {
+                'summary': f"Archive with {len(members)} files ({failed} failed)",
+                'processing_status': 'failed' if extraction_error else 'completed',
+                'processing_duration': (datetime.now() - processing_start_time).total_seconds(),
+                'error_message': extraction_error or ''
+            })
+        except Exception as db_error:
+            logger.error(f"Failed to update archive record {parent_archive_id}: {db_error}")
 
     return results
 
-def process_single_file(file_path: str, criticality_config: dict, user_data: dict = None) -> dict:
-    """ Process a non-archive single file. """
+def process_single_file(file_path: str, criticality_config: dict, user_data: dict = None,
+                        parent_archive_id: int = None) -> dict:
+    """ Process a non-archive single file (or an archive member, linked to its archive's row). """
     processing_start_time = datetime.now()
     
     try:
-        result = handle_file(file_path)
+        result = classify_file(file_path)
         result = assign_criticality_and_upload(file_path, result, criticality_config)
         
         # Save to database
@@ -874,10 +922,10 @@ def process_single_file(file_path: str, criticality_config: dict, user_data: dic
             processing_end_time = datetime.now()
             if user_data:
                 # Use new AI document classifications table for authenticated users
-                document_id = data_manager.save_ai_document_processing(file_path, result, processing_start_time, processing_end_time, user_data)
+                document_id = data_manager.save_ai_document_processing(file_path, result, processing_start_time, processing_end_time, user_data, parent_archive_id)
             else:
                 # Fallback to old documents table for non-authenticated users
-                document_id = data_manager.save_document_processing(file_path, result, processing_start_time, processing_end_time)
+                document_id = data_manager.save_document_processing(file_path, result, processing_start_time, processing_end_time, parent_archive_id)
             result['document_id'] = document_id
             logger.info(f"Document saved to database with ID: {document_id}")
         except Exception as db_error:
@@ -890,23 +938,19 @@ def process_single_file(file_path: str, criticality_config: dict, user_data: dic
         data_manager.log_error("processing_error", str(e), "high", context_data={"file_path": file_path})
         raise e
 
-def process_uploaded_files(files: List[UploadFile], user_data: dict = None) -> Dict[str, dict]:
-    criticality_config = load_criticality_config(config_file_path)
+def process_saved_file(temp_file_path: str, filename: str, criticality_config: dict, user_data: dict = None) -> Dict[str, dict]:
+    """ Process one saved upload (archive or single file) and remove it afterwards. """
     results = {}
-    temp_dir = "./temp"
-    os.makedirs(temp_dir, exist_ok=True)
-
-    for uploaded_file in files:
-        temp_file_path = save_uploaded_file(uploaded_file, temp_dir)
-        logger.info(f"Processing uploaded file - {uploaded_file.filename}")
+    try:
+        logger.info(f"Processing uploaded file - {filename}")
 
-        if temp_file_path.lower().endswith(('.zip', '.7z', '.tar', '.gz', '.bz2', '.xz', '.rar')):
+        if is_archive(temp_file_path):
             archive_results = process_archive(temp_file_path, criticality_config, user_data)
             results.update(archive_results)
         else:
             single_result = process_single_file(temp_file_path, criticality_config, user_data)
-            results[uploaded_file.filename] = single_result
-
+            results[filename] = single_result
+    finally:
         # Cleanup uploaded file
         if os.path.exists(temp_file_path):
             os.remove(temp_file_path)
@@ -914,6 +958,75 @@ def process_uploaded_files(files: List[UploadFile], user_data: dict = None) -> D
 
     return results
 
+def process_uploaded_files(files: List[UploadFile], user_data: dict = None) -> Dict[str, dict]:
+    criticality_config = load_criticality_config(config_file_path)
+    results = {}
+    temp_dir = "./temp"
+    os.makedirs(temp_dir, exist_ok=True)
+
+    for uploaded_file in files:
+        temp_file_path = save_uploaded_file(uploaded_file, temp_dir)
+        results.update(process_saved_file(temp_file_path, uploaded_file.filename, criticality_config, user_data))
+
+    return results
+
+# Upload pipeline concurrency: files of one upload processed in parallel, blocking stages in a shared worker pool
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+UPLOAD_WORKER_THREADS = int(os.getenv("UPLOAD_WORKER_THREADS", "8"))
+processing_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKER_THREADS, thread_name_prefix="idms-upload")
+
+async def run_blocking(func, *args):
+    """ Run a blocking function in the processing worker pool without blocking the event loop. """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(processing_executor, functools.partial(func, *args))
+
+def write_file_bytes(file_path: str, content: bytes) -> str:
+    """ Write raw bytes to disk and return the file path. """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as buffer:
+        buffer.write(content)
+    logger.info(f"Saved uploaded file to {file_path}")
+    return file_path
+
+async def process_uploaded_files_async(files: List[UploadFile], user_data: dict = None) -> Dict[str, dict]:
+    """
+    Process uploaded files concurrently without blocking the event loop.
+
+    Each file goes through save -> read/extract -> classify -> criticality/FileNet -> DB write,
+    with the blocking stages running in the processing worker pool and at most
+    UPLOAD_CONCURRENCY files of this upload in flight. Results are keyed exactly as
+    process_uploaded_files keys them, in upload order.
+    """
+    criticality_config = await run_blocking(load_criticality_config, config_file_path)
+    temp_dir = "./temp"
+    # Each upload gets its own folder so concurrent uploads of the same filename don't collide
+    upload_dir = os.path.join(temp_dir, uuid.uuid4().hex)
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+    async def process_one(index: int, uploaded_file: UploadFile) -> Dict[str, dict]:
+        async with semaphore:
+            content = await uploaded_file.read()
+            # Index prefix keeps duplicate filenames within one upload apart on disk
+            file_dir = os.path.join(upload_dir, str(index))
+            temp_file_path = await run_blocking(write_file_bytes, os.path.join(file_dir, uploaded_file.filename), content)
+            file_results = await run_blocking(process_saved_file, temp_file_path, uploaded_file.filename, criticality_config, user_data)
+
+        # Archive member results are keyed by extracted path; report them relative to ./temp as before
+        return {
+            key.replace(file_dir, temp_dir, 1) if key.startswith(file_dir) else key: value
+            for key, value in file_results.items()
+        }
+
+    try:
+        file_results = await asyncio.gather(*(process_one(index, f) for index, f in enumerate(files)))
+    finally:
+        await run_blocking(shutil.rmtree, upload_dir, True)
+
+    results = {}
+    for file_result in file_results:
+        results.update(file_result)
+    return results
+
 @app.post("/api/process_files/")
 async def process_files(files: List[UploadFile] = File(...)) -> Dict[str, dict]:
     """
@@ -929,7 +1042,7 @@ async def process_files(files: List[UploadFile] = File(...)) -> Dict[str, dict]:
         HTTPException: For unexpected server errors.
     """
     try:
-        return process_uploaded_files(files)
+        return await process_uploaded_files_async(files)
     except HTTPException:
         raise  # Re-raise HTTPExceptions as is
     except Exception as e:
@@ -1083,10 +1196,8 @@ async def init_database_get():
 async def check_tables():
     """Check if the new GhostLayer table exists"""
     try:
-        import sqlite3
-        
         # Connect to database
-        conn = sqlite3.connect(db.db_path)
+        conn = db.connect()
         cursor = conn.cursor()
         
         # Check if user_ghostlayer_documents table exists
@@ -1190,7 +1301,7 @@ async def upload_files_frontend(request: Request, files: List[UploadFile] = File
                 "error": "Authentication required for AI Document Classification"
             })
         
-        results = process_uploaded_files(files, user_data)
+        results = await process_uploaded_files_async(files, user_data)
         return templates.TemplateResponse("results.html", {
             "request": request,
             "results": results,
@@ -1426,6 +1537,47 @@ def draw_text_coordinates(image, coordinates_data):
     
     return masked_image
 
+def get_document_page(list_documents, count_documents, user_id: Optional[int], page: int, limit: int,
+                      search: str = "", status: str = "", cursor: str = "") -> dict:
+    """Fetch one page of a document list with SQL filtering, an exact total and a keyset cursor for the next page"""
+    page = max(page, 1)
+    limit = max(min(limit, 100), 1)
+    offset = (page - 1) * limit
+    filters = {"search": search or None, "status": status or None}
+    
+    try:
+        after = decode_page_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    # One extra row tells whether there is a next page without relying on the total
+    documents = list_documents(user_id=user_id, limit=limit + 1, offset=offset, after=after, **filters)
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    total_count = count_documents(user_id=user_id, **filters)
+    
+    # Calculate pagination info; a cursor page's position in the list is not known
+    total_pages = (total_count + limit - 1) // limit
+    if after:
+        start_item = end_item = None
+    else:
+        start_item = offset + 1 if documents else 0
+        end_item = min(offset + len(documents), total_count)
+    next_cursor = encode_page_cursor(documents[-1]) if has_more else None
+    
+    return {
+        "documents": documents,
+        "pagination": {
+            "page": page,
+            "pages": total_pages,
+            "limit": limit,
+            "total": total_count,
+            "start": start_item,
+            "end": end_item,
+            "next_cursor": next_cursor
+        }
+    }
+
 # GhostLayer AI API Routes
 @app.get("/api/ghostlayer/documents")
 async def get_ghostlayer_documents(
@@ -1433,7 +1585,8 @@ async def get_ghostlayer_documents(
     page: int = 1, 
     limit: int = 10, 
     search: str = "", 
-    status: str = ""
+    status: str = "",
+    cursor: str = ""
 ):
     """Get user-specific GhostLayer documents with pagination and filtering"""
     try:
@@ -1442,42 +1595,12 @@ async def get_ghostlayer_documents(
         if not user_data:
             raise HTTPException(status_code=401, detail="Authentication required")
         
-        user_id = user_data['id']
-        offset = (page - 1) * limit
-        
-        # Get documents from new user-specific table
-        documents = db.get_user_ghostlayer_documents(user_id=user_id, limit=limit, offset=offset)
-        
-        # Apply search filter if provided
-        if search:
-            documents = [doc for doc in documents if search.lower() in doc['document_name'].lower()]
-        
-        # Apply status filter if provided
-        if status:
-            documents = [doc for doc in documents if doc['processing_status'] == status]
-        
-        # Get total count for pagination
-        all_docs = db.get_user_ghostlayer_documents(user_id=user_id, limit=1000, offset=0)
-        total_count = len(all_docs)
-        
-        # Calculate pagination info
-        total_pages = (total_count + limit - 1) // limit
-        start_item = offset + 1
-        end_item = min(offset + limit, total_count)
-        
-        pagination = {
-            "page": page,
-            "pages": total_pages,
-            "limit": limit,
-            "total": total_count,
-            "start": start_item,
-            "end": end_item
-        }
-        
-        return {
-            "documents": documents,
-            "pagination": pagination
-        }
+        return get_document_page(
+            db.get_user_ghostlayer_documents, db.count_user_ghostlayer_documents,
+            user_data['id'], page, limit, search, status, cursor
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching GhostLayer documents: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch documents")
@@ -1519,7 +1642,6 @@ async def get_top_users_ai_classification(request: Request):
             raise HTTPException(status_code=403, detail="Admin access required")
         
         # Get top users from database using existing db instance
-        import sqlite3
         import os
         
         # Debug: Check if database file exists
@@ -1527,7 +1649,7 @@ async def get_top_users_ai_classification(request: Request):
         logger.info(f"Database path: {db_path}")
         logger.info(f"Database file exists: {os.path.exists(db_path)}")
         
-        conn = sqlite3.connect(db_path)
+        conn = db.connect()
         cursor = conn.cursor()
         
         # Test basic query first
@@ -1572,8 +1694,80 @@ async def get_top_users_ai_classification(request: Request):
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch top users data: {str(e)}")
 
+@app.get("/api/admin/classification-cache")
+async def get_classification_cache_stats(request: Request):
+    """Get classification cache statistics (Admin only)"""
+    user_data = require_auth(request)
+    if not user_data or user_data.get('role') != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        return classification_cache.get_stats()
+    except Exception as e:
+        logger.error(f"Error fetching classification cache stats: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch cache statistics")
+
+@app.delete("/api/admin/classification-cache")
+async def purge_classification_cache(request: Request):
+    """Purge all cached classification results (Admin only)"""
+    user_data = require_auth(request)
+    if not user_data or user_data.get('role') != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        deleted = classification_cache.purge()
+        logger.info(f"Classification cache purged by {user_data['username']}")
+        return {"message": "Classification cache purged successfully", "deleted": deleted}
+    except Exception as e:
+        logger.error(f"Error purging classification cache: {e}")
+        raise HTTPException(status_code=500, detail="Failed to purge classification cache")
+
+@app.get("/api/admin/pre-classifier")
+async def get_pre_classifier_stats(request: Request):
+    """Get local pre-classifier skip rate and agreement with the LLM (Admin only)"""
+    user_data = require_auth(request)
+    if not user_data or user_data.get('role') != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        return pre_classifier.get_stats()
+    except Exception as e:
+        logger.error(f"Error fetching pre-classifier stats: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch pre-classifier statistics")
+
+@app.post("/api/admin/pre-classifier/retrain")
+async def retrain_pre_classifier(request: Request):
+    """Retrain the local pre-classifier model from classification history (Admin only)"""
+    user_data = require_auth(request)
+    if not user_data or user_data.get('role') != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        learned = await run_blocking(pre_classifier.retrain)
+        logger.info(f"Pre-classifier retrained on {learned} documents by {user_data['username']}")
+        return {"message": "Pre-classifier retrained successfully", "documents": learned}
+    except Exception as e:
+        logger.error(f"Error retraining pre-classifier: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrain pre-classifier")
+
+@app.get("/api/admin/filenet-outbox")
+async def get_filenet_outbox_status(request: Request):
+    """Get FileNet upload outbox and worker pool status (Admin only)"""
+    user_data = require_auth(request)
+    if not user_data or user_data.get('role') != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    try:
+        status = get_outbox_status()
+        status['worker_pool'] = filenet_pool.get_status()
+        return status
+    except Exception as e:
+        logger.error(f"Error fetching FileNet outbox status: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch FileNet outbox status")
+
 @app.get("/api/ai-documents")
-async def get_user_ai_documents(request: Request, page: int = 1, limit: int = 10):
+async def get_user_ai_documents(request: Request, page: int = 1, limit: int = 10,
+                                search: str = "", status: str = "", cursor: str = ""):
     """Get user's AI document classifications (admin sees all documents)"""
     try:
         current_user = require_auth(request)
@@ -1581,55 +1775,15 @@ async def get_user_ai_documents(request: Request, page: int = 1, limit: int = 10
             raise HTTPException(status_code=401, detail="Authentication required")
         
         user_role = current_user.get('role', 'viewer')
-        offset = (page - 1) * limit
         
         # Admin sees all documents, others see only their own
-        if user_role == 'admin':
-            # Get ALL AI document classifications for admin
-            documents = db.get_ai_document_classifications(
-                user_id=None,  # None = all users
-                limit=limit, 
-                offset=offset
-            )
-            all_docs = db.get_ai_document_classifications(
-                user_id=None, 
-                limit=1000, 
-                offset=0
-            )
-        else:
-            # Get user's AI document classifications
-            documents = db.get_ai_document_classifications(
-                user_id=current_user['id'], 
-                limit=limit, 
-                offset=offset
-            )
-            all_docs = db.get_ai_document_classifications(
-                user_id=current_user['id'], 
-                limit=1000, 
-                offset=0
-            )
-        
-        total_count = len(all_docs)
-        
-        # Calculate pagination info
-        total_pages = (total_count + limit - 1) // limit
-        start_item = offset + 1
-        end_item = min(offset + limit, total_count)
-        
-        pagination = {
-            "page": page,
-            "pages": total_pages,
-            "limit": limit,
-            "total": total_count,
-            "start": start_item,
-            "end": end_item
-        }
-        
-        return {
-            "documents": documents,
-            "pagination": pagination,
-            "user_role": user_role  # Include user role for frontend
-        }
+        result = get_document_page(
+            db.get_ai_document_classifications, db.count_ai_document_classifications,
+            None if user_role == 'admin' else current_user['id'],
+            page, limit, search, status, cursor
+        )
+        result["user_role"] = user_role  # Include user role for frontend
+        return result
     except HTTPException:
         raise
     except Exception as e:
@@ -1670,7 +1824,8 @@ async def delete_ai_document(request: Request, document_id: int):
         raise HTTPException(status_code=500, detail="Failed to delete document")
 
 @app.get("/api/user-ghostlayer-documents")
-async def get_user_ghostlayer_documents(request: Request, page: int = 1, limit: int = 10):
+async def get_user_ghostlayer_documents(request: Request, page: int = 1, limit: int = 10,
+                                        search: str = "", status: str = "", cursor: str = ""):
     """Get user-specific GhostLayer documents with pagination (or all documents if admin)"""
     try:
         # Get user from session
@@ -1678,41 +1833,16 @@ async def get_user_ghostlayer_documents(request: Request, page: int = 1, limit:
         if not user_data:
             raise HTTPException(status_code=401, detail="Authentication required")
         
-        user_id = user_data['id']
         user_role = user_data.get('role', 'viewer')
-        offset = (page - 1) * limit
         
         # Admin sees all documents, others see only their own
-        if user_role == 'admin':
-            # Get ALL documents for admin
-            documents = db.get_user_ghostlayer_documents(user_id=None, limit=limit, offset=offset)
-            all_docs = db.get_user_ghostlayer_documents(user_id=None, limit=1000, offset=0)
-        else:
-            # Get documents for the current user using new table
-            documents = db.get_user_ghostlayer_documents(user_id=user_id, limit=limit, offset=offset)
-            all_docs = db.get_user_ghostlayer_documents(user_id=user_id, limit=1000, offset=0)
-        
-        total_count = len(all_docs)
-        
-        # Calculate pagination info
-        total_pages = (total_count + limit - 1) // limit
-        start_item = offset + 1
-        end_item = min(offset + limit, total_count)
-        
-        pagination = {
-            "page": page,
-            "pages": total_pages,
-            "limit": limit,
-            "total": total_count,
-            "start": start_item,
-            "end": end_item
-        }
-        
-        return {
-            "documents": documents,
-            "pagination": pagination,
-            "user_role": user_role  # Include user role so frontend knows if admin
-        }
+        result = get_document_page(
+            db.get_user_ghostlayer_documents, db.count_user_ghostlayer_documents,
+            None if user_role == 'admin' else user_data['id'],
+            page, limit, search, status, cursor
+        )
+        result["user_role"] = user_role  # Include user role so frontend knows if admin
+        return result
     except HTTPException:
         raise
     except Exception as e:
@@ -1856,8 +1986,7 @@ async def identify_document(
         user_id = user_data['id']
         
         # Find the most recent pending document for this user
-        existing_docs = db.get_user_ghostlayer_documents(user_id=user_id, limit=10, offset=0)
-        pending_docs = [doc for doc in existing_docs if doc['processing_status'] == 'pending']
+        pending_docs = db.get_user_ghostlayer_documents(user_id=user_id, limit=1, status='pending')
         
         if not pending_docs:
             raise HTTPException(status_code=404, detail="No pending documents found for processing")
@@ -2808,10 +2937,9 @@ async def change_password(request: Request):
         
         # Verify current password
         import hashlib
-        import sqlite3
         current_password_hash = hashlib.sha256(current_password.encode()).hexdigest()
         
-        conn = sqlite3.connect(db.db_path)
+        conn = db.connect()
         cursor = conn.cursor()
         
         try:
@@ -2934,6 +3062,79 @@ async def delete_user(user_id: int, request: Request):
         raise HTTPException(status_code=500, detail="Failed to delete user")
 
 
+# ==================== BATCH PROCESSING JOB ENDPOINTS ====================
+
+import batch_jobs
+
+@app.on_event("startup")
+async def resume_batch_jobs():
+    """Resume batch processing jobs interrupted by a restart"""
+    try:
+        resumed = batch_jobs.resume_unfinished_jobs()
+        if resumed:
+            logger.info(f"Resumed {resumed} unfinished processing jobs")
+    except Exception as e:
+        logger.error(f"Failed to resume processing jobs: {e}")
+
+def get_authorized_job(job_id: str, request: Request) -> dict:
+    """Load a job, allowing access to its owner or an admin"""
+    job = db.get_processing_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job['user_id']:
+        user_data = require_auth(request)
+        if not user_data:
+            raise HTTPException(status_code=401, detail="Authentication required")
+        if user_data.get('role') != 'admin' and user_data['id'] != job['user_id']:
+            raise HTTPException(status_code=403, detail="You don't have permission to view this job")
+    
+    return job
+
+@app.post("/api/jobs")
+async def submit_processing_job(request: Request, files: List[UploadFile] = File(...)):
+    """
+    Submit files for background classification and return a job id immediately.
+
+    Poll /api/jobs/{job_id} for per-file status or stream results from /api/jobs/{job_id}/stream.
+    """
+    try:
+        user_data = require_auth(request)
+        job_id = await batch_jobs.submit_job(files, user_data)
+        return {
+            "job_id": job_id,
+            "status": "pending",
+            "total_files": len(files),
+            "status_url": f"/api/jobs/{job_id}",
+            "stream_url": f"/api/jobs/{job_id}/stream"
+        }
+    except Exception as e:
+        logger.error(f"Error submitting processing job: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error submitting job: {str(e)}")
+
+@app.get("/api/jobs/{job_id}")
+async def get_processing_job(job_id: str, request: Request):
+    """Get job status with per-file status and results"""
+    get_authorized_job(job_id, request)
+    
+    try:
+        return await run_blocking(batch_jobs.get_job_status, job_id)
+    except Exception as e:
+        logger.error(f"Error getting processing job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch job")
+
+@app.get("/api/jobs/{job_id}/stream")
+async def stream_processing_job(job_id: str, request: Request, format: str = "ndjson"):
+    """Stream per-file results as they complete (format=ndjson or format=sse)"""
+    get_authorized_job(job_id, request)
+    
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(batch_jobs.stream_job_results(job_id, format), media_type=media_type)
+
+
 # ==================== AUTO INGESTION WORKFLOW ENDPOINTS ====================
 
 from pydantic import BaseModel
@@ -2943,11 +3144,22 @@ class WorkflowCreate(BaseModel):
     workflow_name: str
     source_path: str
     interval_seconds: int
+    weight: int = 1
+    max_parallel: Optional[int] = None
 
 class WorkflowUpdate(BaseModel):
     workflow_name: Optional[str] = None
     source_path: Optional[str] = None
     interval_seconds: Optional[int] = None
+    weight: Optional[int] = None
+    max_parallel: Optional[int] = None
+
+def validate_workflow_scheduling(workflow):
+    """Check the scheduler settings of a workflow create/update request"""
+    if workflow.weight is not None and not 1 <= workflow.weight <= 100:
+        raise HTTPException(status_code=400, detail="Weight must be between 1 and 100")
+    if workflow.max_parallel is not None and workflow.max_parallel < 1:
+        raise HTTPException(status_code=400, detail="Max parallel must be at least 1")
 
 @app.get("/api/auto-ingestion/dashboard")
 async def get_auto_ingestion_dashboard(request: Request):
@@ -2958,6 +3170,7 @@ async def get_auto_ingestion_dashboard(request: Request):
     
     try:
         stats = db.get_auto_ingestion_dashboard_stats()
+        stats['scheduler'] = auto_ingestion.get_scheduler_state()
         return stats
     except Exception as e:
         logger.error(f"Error getting dashboard stats: {e}")
@@ -2988,6 +3201,7 @@ async def create_workflow(workflow: WorkflowCreate, request: Request):
         # Validate interval
         if workflow.interval_seconds < 10:
             raise HTTPException(status_code=400, detail="Interval must be at least 10 seconds")
+        validate_workflow_scheduling(workflow)
         
         # Validate source path exists
         if not os.path.exists(workflow.source_path):
@@ -2999,7 +3213,9 @@ async def create_workflow(workflow: WorkflowCreate, request: Request):
             'source_path': workflow.source_path,
             'user_id': user['id'],
             'created_by': user['username'],
-            'interval_seconds': workflow.interval_seconds
+            'interval_seconds': workflow.interval_seconds,
+            'weight': workflow.weight,
+            'max_parallel': workflow.max_parallel
         }
         
         workflow_id = db.create_workflow(workflow_data)
@@ -3043,9 +3259,12 @@ async def update_workflow(workflow_id: int, workflow: WorkflowUpdate, request: R
         if not existing:
             raise HTTPException(status_code=404, detail="Workflow not found")
         
-        # Check if workflow is running
-        if auto_ingestion.is_workflow_running(workflow_id):
+        # Check if workflow is running (its scheduler settings may still be changed)
+        scheduling_only = all(getattr(workflow, field) is None
+                              for field in ('workflow_name', 'source_path', 'interval_seconds'))
+        if auto_ingestion.is_workflow_running(workflow_id) and not scheduling_only:
             raise HTTPException(status_code=400, detail="Cannot update running workflow. Please stop it first.")
+        validate_workflow_scheduling(workflow)
         
         # Validate interval if provided
         if workflow.interval_seconds is not None and workflow.interval_seconds < 10:
@@ -3063,6 +3282,10 @@ async def update_workflow(workflow_id: int, workflow: WorkflowUpdate, request: R
             update_data['source_path'] = workflow.source_path
         if workflow.interval_seconds:
             update_data['interval_seconds'] = workflow.interval_seconds
+        if workflow.weight is not None:
+            update_data['weight'] = workflow.weight
+        if workflow.max_parallel is not None:
+            update_data['max_parallel'] = workflow.max_parallel
         
         success = db.update_workflow(workflow_id, update_data)
         
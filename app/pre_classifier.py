@@ -0,0 +1,319 @@
+"""
+Pre-Classifier Module
+Cheap local classification tier for extracted text: keyword/regex rules from document_identification.json
+and a hashed n-gram naive Bayes model learned from earlier LLM classifications. Confident matches skip
+the LLM; everything else is escalated and its LLM answer is used to measure agreement and to train.
+"""
+
+import os
+import re
+import json
+import math
+import time
+import zlib
+import random
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRECLASSIFIER_ENABLED = os.getenv("PRECLASSIFIER_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Matches at or above this confidence skip the LLM
+PRECLASSIFIER_THRESHOLD = float(os.getenv("PRECLASSIFIER_THRESHOLD", "0.9"))
+
+# Share of confident matches still sent to the LLM, so agreement is measured where it matters
+PRECLASSIFIER_AUDIT_RATE = float(os.getenv("PRECLASSIFIER_AUDIT_RATE", "0.05"))
+
+# The model only predicts document types it has seen at least this many times
+PRECLASSIFIER_MIN_CLASS_DOCS = int(os.getenv("PRECLASSIFIER_MIN_CLASS_DOCS", "5"))
+
+# Documents loaded from ai_document_classifications (most recent first) when the model is trained
+PRECLASSIFIER_TRAINING_DOCS = int(os.getenv("PRECLASSIFIER_TRAINING_DOCS", "2000"))
+
+PRECLASSIFIER_HASH_BUCKETS = int(os.getenv("PRECLASSIFIER_HASH_BUCKETS", str(2 ** 18)))
+
+RULES_FILE = r"./document_identification.json"
+
+# Only the start of a document is featurised
+MAX_FEATURE_CHARS = 20000
+
+# Naive Bayes log-likelihoods are averaged per feature and scaled to this many features, so long
+# documents do not produce near-certain posteriors from sheer length
+EVIDENCE_FEATURES = 8
+SMOOTHING = 0.5
+
+# Keyword rule types that correspond to an existing LLM category under a different name
+RULE_CATEGORIES = {
+    "pancard": "Pan Card",
+    "aadhaar": "Aadhar Card",
+    "drivers_license": "Driving License",
+    "voter_id": "Voter ID",
+    "utility_bill": "Utility Bills",
+}
+
+# ID number formats; a match is strong evidence for its document type and fills id_number
+ID_PATTERNS = {
+    "pancard": re.compile(r"\b[A-Z]{5}[0-9]{4}[A-Z]\b"),
+    "aadhaar": re.compile(r"\b[2-9][0-9]{3}\s?[0-9]{4}\s?[0-9]{4}\b"),
+}
+
+# Document types the local tier never answers for
+EXCLUDED_TYPES = {"unknown", "archive", "none", "n/a", ""}
+
+WORD_PATTERN = re.compile(r"\w{2,}", re.UNICODE)
+
+
+def normalise_type(document_type: Optional[str]) -> str:
+    return (document_type or "").strip().lower()
+
+
+def hashed_features(text: str, buckets: int = PRECLASSIFIER_HASH_BUCKETS) -> List[int]:
+    """Distinct hashed word unigrams and bigrams of a document"""
+    words = WORD_PATTERN.findall(text[:MAX_FEATURE_CHARS].lower())
+    grams = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+    return [zlib.crc32(gram.encode("utf-8")) % buckets for gram in grams]
+
+
+@dataclass
+class PreClassification:
+    document_type: str
+    confidence: float
+    tier: str
+    evidence: List[str] = field(default_factory=list)
+    id_number: str = "Unknown"
+
+    def to_result(self) -> Dict:
+        """Classification result in the shape the LLM returns"""
+        evidence = ", ".join(self.evidence[:5])
+        return {
+            "document_type": self.document_type,
+            "Tags": evidence,
+            "summary": f"Identified locally as {self.document_type}.",
+            "reasoning": f"Local {self.tier} classifier matched {evidence or 'the document text'} "
+                         f"with confidence {self.confidence:.2f}.",
+            "id_number": self.id_number,
+            "classified_by": f"pre_classifier:{self.tier}",
+            "confidence_score": round(self.confidence, 3),
+        }
+
+
+class KeywordRules:
+    """Keyword and ID-number rules from document_identification.json, reloaded when the file changes"""
+
+    def __init__(self, filepath: str = RULES_FILE):
+        self.filepath = filepath
+        self._signature = None
+        self._types = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict:
+        try:
+            stat = os.stat(self.filepath)
+        except OSError:
+            return {}
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if signature != self._signature:
+                with open(self.filepath, "r", encoding="utf-8") as f:
+                    self._types = json.load(f).get("document_types", {})
+                self._signature = signature
+            return self._types
+
+    def classify(self, text: str, categories: List[str]) -> Optional[PreClassification]:
+        search_text = text[:MAX_FEATURE_CHARS].lower()
+        by_name = {normalise_type(category): category for category in categories}
+        scores = []
+        for key, config in self._load().items():
+            keywords = config.get("keywords", [])
+            matched = [keyword for keyword in keywords if keyword.lower() in search_text]
+            if not matched:
+                continue
+            threshold = config.get("confidence_threshold", 0.3) or 0.3
+            # Meeting the configured threshold gives 0.5; twice the threshold or more gives 1.0
+            score = min(1.0, 0.5 * (len(matched) / len(keywords)) / threshold)
+            id_match = ID_PATTERNS[key].search(text) if key in ID_PATTERNS else None
+            if id_match:
+                score = 1 - (1 - score) * 0.5
+            name = RULE_CATEGORIES.get(key) or by_name.get(normalise_type(config.get("name"))) or config.get("name") or key
+            scores.append((score, name, matched, id_match.group(0) if id_match else "Unknown"))
+
+        if not scores:
+            return None
+        scores.sort(key=lambda entry: entry[0], reverse=True)
+        score, name, matched, id_number = scores[0]
+        # A strong runner-up makes the match ambiguous
+        if len(scores) > 1:
+            score *= 1 - scores[1][0] / 2
+        return PreClassification(name, score, "rules", matched, id_number)
+
+
+class HashedNaiveBayes:
+    """Multinomial naive Bayes over hashed n-gram presence, trainable incrementally"""
+
+    def __init__(self, buckets: int = PRECLASSIFIER_HASH_BUCKETS):
+        self.buckets = buckets
+        self.class_docs = defaultdict(int)
+        self.class_names = {}
+        self.feature_counts = defaultdict(lambda: defaultdict(int))
+        self.feature_totals = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @property
+    def documents(self) -> int:
+        return sum(self.class_docs.values())
+
+    def learn(self, text: str, document_type: str):
+        label = normalise_type(document_type)
+        if label in EXCLUDED_TYPES or not text.strip():
+            return
+        features = hashed_features(text, self.buckets)
+        with self._lock:
+            self.class_docs[label] += 1
+            self.class_names[label] = document_type.strip()
+            counts = self.feature_counts[label]
+            for feature in features:
+                counts[feature] += 1
+            self.feature_totals[label] += len(features)
+
+    def classify(self, text: str) -> Optional[PreClassification]:
+        features = hashed_features(text, self.buckets)
+        with self._lock:
+            labels = [label for label, docs in self.class_docs.items() if docs >= PRECLASSIFIER_MIN_CLASS_DOCS]
+            if len(labels) < 2 or not features:
+                return None
+            total_docs = sum(self.class_docs[label] for label in labels)
+            scores = {}
+            for label in labels:
+                counts, denominator = self.feature_counts[label], self.feature_totals[label] + SMOOTHING * self.buckets
+                log_likelihood = sum(math.log((counts.get(feature, 0) + SMOOTHING) / denominator) for feature in features)
+                scores[label] = (math.log(self.class_docs[label] / total_docs)
+                                 + log_likelihood / len(features) * EVIDENCE_FEATURES)
+            names = dict(self.class_names)
+
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        confidence = 1 / sum(math.exp(score - top) for score in scores.values())
+        return PreClassification(names[best], confidence, "model")
+
+
+class PreClassifier:
+    """Rules first, then the learned model; keeps skip-rate and agreement statistics"""
+
+    def __init__(self, rules: KeywordRules = None, model: HashedNaiveBayes = None):
+        self.rules = rules or KeywordRules()
+        self.model = model or HashedNaiveBayes()
+        self._lock = threading.Lock()
+        self._training = None
+        self.trained_at = None
+        self.stats = {
+            "documents": 0, "skipped": 0, "escalated": 0, "audited": 0,
+            "agreement": {tier: {"compared": 0, "agreed": 0} for tier in ("rules", "model")},
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return PRECLASSIFIER_ENABLED
+
+    def classify(self, text: str, categories: List[str]) -> Optional[PreClassification]:
+        """Best local guess for a document, or None if neither tier recognises it"""
+        if self.trained_at is None:
+            self.start_training()
+        candidates = [guess for guess in (self.rules.classify(text, categories), self.model.classify(text)) if guess]
+        if not candidates:
+            return None
+        best = max(candidates, key=lambda guess: guess.confidence)
+        if len(candidates) == 2 and normalise_type(candidates[0].document_type) == normalise_type(candidates[1].document_type):
+            # Both tiers agree: combine as independent evidence
+            best.confidence = 1 - (1 - candidates[0].confidence) * (1 - candidates[1].confidence)
+            best.evidence = candidates[0].evidence or candidates[1].evidence
+        return best
+
+    def should_skip_llm(self, guess: Optional[PreClassification]) -> bool:
+        """Count the document and decide whether the local answer is used instead of the LLM"""
+        with self._lock:
+            self.stats["documents"] += 1
+            if guess is None or guess.confidence < PRECLASSIFIER_THRESHOLD:
+                self.stats["escalated"] += 1
+                return False
+            if random.random() < PRECLASSIFIER_AUDIT_RATE:
+                self.stats["audited"] += 1
+                return False
+            self.stats["skipped"] += 1
+            return True
+
+    def record_llm_result(self, text: str, guess: Optional[PreClassification], result) -> None:
+        """Compare the local guess with the LLM's answer and learn from the answer"""
+        if not isinstance(result, dict) or result.get("error") or not result.get("document_type"):
+            return
+        if guess is not None:
+            agreed = normalise_type(guess.document_type) == normalise_type(result["document_type"])
+            with self._lock:
+                self.stats["agreement"][guess.tier]["compared"] += 1
+                self.stats["agreement"][guess.tier]["agreed"] += int(agreed)
+            result["pre_classifier"] = {"document_type": guess.document_type, "confidence": round(guess.confidence, 3),
+                                        "tier": guess.tier, "agreed": agreed}
+        self.model.learn(text, result["document_type"])
+
+    def start_training(self):
+        """Train the model from classification history in the background, once"""
+        with self._lock:
+            if self._training is not None:
+                return
+            self.trained_at = time.time()
+            self._training = threading.Thread(target=self.train_from_history, name="idms-preclassifier-training",
+                                              daemon=True)
+            self._training.start()
+
+    def train_from_history(self, limit: int = PRECLASSIFIER_TRAINING_DOCS) -> int:
+        """Re-extract the text of earlier LLM-classified documents still on disk and learn from them"""
+        from database import db
+        from extractors import extract
+
+        learned = 0
+        for row in db.get_classification_training_rows(limit):
+            if not os.path.isfile(row["file_path"]):
+                continue
+            try:
+                content = extract(row["file_path"])
+            except Exception as e:
+                logger.debug(f"Skipping {row['file_path']} for pre-classifier training: {e}")
+                continue
+            if content.kind == "text" and content.text:
+                self.model.learn(content.text, row["document_type"])
+                learned += 1
+        self.trained_at = time.time()
+        logger.info(f"Pre-classifier trained on {learned} documents from classification history")
+        return learned
+
+    def retrain(self) -> int:
+        """Discard the learned model and train it again from history"""
+        model = HashedNaiveBayes(self.model.buckets)
+        previous, self.model = self.model, model
+        try:
+            return self.train_from_history()
+        except Exception:
+            self.model = previous
+            raise
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = json.loads(json.dumps(self.stats))
+        stats["enabled"] = self.enabled
+        stats["threshold"] = PRECLASSIFIER_THRESHOLD
+        stats["audit_rate"] = PRECLASSIFIER_AUDIT_RATE
+        stats["skip_rate"] = round(stats["skipped"] / stats["documents"], 4) if stats["documents"] else 0.0
+        for tier, agreement in stats["agreement"].items():
+            agreement["rate"] = round(agreement["agreed"] / agreement["compared"], 4) if agreement["compared"] else None
+        stats["model"] = {
+            "documents": self.model.documents,
+            "document_types": len(self.model.class_docs),
+            "trained_at": self.trained_at,
+        }
+        return stats
+
+
+pre_classifier = PreClassifier()
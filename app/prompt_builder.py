@@ -0,0 +1,323 @@
+"""
+Prompt Builder Module
+Renders the classifier prompt within the context window of the configured model
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import logging
+
+from dotenv import load_dotenv
+from prompts import prompt, batch_prompt
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MODEL_ID = os.getenv("WATSONX_MODEL_ID") or ""
+
+# Tokens reserved for the model's answer; also passed to the model as max_new_tokens
+MAX_NEW_TOKENS = int(os.getenv("MAX_NEW_TOKENS", "800"))
+
+# Context window override for models missing from MODEL_CONTEXT_WINDOWS (0 = look it up)
+MODEL_CONTEXT_TOKENS = int(os.getenv("MODEL_CONTEXT_TOKENS", "0"))
+
+# Headroom for the gap between the token estimate and the model's real tokenizer
+PROMPT_SAFETY_MARGIN = float(os.getenv("PROMPT_SAFETY_MARGIN", "0.1"))
+
+# Largest share of the input budget the categories list may take before it is cut
+PROMPT_CATEGORIES_SHARE = float(os.getenv("PROMPT_CATEGORIES_SHARE", "0.25"))
+
+# Context windows by model id prefix (longest matching prefix wins)
+MODEL_CONTEXT_WINDOWS = {
+    "ibm/granite-3": 131072,
+    "ibm/granite-guardian-3": 131072,
+    "ibm/granite-vision-3": 16384,
+    "ibm/granite-13b": 8192,
+    "ibm/granite-20b": 8192,
+    "ibm/granite-34b": 8192,
+    "ibm/granite-8b-code": 128000,
+    "meta-llama/llama-3-3": 131072,
+    "meta-llama/llama-3-2": 131072,
+    "meta-llama/llama-3-1": 131072,
+    "meta-llama/llama-3-405b": 131072,
+    "meta-llama/llama-4": 131072,
+    "meta-llama/llama-3": 8192,
+    "meta-llama/llama-2": 4096,
+    "mistralai/mistral-large": 131072,
+    "mistralai/mistral-small": 32768,
+    "mistralai/mistral-medium": 131072,
+    "mistralai/pixtral": 128000,
+    "mistralai/mixtral-8x7b": 32768,
+    "google/flan": 4096,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Average characters per token by model family, used by estimate_tokens
+CHARS_PER_TOKEN = {
+    "ibm/": 3.6,
+    "meta-llama/": 4.0,
+    "mistralai/": 3.7,
+    "google/": 3.8,
+}
+DEFAULT_CHARS_PER_TOKEN = 3.5
+
+# Share of the content budget given to the start and the end of a long document;
+# the rest goes to the densest sections in between
+HEAD_SHARE = 0.4
+TAIL_SHARE = 0.2
+SECTION_CHARS = 2000
+GAP_MARKER = "\n[...]\n"
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+WORD_PATTERN = re.compile(r"[^\W\d_]{3,}", re.UNICODE)
+
+
+def lookup_by_prefix(table: dict, model_id: str, default):
+    matches = [prefix for prefix in table if model_id.startswith(prefix)]
+    return table[max(matches, key=len)] if matches else default
+
+
+def context_window(model_id: str = MODEL_ID) -> int:
+    if MODEL_CONTEXT_TOKENS:
+        return MODEL_CONTEXT_TOKENS
+    return lookup_by_prefix(MODEL_CONTEXT_WINDOWS, model_id, DEFAULT_CONTEXT_WINDOW)
+
+
+def estimate_tokens(text: str, model_id: str = MODEL_ID) -> int:
+    """Token estimate for the model's tokenizer: words and punctuation count at least one token each,
+    long words and runs of symbols are charged by length"""
+    if not text:
+        return 0
+    chars_per_token = lookup_by_prefix(CHARS_PER_TOKEN, model_id, DEFAULT_CHARS_PER_TOKEN)
+    pieces = sum(max(1, round(len(piece) / chars_per_token)) for piece in TOKEN_PATTERN.findall(text))
+    return max(pieces, int(len(text) / chars_per_token))
+
+
+def input_budget(model_id: str = MODEL_ID, answers: int = 1) -> int:
+    """Tokens available to the prompt once the answers and the safety margin are set aside"""
+    return int((context_window(model_id) - MAX_NEW_TOKENS * answers) * (1 - PROMPT_SAFETY_MARGIN))
+
+
+@dataclass
+class BuiltPrompt:
+    text: str
+    prompt_tokens: int
+    content_tokens: int
+    content_truncated: bool
+    categories_included: int
+    categories_total: int
+
+    def summary(self) -> dict:
+        return {
+            "prompt_tokens_estimate": self.prompt_tokens,
+            "content_tokens_estimate": self.content_tokens,
+            "content_truncated_for_prompt": self.content_truncated,
+            "categories_included": self.categories_included,
+            "categories_total": self.categories_total,
+        }
+
+
+class CategoryBlock:
+    """Categories file rendered for the prompt, re-read only when the file changes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files = {}
+        self._rendered = {}
+
+    def categories(self, filepath: str) -> List[str]:
+        """Category names from the file, cached until its modification time or size changes"""
+        path = os.path.abspath(filepath)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return []
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._files.get(path)
+            if cached and cached[0] == signature:
+                return cached[1]
+
+        with open(path, "r", encoding="utf-8") as f:
+            categories = [line.strip() for line in f if line.strip()]
+        with self._lock:
+            self._files[path] = (signature, categories)
+        return categories
+
+    def render(self, filepath: str, max_tokens: int, model_id: str = MODEL_ID) -> Tuple[str, int, int, int]:
+        """Rendered block, its token estimate, and the number of categories in it and in the file"""
+        categories = self.categories(filepath)
+        key = (os.path.abspath(filepath), max_tokens, model_id)
+        with self._lock:
+            cached = self._rendered.get(key)
+            if cached and cached[0] is categories:
+                return cached[1]
+
+        # Keep whole category names up to the token cap
+        included, tokens = [], 0
+        for category in categories:
+            cost = estimate_tokens(category, model_id) + 1
+            if tokens + cost > max_tokens:
+                logger.warning(f"Categories list cut to {len(included)} of {len(categories)} to fit {max_tokens} tokens")
+                break
+            included.append(category)
+            tokens += cost
+
+        rendered = (", ".join(included), tokens, len(included), len(categories))
+        with self._lock:
+            self._rendered[key] = (categories, rendered)
+        return rendered
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+            self._rendered.clear()
+
+
+category_block = CategoryBlock()
+
+
+def split_sections(text: str, section_chars: int = SECTION_CHARS) -> List[str]:
+    """Paragraphs merged (or split) into sections of roughly section_chars characters"""
+    sections, current = [], ""
+    for paragraph in re.split(r"(\n\s*\n)", text):
+        while len(paragraph) > section_chars:
+            if current:
+                sections.append(current)
+                current = ""
+            sections.append(paragraph[:section_chars])
+            paragraph = paragraph[section_chars:]
+        if current and len(current) + len(paragraph) > section_chars:
+            sections.append(current)
+            current = ""
+        current += paragraph
+    if current:
+        sections.append(current)
+    return sections
+
+
+def section_density(section: str) -> float:
+    """Distinct words per character: high for prose and field labels, low for whitespace, numbers and repetition"""
+    if not section.strip():
+        return 0.0
+    words = WORD_PATTERN.findall(section.lower())
+    return len(set(words)) / len(section)
+
+
+def cut_to_tokens(text: str, max_tokens: int, from_end: bool = False, model_id: str = MODEL_ID) -> str:
+    """Longest prefix (or suffix) of text whose estimate fits max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text, model_id) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        piece = text[-middle:] if from_end else text[:middle]
+        if estimate_tokens(piece, model_id) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[-low:] if from_end and low else text[:low]
+
+
+def select_content(text: str, max_tokens: int, model_id: str = MODEL_ID) -> Tuple[str, int, bool]:
+    """Fit document text into max_tokens, keeping its head and tail and the densest sections in between"""
+    tokens = estimate_tokens(text, model_id)
+    if tokens <= max_tokens:
+        return text, tokens, False
+
+    marker_tokens = estimate_tokens(GAP_MARKER, model_id)
+    sections = split_sections(text)
+    section_tokens = [estimate_tokens(section, model_id) for section in sections]
+
+    # Head and tail sections, in full while they fit their share
+    head_budget, tail_budget = int(max_tokens * HEAD_SHARE), int(max_tokens * TAIL_SHARE)
+    head_end, used = 0, 0
+    while head_end < len(sections) and used + section_tokens[head_end] <= head_budget:
+        used += section_tokens[head_end]
+        head_end += 1
+    tail_start, tail_used = len(sections), 0
+    while tail_start > head_end and tail_used + section_tokens[tail_start - 1] <= tail_budget:
+        tail_start -= 1
+        tail_used += section_tokens[tail_start]
+    if head_end == 0:
+        # A first section larger than the head share is cut rather than dropped
+        head_text = cut_to_tokens(sections[0], head_budget, model_id=model_id)
+        sections[0], section_tokens[0] = head_text, estimate_tokens(head_text, model_id)
+        head_end, used = 1, section_tokens[0]
+    used += tail_used
+
+    # Densest middle sections fill what is left
+    chosen = set(range(head_end)) | set(range(tail_start, len(sections)))
+    densities = {index: section_density(sections[index]) for index in range(head_end, tail_start)}
+    for index in sorted(densities, key=densities.get, reverse=True):
+        if not densities[index]:
+            break
+        cost = section_tokens[index] + marker_tokens
+        if used + cost <= max_tokens - 2 * marker_tokens:
+            chosen.add(index)
+            used += cost
+
+    parts, previous = [], -1
+    for index in sorted(chosen):
+        if parts and index != previous + 1:
+            parts.append(GAP_MARKER)
+        parts.append(sections[index])
+        previous = index
+    if previous != len(sections) - 1:
+        parts.append(GAP_MARKER)
+    selected = "".join(parts)
+    return selected, estimate_tokens(selected, model_id), True
+
+
+def build_prompt(content: Optional[str], categories_file: str, model_id: str = MODEL_ID,
+                 template: str = prompt) -> BuiltPrompt:
+    """Render the classifier prompt for a document, sharing the model's input budget
+    between the categories list and the document text"""
+    budget = input_budget(model_id)
+    fixed_tokens = estimate_tokens(template.replace("{existing_categories}", "").replace("{content}", ""), model_id)
+    available = max(budget - fixed_tokens, 0)
+
+    categories_str, categories_tokens, included, categories_total = category_block.render(
+        categories_file, int(available * PROMPT_CATEGORIES_SHARE), model_id)
+
+    content = content or ""
+    selected, content_tokens, truncated = select_content(content, available - categories_tokens, model_id)
+    if truncated:
+        logger.info(f"Document text cut from {estimate_tokens(content, model_id)} to {content_tokens} tokens "
+                    f"for {model_id or 'the default model'} ({budget} token input budget)")
+
+    text = template.replace("{existing_categories}", categories_str).replace("{content}", selected)
+    return BuiltPrompt(text=text, prompt_tokens=fixed_tokens + categories_tokens + content_tokens,
+                       content_tokens=content_tokens, content_truncated=truncated,
+                       categories_included=included, categories_total=categories_total)
+
+
+def build_batch_prompt(contents: List[str], categories_file: str, model_id: str = MODEL_ID,
+                       template: str = batch_prompt) -> Optional[BuiltPrompt]:
+    """Render several documents into one multi-result prompt, uncut, or None if they do not fit"""
+    budget = input_budget(model_id, answers=len(contents))
+    template = template.replace("{count}", str(len(contents)))
+    fixed_tokens = estimate_tokens(template.replace("{existing_categories}", "").replace("{documents}", ""), model_id)
+
+    # Same categories block as single-document prompts, so both modes see the same list
+    single_fixed = estimate_tokens(prompt.replace("{existing_categories}", "").replace("{content}", ""), model_id)
+    single_available = max(input_budget(model_id) - single_fixed, 0)
+    categories_str, categories_tokens, included, categories_total = category_block.render(
+        categories_file, int(single_available * PROMPT_CATEGORIES_SHARE), model_id)
+
+    documents = "\n\n".join(f"### Document {index}\n{content}" for index, content in enumerate(contents, 1))
+    content_tokens = estimate_tokens(documents, model_id)
+    if fixed_tokens + categories_tokens + content_tokens > budget:
+        return None
+
+    text = template.replace("{existing_categories}", categories_str).replace("{documents}", documents)
+    return BuiltPrompt(text=text, prompt_tokens=fixed_tokens + categories_tokens + content_tokens,
+                       content_tokens=content_tokens, content_truncated=False,
+                       categories_included=included, categories_total=categories_total)
@@ -31,4 +31,44 @@ Use this JSON format for the output:
 
 Please classify the document and return the result as a JSON object only.
 Do not generate intermediate steps or explanation.
-"""
\ No newline at end of file
+"""
+
+batch_prompt = """
+You are an intelligent document classifier and summarizer.
+
+Here is a list of existing categories:
+{existing_categories}
+
+Below are {count} separate documents, each introduced by a "### Document <n>" line. Classify every document on its own, performing the following tasks:
+
+1. Carefully determine the most appropriate category for the document as "document_type".
+   - If an existing category is a **strong match**, use it.
+   - If none of the categories fit **clearly and specifically**, create a new, short category name that better describes the document.
+2. Identify 3-5 major tags or keywords from the document content as "Tags".
+3. Provide a 2-3 sentence summary of the document as "summary".
+4. Explain why you chose the document_type in a field called "reasoning".
+5. If document_type is "Aadhar Card" or "Pan Card", extract the card number and set it in the field "id_number". If not, set "id_number" as "Unknown".
+
+
+Use this JSON format for the output, with one entry per document in document order:
+
+{
+"results": [
+    {
+    "index": <n>,
+    "document_type": "<Document Type>",
+    "Tags": "<Major tags present in the document>",
+    "summary": "<Summary of the content>",
+    "reasoning": "<Brief classification reasoning>",
+    "id_number": "Adhar Card or Pan Card number"
+    }
+]
+}
+
+-------------------------
+{documents}
+-------------------------
+
+Please classify all {count} documents and return the result as a JSON object only.
+Do not generate intermediate steps or explanation.
+"""
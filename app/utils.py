@@ -1,122 +1,191 @@
 import os
-import base64
-import pandas as pd
-import json
-import yaml
-from docx import Document
-from PyPDF2 import PdfReader
-import traceback
+import bz2
+import gzip
+import lzma
+import time
+import tarfile
 import zipfile
-from lxml import etree
 import subprocess
 import logging
 
-def extract_archive(file_path, extract_to_dir):
-    """ Decompress any archive file using 7z CLI and return the list of extracted file paths """
+ARCHIVE_EXTENSIONS = ('.zip', '.7z', '.tar', '.gz', '.bz2', '.xz', '.rar', '.tgz', '.tbz2', '.txz')
+
+# Zip-bomb guards, applied across an archive and everything nested in it
+ARCHIVE_MAX_TOTAL_MB = float(os.getenv("ARCHIVE_MAX_TOTAL_MB", "2048"))
+ARCHIVE_MAX_MEMBER_MB = float(os.getenv("ARCHIVE_MAX_MEMBER_MB", "512"))
+ARCHIVE_MAX_RATIO = float(os.getenv("ARCHIVE_MAX_RATIO", "100"))
+ARCHIVE_MAX_ENTRIES = int(os.getenv("ARCHIVE_MAX_ENTRIES", "1000"))
+ARCHIVE_MAX_DEPTH = int(os.getenv("ARCHIVE_MAX_DEPTH", "3"))
+ARCHIVE_TIMEOUT_SECONDS = float(os.getenv("ARCHIVE_TIMEOUT_SECONDS", "600"))
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+SINGLE_FILE_COMPRESSORS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+class ArchiveLimitError(Exception):
+    """ Raised when an archive trips one of the zip-bomb guards """
+
+
+# Everything iterating an archive can raise: guards, 7z failures and corrupt or truncated data
+ARCHIVE_ERRORS = (ArchiveLimitError, subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError,
+                  zipfile.BadZipFile, tarfile.TarError, EOFError, lzma.LZMAError)
+
+
+class ArchiveBudget:
+    """ Running totals shared by an archive and its nested archives """
+
+    def __init__(self, archive_size):
+        self.archive_size = max(archive_size, 1)
+        self.total_bytes = 0
+        self.entries = 0
+        self.deadline = time.monotonic() + ARCHIVE_TIMEOUT_SECONDS
+
+    def add_entry(self, name):
+        self.entries += 1
+        if self.entries > ARCHIVE_MAX_ENTRIES:
+            raise ArchiveLimitError(f"More than {ARCHIVE_MAX_ENTRIES} entries (at {name})")
+
+    def add_bytes(self, count, member_bytes, name):
+        self.total_bytes += count
+        if member_bytes > ARCHIVE_MAX_MEMBER_MB * 1024 * 1024:
+            raise ArchiveLimitError(f"{name} is larger than {ARCHIVE_MAX_MEMBER_MB:g} MB")
+        if self.total_bytes > ARCHIVE_MAX_TOTAL_MB * 1024 * 1024:
+            raise ArchiveLimitError(f"Archive expands to more than {ARCHIVE_MAX_TOTAL_MB:g} MB")
+        if self.total_bytes > self.archive_size * ARCHIVE_MAX_RATIO and self.total_bytes > COPY_CHUNK_SIZE:
+            raise ArchiveLimitError(f"Compression ratio exceeds {ARCHIVE_MAX_RATIO:g}:1")
+        if time.monotonic() > self.deadline:
+            raise ArchiveLimitError(f"Extraction took longer than {ARCHIVE_TIMEOUT_SECONDS:g}s")
+
+
+def is_archive(file_path):
+    return file_path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def safe_member_path(extract_to_dir, member_name):
+    """ Destination for an archive member, or None if its name escapes the extraction folder """
+    name = member_name.replace('\\', '/').lstrip('/')
+    parts = [part for part in name.split('/') if part not in ('', '.')]
+    if not parts or '..' in parts or os.path.splitdrive(parts[0])[0]:
+        return None
+    return os.path.join(extract_to_dir, *parts)
+
+
+def write_member(stream, dest_path, budget, name):
+    """ Stream one member to disk in chunks, enforcing the size guards as bytes arrive """
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    written = 0
     try:
-        # Run the 7z command-line tool to extract the archive file
-        subprocess.run(['7z', 'x', file_path, f'-o{extract_to_dir}', '-y'], check=True)
-        # Return the paths of the extracted files
-        extracted_files = [os.path.join(extract_to_dir, file) for file in os.listdir(extract_to_dir)]
-        logging.info(f"Archive Extraction Successful: {extracted_files}")
-        return extracted_files
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error extracting archive {file_path}: {e}")
-        traceback.print_exc()  # This gives the full traceback
-        return []
-
-def read_file(file_path):
-    """ Read the content of a file based on its extension """
-    
-    file_ext = os.path.splitext(file_path)[-1].lower()
-    logging.info(f"Reading file: {file_path}")
-    
-    # Handle CSV files
-    if file_ext == '.csv':
-        return pd.read_csv(file_path)
-    
-    # Handle Excel files
-    elif file_ext in ['.xls', '.xlsx']:
-        return pd.read_excel(file_path)
-    
-    # Handle JSON files
-    elif file_ext == '.json':
-        with open(file_path, 'r', encoding='UTF-8') as file:
-            content = file.read()
-            if not content:
-                logging.warning(f"Warning: The file {file_path} is empty.")
-                return None
-            try:
-                return json.loads(content)
-            except json.JSONDecodeError as e:
-                logging.error(f"Error decoding JSON from {file_path}: {e}")
-                return None
-    
-    # Handle YAML files (.yaml or .yml)
-    elif file_ext in ['.yaml', '.yml']:
-        with open(file_path, 'r', encoding='UTF-8') as file:
-            try:
-                # Load YAML content
-                return yaml.safe_load(file)
-            except yaml.YAMLError as e:
-                logging.error(f"Error decoding YAML from {file_path}: {e}")
-                return None
-    
-    # Handle .odt files (OpenDocument Text)
-    elif file_ext == '.odt':
-        try:
-            with zipfile.ZipFile(file_path, 'r') as zf:
-                # Extract the content.xml file
-                content = zf.read("content.xml")
-
-            # Parse the XML content
-            tree = etree.fromstring(content)
-
-            # Define namespaces dictionary (this is crucial for parsing ODT)
-            namespaces = {
-                'text': 'urn:oasis:names:tc:opendocument:xmlns:text:1.0',
-                'office': 'urn:oasis:names:tc:opendocument:xmlns:office:1.0',
-                'style': 'urn:oasis:names:tc:opendocument:xmlns:style:1.0',
-                'fo': 'urn:xsl:formats',
-                'svg': 'urn:oasis:names:tc:opendocument:xmlns:svg-compatible:1.0',
-                'xlink': 'http://www.w3.org/1999/xlink'
-            }
-
-            paragraphs = tree.xpath('//text:p', namespaces=namespaces)
-            paragraph_texts = '\n'.join([paragraph.text for paragraph in paragraphs if paragraph.text])
-            return paragraph_texts
-        except Exception as e:
-            logging.error(f"Error reading .odt file {file_path}: {e}")
-            traceback.print_exc()  # This gives the full traceback
-            return None
-    
-    # Handle DOCX files (text extraction)
-    elif file_ext == '.docx':
-        doc = Document(file_path)
-        return ' '.join([para.text for para in doc.paragraphs])
-    
-    # Handle PDF files (text extraction)
-    elif file_ext == '.pdf':
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        return text
-    
-    # Handle image files (Returning file path as placeholder)
-    elif file_ext in ['.png', '.jpg', '.jpeg']:
-        with open(file_path,"rb") as img:
-            encoded_img = base64.b64encode(img.read()).decode("utf-8")
-        return {"file_type": "image", "img": encoded_img}
-
-    # Handle code files (Returning file content)
-    elif file_ext in ['.txt','.cpp', '.java', '.php', '.py', '.bat']:
-        with open(file_path, 'r',  encoding='utf-8') as file:
-            return file.read()
-
-    # Handle archive files (extract and process each file inside)
-    elif file_ext in ['.zip', '.7z', '.tar', '.gz', '.bz2', '.xz', '.rar']:
-        extract_to_dir = os.path.splitext(file_path)[0]  # Use a folder named after the archive file
-        os.makedirs(extract_to_dir, exist_ok=True)
-        extracted_files = extract_archive(file_path, extract_to_dir)
-        return {"extracted_files":extracted_files, "file_type":"zip"}
+        with open(dest_path, 'wb') as out:
+            while True:
+                chunk = stream.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                budget.add_bytes(len(chunk), written, name)
+                out.write(chunk)
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    return dest_path
+
+
+def iter_zip(file_path, extract_to_dir, budget):
+    with zipfile.ZipFile(file_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            budget.add_entry(info.filename)
+            dest_path = safe_member_path(extract_to_dir, info.filename)
+            if dest_path is None:
+                logging.warning(f"Skipping unsafe archive member {info.filename} in {file_path}")
+                continue
+            if info.compress_size and info.file_size / info.compress_size > ARCHIVE_MAX_RATIO and info.file_size > COPY_CHUNK_SIZE:
+                raise ArchiveLimitError(f"{info.filename} declares a compression ratio above {ARCHIVE_MAX_RATIO:g}:1")
+            with archive.open(info) as stream:
+                yield write_member(stream, dest_path, budget, info.filename)
+
+
+def iter_tar(file_path, extract_to_dir, budget):
+    # Stream mode reads the (possibly compressed) tar front to back without seeking
+    with tarfile.open(file_path, 'r|*') as archive:
+        for member in archive:
+            if not member.isfile():
+                continue  # directories, links and devices are never materialised
+            budget.add_entry(member.name)
+            dest_path = safe_member_path(extract_to_dir, member.name)
+            if dest_path is None:
+                logging.warning(f"Skipping unsafe archive member {member.name} in {file_path}")
+                continue
+            yield write_member(archive.extractfile(member), dest_path, budget, member.name)
+
+
+def iter_compressed_file(file_path, extract_to_dir, budget):
+    """ A lone .gz/.bz2/.xz file holds a single member named after the archive """
+    base_name, extension = os.path.splitext(os.path.basename(file_path))
+    budget.add_entry(base_name)
+    with SINGLE_FILE_COMPRESSORS[extension.lower()](file_path, 'rb') as stream:
+        yield write_member(stream, os.path.join(extract_to_dir, base_name), budget, base_name)
+
+
+def iter_7z(file_path, extract_to_dir, budget):
+    """ 7z and rar archives still go through the 7z CLI, checked against its listing first """
+    listing = subprocess.run(['7z', 'l', '-slt', file_path], capture_output=True, text=True, check=True,
+                             timeout=ARCHIVE_TIMEOUT_SECONDS).stdout
+    declared_total = 0
+    for line in listing.splitlines():
+        if line.startswith('Size = '):
+            size = int(line[7:] or 0)
+            declared_total += size
+            budget.add_entry(file_path)
+            if size > ARCHIVE_MAX_MEMBER_MB * 1024 * 1024:
+                raise ArchiveLimitError(f"A member of {file_path} is larger than {ARCHIVE_MAX_MEMBER_MB:g} MB")
+    if budget.total_bytes + declared_total > ARCHIVE_MAX_TOTAL_MB * 1024 * 1024:
+        raise ArchiveLimitError(f"Archive expands to more than {ARCHIVE_MAX_TOTAL_MB:g} MB")
+
+    remaining = max(budget.deadline - time.monotonic(), 1)
+    subprocess.run(['7z', 'x', file_path, f'-o{extract_to_dir}', '-y'], check=True, capture_output=True,
+                   timeout=remaining)
+    real_root = os.path.realpath(extract_to_dir)
+    for root, dirs, files in os.walk(extract_to_dir):
+        dirs.sort()
+        for name in sorted(files):
+            member_path = os.path.join(root, name)
+            if os.path.islink(member_path) or not os.path.realpath(member_path).startswith(real_root + os.sep):
+                os.remove(member_path)
+                continue
+            budget.add_bytes(os.path.getsize(member_path), os.path.getsize(member_path), name)
+            yield member_path
+
+
+def iter_archive_members(file_path, extract_to_dir, depth=0, budget=None):
+    """ Extract an archive one member at a time, yielding each file's path as soon as it is on disk.
+    Subdirectories are walked and nested archives expanded in place up to ARCHIVE_MAX_DEPTH;
+    raises ArchiveLimitError if a size, ratio, entry-count or time guard is exceeded """
+    if budget is None:
+        budget = ArchiveBudget(os.path.getsize(file_path))
+    lower_path = file_path.lower()
+    extension = os.path.splitext(lower_path)[1]
+
+    if zipfile.is_zipfile(file_path):
+        members = iter_zip(file_path, extract_to_dir, budget)
+    elif lower_path.endswith(('.7z', '.rar')):
+        members = iter_7z(file_path, extract_to_dir, budget)
+    elif tarfile.is_tarfile(file_path):
+        members = iter_tar(file_path, extract_to_dir, budget)
+    elif extension in SINGLE_FILE_COMPRESSORS:
+        members = iter_compressed_file(file_path, extract_to_dir, budget)
+    else:
+        members = iter_7z(file_path, extract_to_dir, budget)
+
+    for member_path in members:
+        if not is_archive(member_path):
+            yield member_path
+        elif depth + 1 >= ARCHIVE_MAX_DEPTH:
+            logging.warning(f"Skipping nested archive {member_path}: deeper than {ARCHIVE_MAX_DEPTH} levels")
+            os.remove(member_path)
+        else:
+            nested_dir = member_path + "_contents"
+            yield from iter_archive_members(member_path, nested_dir, depth + 1, budget)
+            os.remove(member_path)
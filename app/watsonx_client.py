@@ -0,0 +1,382 @@
+"""
+Watsonx Client Module
+Shared inference client for watsonx.ai: pooled HTTP connections, rate limiting,
+bounded concurrency, retries with jittered backoff and per-call deadlines
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Dict, List, Optional
+import logging
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+API_KEY = os.getenv("WATSONX_API_KEY")
+SERVICE_URL = (os.getenv("WATSONX_SERVICE_URL") or "").rstrip("/")
+PROJECT_ID = os.getenv("WATSONX_PROJECT_ID")
+MODEL_ID = os.getenv("WATSONX_MODEL_ID")
+IAM_URL = os.getenv("WATSONX_IAM_URL", "https://iam.cloud.ibm.com/identity/token")
+
+# "http" talks to the REST API directly; "sdk" goes through ibm_watsonx_ai's ModelInference
+WATSONX_TRANSPORT = os.getenv("WATSONX_TRANSPORT", "http").lower()
+WATSONX_API_VERSION = os.getenv("WATSONX_API_VERSION", "2024-05-01")
+
+# Requests per second allowed by our watsonx quota, and how many may be sent back to back
+WATSONX_RATE_LIMIT_PER_SECOND = float(os.getenv("WATSONX_RATE_LIMIT_PER_SECOND", "8"))
+WATSONX_RATE_LIMIT_BURST = int(os.getenv("WATSONX_RATE_LIMIT_BURST", "8"))
+
+WATSONX_MAX_CONCURRENCY = int(os.getenv("WATSONX_MAX_CONCURRENCY", "4"))
+WATSONX_MAX_CONNECTIONS = int(os.getenv("WATSONX_MAX_CONNECTIONS", "10"))
+
+# Each attempt gets WATSONX_REQUEST_TIMEOUT_SECONDS; a call including its retries gets WATSONX_CALL_DEADLINE_SECONDS
+WATSONX_REQUEST_TIMEOUT_SECONDS = float(os.getenv("WATSONX_REQUEST_TIMEOUT_SECONDS", "60"))
+WATSONX_CALL_DEADLINE_SECONDS = float(os.getenv("WATSONX_CALL_DEADLINE_SECONDS", "180"))
+WATSONX_MAX_RETRIES = int(os.getenv("WATSONX_MAX_RETRIES", "4"))
+WATSONX_RETRY_BASE_SECONDS = float(os.getenv("WATSONX_RETRY_BASE_SECONDS", "0.5"))
+WATSONX_RETRY_MAX_SECONDS = float(os.getenv("WATSONX_RETRY_MAX_SECONDS", "20"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504, 520, 524}
+
+# IAM tokens are refreshed this long before they expire
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+
+class WatsonxError(Exception):
+    """Raised when an inference call fails for good"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class WatsonxDeadlineExceeded(WatsonxError):
+    """Raised when a call and its retries run past their deadline"""
+
+
+class RetryableError(Exception):
+    """An attempt failed in a way that is worth retrying"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by threads and event loops"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, returning how long the caller must wait before using it"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self, deadline: float):
+        wait = self._reserve()
+        if time.monotonic() + wait > deadline:
+            raise WatsonxDeadlineExceeded("Deadline passed while waiting for the rate limiter")
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, deadline: float):
+        wait = self._reserve()
+        if time.monotonic() + wait > deadline:
+            raise WatsonxDeadlineExceeded("Deadline passed while waiting for the rate limiter")
+        if wait:
+            await asyncio.sleep(wait)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, added on top of the server's Retry-After so callers told
+    to wait the same time do not all come back at once"""
+    delay = random.uniform(0, min(WATSONX_RETRY_MAX_SECONDS, WATSONX_RETRY_BASE_SECONDS * (2 ** attempt)))
+    return delay + (retry_after or 0)
+
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class WatsonxClient:
+    """Text generation and chat against watsonx.ai, usable from threads and from async code"""
+
+    def __init__(self, api_key: str = API_KEY, service_url: str = SERVICE_URL, project_id: str = PROJECT_ID,
+                 model_id: str = MODEL_ID, transport: str = WATSONX_TRANSPORT):
+        self.api_key = api_key
+        self.service_url = service_url
+        self.project_id = project_id
+        self.model_id = model_id
+        self.transport = transport
+        self.rate_limiter = TokenBucket(WATSONX_RATE_LIMIT_PER_SECOND, WATSONX_RATE_LIMIT_BURST)
+        self._slots = threading.BoundedSemaphore(max(WATSONX_MAX_CONCURRENCY, 1))
+        self._lock = threading.Lock()
+        self._http = None
+        self._async_http = {}
+        self._sdk_model = None
+        self._token = None
+        self._token_expires = 0.0
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "rate_limited": 0}
+
+    # -- connections -------------------------------------------------------
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=WATSONX_MAX_CONNECTIONS, max_keepalive_connections=WATSONX_MAX_CONNECTIONS)
+
+    def http(self) -> httpx.Client:
+        with self._lock:
+            if self._http is None:
+                self._http = httpx.Client(limits=self._limits(), timeout=WATSONX_REQUEST_TIMEOUT_SECONDS)
+            return self._http
+
+    def async_http(self) -> httpx.AsyncClient:
+        """One pooled async client per event loop, since httpx clients cannot be shared across loops"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_http.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(limits=self._limits(), timeout=WATSONX_REQUEST_TIMEOUT_SECONDS)
+                self._async_http[loop] = client
+            return client
+
+    def sdk_model(self):
+        with self._lock:
+            if self._sdk_model is None:
+                from ibm_watsonx_ai.foundation_models import ModelInference
+                self._sdk_model = ModelInference(
+                    model_id=self.model_id,
+                    credentials={"api_key": self.api_key, "url": self.service_url},
+                    project_id=self.project_id
+                )
+            return self._sdk_model
+
+    def close(self):
+        with self._lock:
+            if self._http is not None:
+                self._http.close()
+                self._http = None
+
+    # -- authentication ----------------------------------------------------
+
+    def _token_request(self) -> Dict:
+        return {"url": IAM_URL, "data": {"grant_type": "urn:ibm:params:oauth:grant-type:apikey", "apikey": self.api_key},
+                "headers": {"Accept": "application/json"}}
+
+    def _store_token(self, response: httpx.Response) -> str:
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise RetryableError(f"IAM token request failed: HTTP {response.status_code}",
+                                 parse_retry_after(response), response.status_code)
+        if response.status_code != 200:
+            raise WatsonxError(f"IAM token request failed: {response.status_code} {response.text[:200]}",
+                               response.status_code)
+        try:
+            body = response.json()
+            self._token = body["access_token"]
+            self._token_expires = time.monotonic() + float(body.get("expires_in", 3600)) - TOKEN_REFRESH_MARGIN_SECONDS
+        except (ValueError, KeyError, TypeError) as e:
+            raise WatsonxError(f"Malformed IAM token response: {type(e).__name__}: {e}")
+        return self._token
+
+    def _cached_token(self) -> Optional[str]:
+        return self._token if self._token and time.monotonic() < self._token_expires else None
+
+    def token(self) -> str:
+        return self._cached_token() or self._store_token(self.http().post(**self._token_request()))
+
+    async def token_async(self) -> str:
+        return self._cached_token() or self._store_token(await self.async_http().post(**self._token_request()))
+
+    # -- requests ----------------------------------------------------------
+
+    def _endpoint(self, kind: str) -> str:
+        return f"{self.service_url}/ml/v1/text/{kind}?version={WATSONX_API_VERSION}"
+
+    def _payload(self, kind: str, body: Dict) -> Dict:
+        return dict(body, model_id=self.model_id, project_id=self.project_id)
+
+    def _check(self, response: httpx.Response) -> Dict:
+        if response.status_code == 401:
+            self._token = None
+            raise RetryableError("IAM token rejected", status_code=401)
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            if response.status_code == 429:
+                self.stats["rate_limited"] += 1
+            raise RetryableError(f"HTTP {response.status_code}: {response.text[:200]}",
+                                 parse_retry_after(response), response.status_code)
+        if response.status_code >= 400:
+            raise WatsonxError(f"HTTP {response.status_code}: {response.text[:200]}", response.status_code)
+        try:
+            return response.json()
+        except ValueError:
+            raise WatsonxError(f"HTTP {response.status_code} response is not JSON: {response.text[:200]}",
+                               response.status_code)
+
+    def _sdk_call(self, kind: str, body: Dict) -> Dict:
+        """Same request through ibm_watsonx_ai, shaped like the REST response"""
+        model = self.sdk_model()
+        try:
+            if kind == "chat":
+                return model.chat(messages=body["messages"], params=body.get("parameters"))
+            return model.generate(prompt=body["input"], params=body.get("parameters"))
+        except Exception as e:
+            status_code = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+            if status_code is None or status_code in RETRYABLE_STATUS_CODES:
+                raise RetryableError(str(e), status_code=status_code)
+            raise WatsonxError(str(e), status_code)
+
+    def _attempt(self, kind: str, body: Dict, timeout: float) -> Dict:
+        if self.transport == "sdk":
+            return self._sdk_call(kind, body)
+        try:
+            response = self.http().post(self._endpoint(kind), json=self._payload(kind, body), timeout=timeout,
+                                        headers={"Authorization": f"Bearer {self.token()}"})
+        except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as e:
+            raise RetryableError(f"{type(e).__name__}: {e}")
+        except (httpx.HTTPError, httpx.InvalidURL) as e:
+            # Bad configuration (e.g. no WATSONX_SERVICE_URL) or protocol errors that a retry will not fix
+            raise WatsonxError(f"{type(e).__name__}: {e}")
+        return self._check(response)
+
+    async def _attempt_async(self, kind: str, body: Dict, timeout: float) -> Dict:
+        try:
+            response = await self.async_http().post(self._endpoint(kind), json=self._payload(kind, body), timeout=timeout,
+                                                    headers={"Authorization": f"Bearer {await self.token_async()}"})
+        except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as e:
+            raise RetryableError(f"{type(e).__name__}: {e}")
+        except (httpx.HTTPError, httpx.InvalidURL) as e:
+            raise WatsonxError(f"{type(e).__name__}: {e}")
+        return self._check(response)
+
+    def _release_slot_when_done(self, future: asyncio.Future, acquired: bool = True):
+        """Give back the slot held by (or, for an acquire, obtained by) a thread that outlived its caller"""
+        def release(done: asyncio.Future):
+            obtained = not done.cancelled() and done.exception() is None and done.result()
+            if acquired or obtained:
+                self._slots.release()
+        future.add_done_callback(release)
+
+    async def _acquire_slot_async(self, deadline: float) -> bool:
+        """Wait for a concurrency slot in a worker thread. If the caller is cancelled meanwhile,
+        a slot the thread still obtains is released again instead of leaking."""
+        loop = asyncio.get_running_loop()
+        acquiring = loop.run_in_executor(None, self._slots.acquire, True, max(deadline - time.monotonic(), 0))
+        try:
+            return await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            self._release_slot_when_done(acquiring, acquired=False)
+            raise
+
+    def _give_up(self, kind: str, attempt: int, error: RetryableError, deadline: float) -> Optional[float]:
+        """Delay before the next attempt, or raise if the retries or the deadline are used up"""
+        self.stats["retries"] += 1
+        delay = backoff_delay(attempt, error.retry_after)
+        if attempt >= WATSONX_MAX_RETRIES:
+            self.stats["failures"] += 1
+            raise WatsonxError(f"watsonx {kind} failed after {attempt + 1} attempts: {error}", error.status_code)
+        if time.monotonic() + delay >= deadline:
+            self.stats["failures"] += 1
+            raise WatsonxDeadlineExceeded(f"watsonx {kind} deadline exceeded after {attempt + 1} attempts: {error}",
+                                          error.status_code)
+        logger.warning(f"watsonx {kind} attempt {attempt + 1} failed ({error}); retrying in {delay:.2f}s")
+        return delay
+
+    def request(self, kind: str, body: Dict, deadline_seconds: float = WATSONX_CALL_DEADLINE_SECONDS) -> Dict:
+        """POST to /ml/v1/text/<kind> with rate limiting, bounded concurrency and retries"""
+        deadline = time.monotonic() + deadline_seconds
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(deadline)
+            if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                raise WatsonxDeadlineExceeded(f"watsonx {kind} deadline passed while waiting for a free slot")
+            try:
+                return self._attempt(kind, body, min(WATSONX_REQUEST_TIMEOUT_SECONDS, max(deadline - time.monotonic(), 0.1)))
+            except RetryableError as e:
+                delay = self._give_up(kind, attempt, e, deadline)
+            finally:
+                self._slots.release()
+            time.sleep(delay)
+            attempt += 1
+
+    async def request_async(self, kind: str, body: Dict, deadline_seconds: float = WATSONX_CALL_DEADLINE_SECONDS) -> Dict:
+        """Async counterpart of request(); shares the rate limiter and concurrency slots with it"""
+        deadline = time.monotonic() + deadline_seconds
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire_async(deadline)
+            if not await self._acquire_slot_async(deadline):
+                raise WatsonxDeadlineExceeded(f"watsonx {kind} deadline passed while waiting for a free slot")
+            sdk_call = None
+            try:
+                timeout = min(WATSONX_REQUEST_TIMEOUT_SECONDS, max(deadline - time.monotonic(), 0.1))
+                if self.transport == "sdk":
+                    sdk_call = asyncio.get_running_loop().run_in_executor(None, self._sdk_call, kind, body)
+                    return await asyncio.wait_for(asyncio.shield(sdk_call), timeout)
+                return await self._attempt_async(kind, body, timeout)
+            except asyncio.TimeoutError:
+                delay = self._give_up(kind, attempt, RetryableError("attempt timed out"), deadline)
+            except RetryableError as e:
+                delay = self._give_up(kind, attempt, e, deadline)
+            finally:
+                if sdk_call is not None and not sdk_call.done():
+                    # The SDK call cannot be interrupted; it keeps the slot until its thread returns
+                    self._release_slot_when_done(sdk_call)
+                else:
+                    self._slots.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    # -- inference ---------------------------------------------------------
+
+    @staticmethod
+    def _generation_body(prompt: str, params: Optional[Dict]) -> Dict:
+        return {"input": prompt, "parameters": params or {}}
+
+    def _chat_body(self, messages: List[Dict], params: Optional[Dict]) -> Dict:
+        # The REST chat API takes its parameters at the top level, the SDK as a separate argument
+        if self.transport == "sdk":
+            return {"messages": messages, "parameters": params}
+        return dict(params or {}, messages=messages)
+
+    @staticmethod
+    def _generated_text(response: Dict) -> str:
+        results = response.get("results") or []
+        return results[0].get("generated_text", "") if results else ""
+
+    def generate_text(self, prompt: str, params: Optional[Dict] = None, **kwargs) -> str:
+        return self._generated_text(self.request("generation", self._generation_body(prompt, params), **kwargs))
+
+    async def generate_text_async(self, prompt: str, params: Optional[Dict] = None, **kwargs) -> str:
+        return self._generated_text(await self.request_async("generation", self._generation_body(prompt, params), **kwargs))
+
+    def chat(self, messages: List[Dict], params: Optional[Dict] = None, **kwargs) -> Dict:
+        return self.request("chat", self._chat_body(messages, params), **kwargs)
+
+    async def chat_async(self, messages: List[Dict], params: Optional[Dict] = None, **kwargs) -> Dict:
+        return await self.request_async("chat", self._chat_body(messages, params), **kwargs)
+
+
+watsonx_client = WatsonxClient()
@@ -0,0 +1,325 @@
+"""
+IDMS Analytics Benchmark Script
+Builds a synthetic database (1M documents by default) and compares the latency of
+IDMSDatabase.get_analytics_data (served from the daily rollups) against the previous
+14-query implementation over the document tables.
+
+Usage:
+    python scripts/benchmark_analytics.py [--rows 1000000] [--users 50] [--repeat 5] [--db path]
+
+The synthetic database is created in a temporary folder unless --db is given
+(an existing --db file is reused, which makes repeated runs fast).
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict
+
+# Add app directory to path to import database
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from database import IDMSDatabase
+
+DOCUMENT_TYPES = ['Invoice', 'Aadhaar Card', 'PAN Card', 'Passport', 'Bank Statement', 'Payslip',
+                  'Contract', 'Resume', 'Utility Bill', 'Insurance Policy', 'Tax Return', 'Unknown']
+CRITICALITY_LEVELS = ['High', 'Medium', 'Low', 'Unknown']
+FILE_TYPES = ['.pdf', '.docx', '.xlsx', '.csv', '.png', '.jpg', '.txt', '.zip']
+STATUSES = ['completed'] * 19 + ['failed']
+
+# Indexes added alongside the rollups; dropped while timing the previous implementation
+NEW_INDEXES = ['idx_ai_doc_user_upload_time', 'idx_user_ghostlayer_upload_time', 'idx_user_ghostlayer_user_upload_time']
+
+
+def legacy_get_analytics_data(db_path: str, user_id: int = None) -> Dict:
+    """Previous implementation: 14 queries, DATE() on the indexed column, interpolated user_id"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # Build WHERE clause for user filtering
+    user_filter_ai = f"WHERE user_id = {user_id}" if user_id else ""
+    user_filter_gl = f"WHERE user_id = {user_id}" if user_id else ""
+
+    # Total documents processed today (AI + GhostLayer)
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM ai_document_classifications 
+        {user_filter_ai} {'AND' if user_id else 'WHERE'} DATE(upload_timestamp) = DATE('now')
+    """)
+    ai_today = cursor.fetchone()[0]
+
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM user_ghostlayer_documents 
+        {user_filter_gl} {'AND' if user_id else 'WHERE'} DATE(upload_timestamp) = DATE('now')
+    """)
+    gl_today = cursor.fetchone()[0]
+
+    processed_today = ai_today + gl_today
+
+    # Total documents
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM ai_document_classifications 
+        {user_filter_ai}
+    """)
+    total_ai = cursor.fetchone()[0]
+
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM user_ghostlayer_documents 
+        {user_filter_gl}
+    """)
+    total_gl = cursor.fetchone()[0]
+
+    total_documents = total_ai + total_gl
+
+    # Error rate calculation (AI + GhostLayer)
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM ai_document_classifications 
+        {user_filter_ai} {'AND' if user_id else 'WHERE'} processing_status = 'failed'
+    """)
+    ai_failed = cursor.fetchone()[0]
+
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM user_ghostlayer_documents 
+        {user_filter_gl} {'AND' if user_id else 'WHERE'} processing_status = 'failed'
+    """)
+    gl_failed = cursor.fetchone()[0]
+
+    total_failed = ai_failed + gl_failed
+    error_rate = (total_failed / total_documents * 100) if total_documents > 0 else 0
+
+    # Document types distribution (AI + GhostLayer combined)
+    cursor.execute(f"""
+        SELECT document_type, COUNT(*) as count 
+        FROM ai_document_classifications 
+        {user_filter_ai} {'AND' if user_id else 'WHERE'} document_type IS NOT NULL AND document_type != 'Unknown'
+        GROUP BY document_type
+    """)
+    ai_types = cursor.fetchall()
+
+    cursor.execute(f"""
+        SELECT document_type, COUNT(*) as count 
+        FROM user_ghostlayer_documents 
+        {user_filter_gl} {'AND' if user_id else 'WHERE'} document_type IS NOT NULL AND document_type != 'Unknown'
+        GROUP BY document_type
+    """)
+    gl_types = cursor.fetchall()
+
+    # Combine document types
+    type_counts = {}
+    for row in ai_types + gl_types:
+        type_counts[row[0]] = type_counts.get(row[0], 0) + row[1]
+
+    document_types = [{'name': k, 'count': v} for k, v in sorted(type_counts.items(), key=lambda x: x[1], reverse=True)]
+
+    # Criticality levels distribution (AI only - GhostLayer doesn't have criticality)
+    cursor.execute(f"""
+        SELECT criticality_level, COUNT(*) as count 
+        FROM ai_document_classifications 
+        {user_filter_ai} {'AND' if user_id else 'WHERE'} criticality_level IS NOT NULL AND criticality_level != 'Unknown'
+        GROUP BY criticality_level 
+        ORDER BY count DESC
+    """)
+    criticality_levels = [{'name': row[0], 'count': row[1]} for row in cursor.fetchall()]
+
+    # Processing trends (last 30 days) - AI + GhostLayer combined
+    cursor.execute(f"""
+        SELECT DATE(upload_timestamp) as date, COUNT(*) as count
+        FROM ai_document_classifications 
+        {user_filter_ai} {'AND' if user_id else 'WHERE'} upload_timestamp >= datetime('now', '-30 days')
+        GROUP BY DATE(upload_timestamp)
+    """)
+    ai_trends = cursor.fetchall()
+
+    cursor.execute(f"""
+        SELECT DATE(upload_timestamp) as date, COUNT(*) as count
+        FROM user_ghostlayer_documents 
+        {user_filter_gl} {'AND' if user_id else 'WHERE'} upload_timestamp >= datetime('now', '-30 days')
+        GROUP BY DATE(upload_timestamp)
+    """)
+    gl_trends = cursor.fetchall()
+
+    # Combine trends by date
+    trend_counts = {}
+    for row in ai_trends + gl_trends:
+        trend_counts[row[0]] = trend_counts.get(row[0], 0) + row[1]
+
+    processing_trends = [{'date': k, 'count': v} for k, v in sorted(trend_counts.items())]
+
+    # File types distribution (AI + GhostLayer)
+    cursor.execute(f"""
+        SELECT file_type, COUNT(*) as count 
+        FROM ai_document_classifications 
+        {user_filter_ai} {'AND' if user_id else 'WHERE'} file_type IS NOT NULL AND file_type != ''
+        GROUP BY file_type
+    """)
+    ai_file_types = cursor.fetchall()
+
+    cursor.execute(f"""
+        SELECT document_format, COUNT(*) as count 
+        FROM user_ghostlayer_documents 
+        {user_filter_gl} {'AND' if user_id else 'WHERE'} document_format IS NOT NULL AND document_format != ''
+        GROUP BY document_format
+    """)
+    gl_file_types = cursor.fetchall()
+
+    # Combine file types
+    file_type_counts = {}
+    for row in ai_file_types + gl_file_types:
+        file_type_counts[row[0]] = file_type_counts.get(row[0], 0) + row[1]
+
+    file_types = [{'name': k, 'count': v} for k, v in sorted(file_type_counts.items(), key=lambda x: x[1], reverse=True)]
+
+    # GhostLayer specific stats
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM user_ghostlayer_documents 
+        {user_filter_gl}
+    """)
+    ghostlayer_count = cursor.fetchone()[0]
+
+    # AI Classification specific stats
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM ai_document_classifications 
+        {user_filter_ai}
+    """)
+    ai_classification_count = cursor.fetchone()[0]
+
+    conn.close()
+
+    return {
+        'total_documents': total_documents,
+        'ai_documents': ai_classification_count,
+        'ghostlayer_documents': ghostlayer_count,
+        'processed_today': processed_today,
+        'error_rate': round(error_rate, 1),
+        'success_rate': round(100 - error_rate, 1),
+        'document_types': document_types,
+        'criticality_levels': criticality_levels,
+        'processing_trends': processing_trends,
+        'file_types': file_types
+    }
+
+
+def populate(db_path: str, rows: int, users: int):
+    """Insert synthetic documents spread over the last year (80% AI, 20% GhostLayer)"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    now = datetime.utcnow()
+    payload = json.dumps({'reasoning': 'x' * 200})  # keeps rows realistically wide
+    rng = random.Random(42)
+
+    def timestamp() -> str:
+        # Recent days are busier, like a real dashboard
+        return (now - timedelta(seconds=int(rng.expovariate(1 / (90 * 86400))) % (365 * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+
+    ai_rows = int(rows * 0.8)
+    batch = 50000
+    for offset in range(0, ai_rows, batch):
+        conn.executemany("""
+            INSERT INTO ai_document_classifications (
+                user_id, uploaded_by, filename, original_filename, file_size, file_type, document_type,
+                criticality_level, file_path, upload_timestamp, processing_status, reasoning
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (user, f"user{user}", f"doc{i}.pdf", f"doc{i}.pdf", rng.randint(1000, 5000000), rng.choice(FILE_TYPES),
+             rng.choice(DOCUMENT_TYPES), rng.choice(CRITICALITY_LEVELS), f"/data/doc{i}", timestamp(),
+             rng.choice(STATUSES), payload)
+            for i in range(offset, min(offset + batch, ai_rows))
+            for user in [rng.randint(1, users)]
+        ])
+        conn.commit()
+
+    for offset in range(0, rows - ai_rows, batch):
+        conn.executemany("""
+            INSERT INTO user_ghostlayer_documents (
+                user_id, uploaded_by, document_name, document_type, document_format, document_size,
+                document_path, upload_timestamp, processing_status, ai_analysis_result
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (user, f"user{user}", f"gl{i}.pdf", rng.choice(DOCUMENT_TYPES), rng.choice(FILE_TYPES),
+             rng.randint(1000, 5000000), f"/data/gl{i}", timestamp(), rng.choice(STATUSES), payload)
+            for i in range(offset, min(offset + batch, rows - ai_rows))
+            for user in [rng.randint(1, users)]
+        ])
+        conn.commit()
+
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def measure(func, repeat: int) -> Dict:
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': statistics.median(timings), 'min_ms': min(timings), 'result': result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dashboard analytics queries")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", help="Synthetic database path (kept between runs)")
+    args = parser.parse_args()
+
+    temp_dir = None
+    db_path = args.db
+    if not db_path:
+        temp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(temp_dir.name, "analytics_bench.db")
+
+    try:
+        db = IDMSDatabase(db_path)
+        conn = sqlite3.connect(db_path)
+        existing = conn.execute("SELECT COUNT(*) FROM ai_document_classifications").fetchone()[0]
+        conn.close()
+        if not existing:
+            print(f"Populating {args.rows:,} synthetic documents in {db_path} ...")
+            start = time.perf_counter()
+            populate(db_path, args.rows, args.users)
+            print(f"  done in {time.perf_counter() - start:.1f}s")
+
+            # Rows were inserted directly, so build the daily rollups the dashboards read
+            start = time.perf_counter()
+            rollup_rows = db.rebuild_analytics_rollups()
+            print(f"  {rollup_rows:,} rollup rows built in {time.perf_counter() - start:.1f}s")
+
+        scenarios = [("all users (admin)", None), ("single user", 1)]
+
+        # Previous implementation, without the new indexes
+        conn = sqlite3.connect(db_path)
+        for index in NEW_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+        conn.close()
+        legacy = {label: measure(lambda: legacy_get_analytics_data(db_path, user_id), args.repeat)
+                  for label, user_id in scenarios}
+
+        # Recreate the indexes and time the current implementation
+        db = IDMSDatabase(db_path)
+        current = {label: measure(lambda: db.get_analytics_data(user_id), args.repeat)
+                   for label, user_id in scenarios}
+
+        print(f"\n{'scenario':<20} {'previous (ms)':>14} {'current (ms)':>13} {'speed-up':>9}  same payload")
+        for label, user_id in scenarios:
+            before, after = legacy[label], current[label]
+            # Compared back to back, since rows can cross the 30-day window between timing runs
+            same = legacy_get_analytics_data(db_path, user_id) == db.get_analytics_data(user_id)
+            print(f"{label:<20} {before['median_ms']:>14.1f} {after['median_ms']:>13.1f} "
+                  f"{before['median_ms'] / after['median_ms']:>8.1f}x  {same}")
+        db.close()
+    finally:
+        if temp_dir:
+            temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+IDMS Database Benchmark Script
+Compares per-call connections (the old behaviour) against the pooled WAL connections
+used by IDMSDatabase, on throwaway databases.
+
+Usage:
+    python scripts/benchmark_database.py [--operations 2000] [--threads 8]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Add app directory to path to import database
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from database import IDMSDatabase, DB_POOL_SIZE
+
+
+def timed(label: str, operations: int, func) -> float:
+    """Run func and print its throughput"""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    rate = operations / elapsed if elapsed > 0 else 0
+    print(f"  {label:<28} {operations:>7} ops  {elapsed:8.3f}s  {rate:10.0f} ops/sec")
+    return rate
+
+
+def run_benchmark(db: IDMSDatabase, operations: int, threads: int) -> dict:
+    db.create_user("bench_user", "bench_password", "Benchmark User", "bench@example.com", "viewer")
+    user_id = db.authenticate_user("bench_user", "bench_password")['id']
+
+    def insert_logs():
+        for i in range(operations):
+            db.insert_processing_log({
+                'document_id': 1,
+                'processing_step': 'benchmark',
+                'status': 'completed',
+                'duration': 0.01,
+                'details': {'iteration': i}
+            })
+
+    def read_users():
+        for _ in range(operations):
+            db.get_user_by_id(user_id)
+
+    def mixed(worker: int):
+        for i in range(operations // threads):
+            if i % 4 == 0:
+                db.insert_system_metric({
+                    'metric_name': 'benchmark',
+                    'metric_value': i,
+                    'metric_unit': 'count',
+                    'additional_data': {'worker': worker}
+                })
+            else:
+                db.get_user_by_id(user_id)
+
+    def threaded_mixed():
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(mixed, range(threads)))
+
+    return {
+        'inserts': timed("inserts (processing_logs)", operations, insert_logs),
+        'reads': timed("reads (get_user_by_id)", operations, read_users),
+        'mixed': timed(f"mixed 3:1 r/w, {threads} threads", operations // threads * threads, threaded_mixed)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IDMSDatabase connection handling")
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for label, pool_size in (("before: connect per call", 0), (f"after: pool of {DB_POOL_SIZE}, WAL", DB_POOL_SIZE or 8)):
+            print(f"\n{label}")
+            db = IDMSDatabase(os.path.join(temp_dir, f"bench_{pool_size}.db"), pool_size=pool_size)
+            results[label] = run_benchmark(db, args.operations, args.threads)
+            db.close()
+
+    before, after = results.values()
+    print("\nSpeed-up")
+    for key in before:
+        print(f"  {key:<10} {after[key] / before[key] if before[key] else 0:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+IDMS Ingestion Latency Benchmark Script
+Measures how quickly a running IDMS server answers web requests (the login page and the
+auto-ingestion dashboard API), first idle and then while auto-ingestion workflows work
+through a backlog of synthetic images.
+
+Usage (with the server running, e.g. against the fake watsonx server and fake FileNet worker):
+    python scripts/benchmark_ingestion_latency.py --url http://127.0.0.1:8000 --username admin --password <password> \
+        [--workflows 2] [--files 100] [--duration 120] [--folder /tmp/idms-ingestion-benchmark]
+
+The image folders must be on the server's filesystem; they are created under --folder and
+removed, together with the benchmark workflows, when the run ends.
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import statistics
+from typing import Dict, List
+
+import httpx
+from PIL import Image
+
+PROBE_PATHS = ["/login", "/api/auto-ingestion/dashboard"]
+
+
+def make_images(folder: str, count: int, prefix: str):
+    """Write count distinct small PNG files"""
+    os.makedirs(folder, exist_ok=True)
+    for n in range(count):
+        image = Image.new("RGB", (320, 200), tuple(random.randrange(256) for _ in range(3)))
+        image.putpixel((n % 320, n // 320 % 200), (n % 256, n // 256 % 256, 0))
+        image.save(os.path.join(folder, f"{prefix}_{n:05d}.png"))
+
+
+def login(client: httpx.Client, username: str, password: str):
+    response = client.post("/api/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    token = response.json().get("token")
+    if not token:
+        sys.exit(f"Login did not return a session token: {response.json()}")
+    client.headers["Authorization"] = f"Bearer {token}"
+
+
+def probe(client: httpx.Client, latencies: Dict[str, List[float]], pause: float):
+    """Time one request to each probe path"""
+    for path in PROBE_PATHS:
+        started = time.perf_counter()
+        client.get(path).raise_for_status()
+        latencies[path].append((time.perf_counter() - started) * 1000)
+        time.sleep(pause)
+
+
+def summarize(samples: List[float]) -> str:
+    if not samples:
+        return "no samples"
+    ordered = sorted(samples)
+    percentile = lambda p: ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+    return (f"n={len(ordered):5d}  p50={statistics.median(ordered):8.1f}ms  p95={percentile(0.95):8.1f}ms  "
+            f"p99={percentile(0.99):8.1f}ms  max={ordered[-1]:8.1f}ms")
+
+
+def processed_files(client: httpx.Client, workflow_ids: List[int]) -> int:
+    total = 0
+    for workflow_id in workflow_ids:
+        workflow = client.get(f"/api/auto-ingestion/workflows/{workflow_id}").json()
+        total += (workflow.get("total_files_processed") or 0) + (workflow.get("total_files_failed") or 0)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark web API latency during auto-ingestion")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--workflows", type=int, default=2)
+    parser.add_argument("--files", type=int, default=100, help="Images per workflow")
+    parser.add_argument("--duration", type=float, default=120, help="Maximum seconds to measure under load")
+    parser.add_argument("--baseline", type=float, default=10, help="Seconds to measure before ingestion starts")
+    parser.add_argument("--pause", type=float, default=0.05, help="Seconds between probe requests")
+    parser.add_argument("--folder", default="/tmp/idms-ingestion-benchmark")
+    args = parser.parse_args()
+
+    client = httpx.Client(base_url=args.url, timeout=60)
+    login(client, args.username, args.password)
+
+    run_id = time.strftime("%Y%m%d_%H%M%S")
+    folders = [os.path.abspath(os.path.join(args.folder, f"{run_id}_{n}")) for n in range(1, args.workflows + 1)]
+    for n, folder in enumerate(folders, 1):
+        make_images(folder, args.files, f"benchmark{n}")
+    print(f"Created {args.workflows} folders with {args.files} images each under {args.folder}")
+
+    workflow_ids = []
+    try:
+        baseline = {path: [] for path in PROBE_PATHS}
+        deadline = time.monotonic() + args.baseline
+        while time.monotonic() < deadline:
+            probe(client, baseline, args.pause)
+
+        for n, folder in enumerate(folders, 1):
+            response = client.post("/api/auto-ingestion/workflows", json={
+                "workflow_name": f"Latency benchmark {run_id} #{n}", "source_path": folder, "interval_seconds": 10})
+            response.raise_for_status()
+            workflow_ids.append(response.json()["id"])
+        for workflow_id in workflow_ids:
+            client.post(f"/api/auto-ingestion/workflows/{workflow_id}/start").raise_for_status()
+
+        loaded = {path: [] for path in PROBE_PATHS}
+        expected = args.files * args.workflows
+        started = time.monotonic()
+        done = 0
+        while time.monotonic() - started < args.duration:
+            probe(client, loaded, args.pause)
+            done = processed_files(client, workflow_ids)
+            if done >= expected:
+                break
+        elapsed = time.monotonic() - started
+
+        print(f"\nIdle server ({args.baseline:.0f}s):")
+        for path in PROBE_PATHS:
+            print(f"  {path:32s} {summarize(baseline[path])}")
+        print(f"\nDuring ingestion ({args.workflows} workflows, {done}/{expected} files in {elapsed:.1f}s, "
+              f"{done / elapsed:.1f} files/s):")
+        for path in PROBE_PATHS:
+            print(f"  {path:32s} {summarize(loaded[path])}")
+
+    finally:
+        for workflow_id in workflow_ids:
+            client.post(f"/api/auto-ingestion/workflows/{workflow_id}/stop")
+            client.delete(f"/api/auto-ingestion/workflows/{workflow_id}")
+        for folder in folders:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -60,6 +60,8 @@ def clean_database(db_path: str):
             ('auto_ingestion_logs', 'Auto Ingestion logs'),
             ('auto_ingestion_queue', 'Auto Ingestion queue'),
             ('auto_ingestion_workflows', 'Auto Ingestion workflows'),
+            ('processing_job_items', 'Processing job items'),
+            ('processing_jobs', 'Processing jobs'),
             ('processing_logs', 'Processing logs'),
             ('filenet_uploads', 'FileNet uploads'),
             ('system_metrics', 'System metrics'),
@@ -68,6 +70,7 @@ def clean_database(db_path: str):
             ('configuration', 'Configuration settings'),
             ('document_categories', 'Document categories'),
             ('criticality_levels', 'Criticality levels'),
+            ('analytics_daily_rollups', 'Analytics rollups'),
             ('ai_document_classifications', 'AI document classifications'),
             ('user_ghostlayer_documents', 'User GhostLayer documents'),
             ('ghostlayer_documents', 'GhostLayer documents'),
@@ -0,0 +1,81 @@
+"""
+Fake FileNet Upload Worker
+Stand-in for the resident FileNet upload jar, speaking the same line-delimited JSON protocol.
+
+Usage (from the app directory):
+    FILENET_WORKER_COMMAND="python ../scripts/fake_filenet_worker.py" uvicorn main:app
+
+Environment:
+    FAKE_FILENET_DELAY_SECONDS  Simulated upload latency (default 0.05)
+    FAKE_FILENET_FAIL_RATE      Fraction of uploads that return an error (default 0)
+    FAKE_FILENET_CRASH_AFTER    Exit after this many uploads, to exercise restart-on-crash (default 0 = never)
+    FAKE_FILENET_LOG            Append every upload request to this file
+"""
+
+import os
+import sys
+import json
+import time
+import random
+
+DELAY_SECONDS = float(os.getenv("FAKE_FILENET_DELAY_SECONDS", "0.05"))
+FAIL_RATE = float(os.getenv("FAKE_FILENET_FAIL_RATE", "0"))
+CRASH_AFTER = int(os.getenv("FAKE_FILENET_CRASH_AFTER", "0"))
+LOG_FILE = os.getenv("FAKE_FILENET_LOG")
+
+
+def respond(response: dict):
+    sys.stdout.write(json.dumps(response) + "\n")
+    sys.stdout.flush()
+
+
+def main():
+    uploads = 0
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            print(f"Invalid request: {line}", file=sys.stderr)
+            continue
+
+        request_id = request.get("id")
+        op = request.get("op")
+
+        if op == "ping":
+            respond({"id": request_id, "ok": True})
+            continue
+
+        if op != "upload":
+            respond({"id": request_id, "ok": False, "error": f"Unknown op: {op}"})
+            continue
+
+        uploads += 1
+        time.sleep(DELAY_SECONDS)
+
+        if LOG_FILE:
+            with open(LOG_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(request) + "\n")
+
+        if not os.path.exists(request.get("image_path", "")):
+            respond({"id": request_id, "ok": False, "error": f"File not found: {request.get('image_path')}"})
+        elif random.random() < FAIL_RATE:
+            respond({"id": request_id, "ok": False, "error": "Simulated FileNet failure"})
+        else:
+            respond({
+                "id": request_id,
+                "ok": True,
+                "output": f"Uploaded {os.path.basename(request['image_path'])} to /{request.get('document_type')}"
+            })
+
+        if CRASH_AFTER and uploads >= CRASH_AFTER:
+            print("Simulated crash", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Fake watsonx.ai Server
+Local stand-in for the IAM token endpoint and the watsonx.ai text generation and chat APIs,
+for exercising the inference client's rate limiting, retries and deadlines without a real quota.
+
+Usage (from the app directory):
+    python ../scripts/fake_watsonx_server.py --port 8089 &
+    WATSONX_SERVICE_URL=http://127.0.0.1:8089 WATSONX_IAM_URL=http://127.0.0.1:8089/identity/token \
+        WATSONX_API_KEY=test WATSONX_PROJECT_ID=test uvicorn main:app
+
+Environment:
+    FAKE_WATSONX_LATENCY_SECONDS  Simulated inference latency (default 0.2)
+    FAKE_WATSONX_FAIL_RATE        Fraction of calls answered with 503 (default 0)
+    FAKE_WATSONX_RATE_LIMIT       Calls per second before answering 429 with Retry-After (default 0 = unlimited)
+    FAKE_WATSONX_LOG              Append every inference request to this file
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+LATENCY_SECONDS = float(os.getenv("FAKE_WATSONX_LATENCY_SECONDS", "0.2"))
+FAIL_RATE = float(os.getenv("FAKE_WATSONX_FAIL_RATE", "0"))
+RATE_LIMIT = float(os.getenv("FAKE_WATSONX_RATE_LIMIT", "0"))
+LOG_FILE = os.getenv("FAKE_WATSONX_LOG")
+
+CLASSIFICATION = {
+    "document_type": "Source Code",
+    "Tags": "fake, watsonx, test",
+    "summary": "Answer from the fake watsonx server.",
+    "reasoning": "Every document is classified the same way by the fake server.",
+    "id_number": "Unknown"
+}
+
+_lock = threading.Lock()
+_window = []
+stats = {"requests": 0, "rate_limited": 0, "failed": 0}
+
+
+def rate_limited() -> bool:
+    """Sliding one-second window of accepted calls"""
+    if not RATE_LIMIT:
+        return False
+    with _lock:
+        now = time.monotonic()
+        _window[:] = [t for t in _window if now - t < 1]
+        if len(_window) >= RATE_LIMIT:
+            return True
+        _window.append(now)
+        return False
+
+
+def generated_output(prompt: str) -> str:
+    """One classification, or one per document for multi-document prompts"""
+    documents = [int(n) for n in re.findall(r"^### Document (\d+)$", prompt, re.MULTILINE)]
+    if documents:
+        return json.dumps({"results": [dict(CLASSIFICATION, index=n) for n in documents]})
+    return json.dumps(CLASSIFICATION)
+
+
+class FakeWatsonxHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, status: int, body: dict, headers: dict = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if path == "/identity/token":
+            self.respond(200, {"access_token": "fake-token", "expires_in": 3600, "token_type": "Bearer"})
+            return
+
+        if path not in ("/ml/v1/text/generation", "/ml/v1/text/chat"):
+            self.respond(404, {"errors": [{"message": f"Unknown path {path}"}]})
+            return
+        if self.headers.get("Authorization") != "Bearer fake-token":
+            self.respond(401, {"errors": [{"message": "Missing or invalid token"}]})
+            return
+
+        request = json.loads(body or b"{}")
+        with _lock:
+            stats["requests"] += 1
+        if LOG_FILE:
+            with _lock, open(LOG_FILE, "a", encoding="utf-8") as log:
+                log.write(json.dumps({"path": path, "time": time.time(), "model_id": request.get("model_id")}) + "\n")
+
+        if rate_limited():
+            with _lock:
+                stats["rate_limited"] += 1
+            self.respond(429, {"errors": [{"code": "rate_limit_reached"}]}, {"Retry-After": "1"})
+            return
+        time.sleep(LATENCY_SECONDS)
+        if random.random() < FAIL_RATE:
+            with _lock:
+                stats["failed"] += 1
+            self.respond(503, {"errors": [{"code": "service_unavailable"}]})
+            return
+
+        if path == "/ml/v1/text/generation":
+            output = generated_output(request.get("input", ""))
+            self.respond(200, {"model_id": request.get("model_id"), "results": [{
+                "generated_text": output, "generated_token_count": len(output) // 4,
+                "input_token_count": len(request.get("input", "")) // 4, "stop_reason": "eos_token"}]})
+        else:
+            output = generated_output("")
+            self.respond(200, {"model_id": request.get("model_id"),
+                               "choices": [{"index": 0, "message": {"role": "assistant", "content": output},
+                                            "finish_reason": "stop"}],
+                               "usage": {"prompt_tokens": 1000, "completion_tokens": len(output) // 4,
+                                         "total_tokens": 1000 + len(output) // 4}})
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/stats":
+            with _lock:
+                self.respond(200, dict(stats))
+        else:
+            self.respond(404, {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake watsonx.ai server for local testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeWatsonxHandler)
+    print(f"Fake watsonx server listening on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+IDMS Analytics Rollup Rebuild Script
+Recomputes the analytics_daily_rollups table from the document tables.
+
+The rollups are kept up to date by IDMSDatabase and backfilled automatically when the
+table is empty; run this after importing or editing documents directly in SQLite.
+
+Usage:
+    python scripts/rebuild_analytics_rollups.py [--db path/to/idms.db]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add app directory to path to import database
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from database import IDMSDatabase
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the IDMS analytics rollups")
+    parser.add_argument("--db", default=os.path.join(os.path.dirname(__file__), '..', 'app', 'idms.db'),
+                        help="Database path (default: app/idms.db)")
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db)
+    if not os.path.exists(db_path):
+        print(f"❌ Error: Database file not found at {db_path}")
+        sys.exit(1)
+
+    print(f"📁 Database location: {db_path}")
+    start = time.perf_counter()
+    rows = IDMSDatabase(db_path).rebuild_analytics_rollups()
+    print(f"✅ Rebuilt {rows} rollup rows in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Tests for the resident FileNet upload worker pool, run against scripts/fake_filenet_worker.py
+
+Usage (from the project root directory):
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import shlex
+import tempfile
+import unittest
+import subprocess
+from unittest import mock
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'app'))
+
+import filenet_worker
+from filenet_worker import FileNetWorkerPool, FileNetWorkerError
+
+FAKE_WORKER_COMMAND = f"{shlex.quote(sys.executable)} {shlex.quote(os.path.join(ROOT, 'scripts', 'fake_filenet_worker.py'))}"
+
+
+class FileNetWorkerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.image_path = tempfile.mkstemp(suffix=".png")
+        os.close(handle)
+        self.pool = None
+
+    def tearDown(self):
+        if self.pool:
+            self.pool.stop()
+        os.remove(self.image_path)
+
+    def start_pool(self, command: str = FAKE_WORKER_COMMAND, size: int = 1, **env) -> bool:
+        with mock.patch.object(filenet_worker, "FILENET_WORKER_COMMAND", command), \
+                mock.patch.dict(os.environ, {"FAKE_FILENET_DELAY_SECONDS": "0", **env}):
+            self.pool = FileNetWorkerPool(size)
+            return self.pool.start()
+
+    def upload(self) -> str:
+        return self.pool.upload(self.image_path, "Invoice", "High", "Local Folder", "3", "Unknown")
+
+    def test_round_trip(self):
+        self.assertTrue(self.start_pool(size=2))
+        for _ in range(3):
+            self.assertEqual(self.upload(), f"Uploaded {os.path.basename(self.image_path)} to /Invoice")
+        self.assertEqual(self.pool.get_status()["alive_workers"], 2)
+
+    def test_worker_error_response(self):
+        self.assertTrue(self.start_pool())
+        with self.assertRaises(FileNetWorkerError):
+            self.pool.upload("/no/such/file.png", "Invoice", "High", "Local Folder", "3", "Unknown")
+
+    def test_crash_then_restart(self):
+        self.assertTrue(self.start_pool(FAKE_FILENET_CRASH_AFTER="1"))
+        # The worker answers its first upload and then exits
+        self.upload()
+        self.pool.workers[0].process.wait(timeout=10)
+        # The next checkout finds it dead and starts a new process
+        self.upload()
+        self.assertEqual(self.pool.restarts, 1)
+
+    def test_failed_handshake_falls_back_to_cli(self):
+        failing_command = f"{shlex.quote(sys.executable)} -c pass"
+        self.assertFalse(self.start_pool(failing_command))
+        self.assertFalse(self.pool.available)
+
+        completed = subprocess.CompletedProcess([], 0, stdout="uploaded by cli", stderr="")
+        with mock.patch.object(filenet_worker, "filenet_pool", self.pool), \
+                mock.patch.object(filenet_worker.subprocess, "run", return_value=completed) as run:
+            output = filenet_worker.upload_to_filenet(self.image_path, "Invoice", "High", "Local Folder", "3", "Unknown")
+
+        self.assertEqual(output, "uploaded by cli")
+        command = run.call_args[0][0]
+        self.assertEqual(command[:3], ["java", "-jar", filenet_worker.FILENET_JAR_PATH])
+        self.assertEqual(command[3], self.image_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Tests for the watsonx.ai client's retries, deadlines and concurrency slots, run against
+scripts/fake_watsonx_server.py
+
+Usage (from the project root directory, with httpx installed):
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import threading
+import unittest
+import subprocess
+from unittest import mock
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'app'))
+
+import watsonx_client
+from watsonx_client import WatsonxClient, WatsonxError, WatsonxDeadlineExceeded
+
+
+def start_fake_server(**env) -> (subprocess.Popen, str):
+    """Run the fake server on a free port and wait until it answers"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "scripts", "fake_watsonx_server.py"), "--port", str(port)],
+        env={**os.environ, **env}, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{url}/stats")
+            return process, url
+        except httpx.TransportError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Fake watsonx server did not start")
+
+
+class FakeServerTest(unittest.TestCase):
+    server_env = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.process, cls.url = start_fake_server(**cls.server_env)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.process.kill()
+        cls.process.wait()
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(watsonx_client, "IAM_URL", f"{self.url}/identity/token"),
+            mock.patch.object(watsonx_client, "WATSONX_RETRY_BASE_SECONDS", 0.05),
+            mock.patch.object(watsonx_client, "WATSONX_MAX_RETRIES", 3),
+            mock.patch.object(watsonx_client, "WATSONX_MAX_CONCURRENCY", 1),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.client = WatsonxClient(api_key="test", service_url=self.url, project_id="test", model_id="test-model",
+                                    transport="http")
+        self.addCleanup(self.client.close)
+
+    def server_stats(self) -> dict:
+        return httpx.get(f"{self.url}/stats").json()
+
+
+class RateLimitedServerTest(FakeServerTest):
+    server_env = {"FAKE_WATSONX_LATENCY_SECONDS": "0", "FAKE_WATSONX_RATE_LIMIT": "1"}
+
+    def test_retries_after_429(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.client.generate_text("hello")))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 3)
+        self.assertGreater(self.server_stats()["rate_limited"], 0)
+        self.assertGreater(self.client.stats["retries"], 0)
+
+
+class UnavailableServerTest(FakeServerTest):
+    server_env = {"FAKE_WATSONX_LATENCY_SECONDS": "0", "FAKE_WATSONX_FAIL_RATE": "1"}
+
+    def test_gives_up_after_503_retries(self):
+        with self.assertRaises(WatsonxError) as raised:
+            self.client.generate_text("hello")
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(self.server_stats()["failed"], 4)
+
+
+class SlowServerTest(FakeServerTest):
+    server_env = {"FAKE_WATSONX_LATENCY_SECONDS": "1"}
+
+    def test_deadline_exceeded(self):
+        started = time.monotonic()
+        with self.assertRaises(WatsonxDeadlineExceeded):
+            self.client.generate_text("hello", deadline_seconds=0.3)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_cancelled_async_call_does_not_leak_slot(self):
+        async def cancel_waiting_call():
+            holder = asyncio.create_task(self.client.generate_text_async("hello"))
+            await asyncio.sleep(0.2)
+            # The only slot is taken, so this call is still waiting for it when it is cancelled
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(self.client.generate_text_async("hello"), 0.2)
+            await holder
+
+        asyncio.run(cancel_waiting_call())
+        self.assertTrue(self.client.generate_text("hello", deadline_seconds=5))
+
+
+class ConfigurationErrorTest(unittest.TestCase):
+
+    def test_missing_service_url_raises_watsonx_error(self):
+        client = WatsonxClient(api_key="test", service_url="", project_id="test", model_id="test-model",
+                               transport="http")
+        client._token, client._token_expires = "fake-token", time.monotonic() + 3600
+        with self.assertRaises(WatsonxError):
+            client.generate_text("hello")
+        client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()